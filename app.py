@@ -1,125 +1,578 @@
 """
 PDF Parser Application
-Execute: python app.py [attendance|allowance] [optional_pdf_path]
+Execute: python app.py [attendance|allowance] [optional_pdf_path] [options]
 Test: python app.py [attendance|allowance] --test
+Service: python app.py serve [--port 8000] [--workers N]
+Daemon: python app.py daemon [--workers N]
+Watch: python app.py watch <directory> [--workers N]
+Batch: python app.py batch <directory|glob|pdf>... [--workers N]
 """
 
+import os
 import sys
-import json
 import time
+import argparse
 from pathlib import Path
 
+from src.parsers import PARSERS, get_parser_config, load_parser
 
-def main():
-    if len(sys.argv) < 2:
-        print("\nUsage: python app.py [attendance|allowance] [optional_pdf_path|--test]")
-        print("\nExamples:")
-        print("  python app.py attendance")
-        print("  python app.py allowance")
-        print("  python app.py attendance --test")
-        print("  python app.py allowance --test")
-        print("  python app.py attendance /path/to/custom.pdf")
-        print("  python app.py allowance /path/to/custom.pdf")
+
+def print_usage():
+    print("\nUsage: python app.py [attendance|allowance] [optional_pdf_path|--test] [options]")
+    print("\nExamples:")
+    print("  python app.py attendance")
+    print("  python app.py allowance")
+    print("  python app.py attendance --test")
+    print("  python app.py allowance --test")
+    print("  python app.py attendance /path/to/custom.pdf")
+    print("  python app.py allowance /path/to/custom.pdf")
+    print("  python app.py attendance /path/to/custom.pdf --pages 1-20")
+    print("  python app.py attendance /path/to/book.pdf --shard-pages 100")
+    print("  python app.py attendance /path/to/book.pdf --shard-records 500")
+    print("  python app.py attendance /path/to/book.pdf --shard-pages 100 --only-shard 3")
+    print("  python app.py attendance /path/to/book.pdf --compress gzip")
+    print("  python app.py attendance /path/to/book.pdf --employee 240631")
+    print("  cat /path/to/book.pdf | python app.py attendance -")
+    print("  python app.py attendance /path/to/book.pdf --workers 8")
+    print("  python app.py attendance /path/to/book.pdf --checkpoint")
+    print("  python app.py attendance /path/to/book.pdf --page-budget 60 --workers 4")
+    print("  python app.py attendance /path/to/book.pdf --celery 50")
+    print("  python app.py attendance /path/to/book.pdf --timing")
+    print("  python app.py attendance /path/to/book.pdf --profile sample --profile-pages 3-5")
+    print("  python app.py attendance /path/to/book.pdf --memory")
+    print("  python app.py attendance /path/to/book.pdf --metrics /var/lib/node_exporter/pdf.prom")
+    print("  python app.py attendance /path/to/book.pdf --log-level debug --log-json")
+    print("  python app.py attendance /path/to/book.pdf --trace output/book.trace.json")
+    print("  python app.py serve --port 8000 --workers 4")
+    print("  python app.py daemon --workers 4")
+    print("  python app.py watch /srv/scans --workers 4")
+    print("  python app.py batch /srv/scans/2025-03 'archive/**/*.pdf' --workers 8")
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Extract attendance and allowance data from PDFs")
+    parser.add_argument("parser_type", help="attendance or allowance")
+    parser.add_argument("pdf_path", nargs="?", help="PDF to extract, '-' for stdin (defaults to the sample in materials/)")
+    parser.add_argument("--test", action="store_true", help="Compare the last output against correct.json")
+    parser.add_argument("--pages", default="all", help="Pages to extract, e.g. '1-20' or '3,5,7' (default: all)")
+    parser.add_argument("-o", "--output", help="Output folder (default: output/<parser_type>)")
+    parser.add_argument("--workers", type=int, help="Parse pages in N worker processes sharing one mapped copy of the PDF")
+    parser.add_argument("--compress", choices=["gzip", "xz"], help="Compress output files (.gz or .xz)")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="Journal each finished page and resume an interrupted run from the journal")
+    parser.add_argument("--page-budget", type=float, metavar="SECONDS",
+                        help="Kill and quarantine any page that takes longer than SECONDS")
+    parser.add_argument("--no-cheap-retry", action="store_true",
+                        help="With --page-budget, do not retry quarantined pages with cheaper settings")
+    parser.add_argument("--celery", type=int, nargs="?", const=25, metavar="PAGES",
+                        help="Extract through Celery workers in shards of PAGES pages (default 25)")
+    parser.add_argument("--timing", action="store_true",
+                        help="Time every extraction stage and save a report next to the outputs")
+    parser.add_argument("--memory", action="store_true",
+                        help="Track tracemalloc peaks per stage and page plus RSS, and save a memory report")
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=["cprofile", "sample"],
+                        help="Profile the run (default cprofile) and save pstats and collapsed stacks")
+    parser.add_argument("--profile-pages", metavar="PAGES",
+                        help="With --profile, only profile while these pages are read and processed")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Write the run's counters and latency histograms to FILE in Prometheus text format")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Record document, page, table, employee and field spans to FILE (Chrome trace JSON)")
+    parser.add_argument("--trace-sample", type=float, default=1.0,
+                        help="With --trace, probability of tracing this run (default: 1)")
+    parser.add_argument("--trace-slower-than", type=float, default=0.0, metavar="SECONDS",
+                        help="With --trace, only keep the trace if the document took this long")
+    parser.add_argument("--log-level", choices=["debug", "info", "warning", "error"], default="info",
+                        help="Parser log level; debug adds per-table and per-record messages (default: info)")
+    parser.add_argument("--log-json", action="store_true", help="Write parser log messages as JSON lines")
+
+    shards = parser.add_mutually_exclusive_group()
+    shards.add_argument("--shard-pages", type=int, help="Write JSON shards of N pages each plus a manifest")
+    shards.add_argument("--shard-records", type=int, help="Write JSON shards of N records each plus a manifest")
+    parser.add_argument("--only-shard", type=int, help="Re-extract one shard listed in an existing manifest")
+    parser.add_argument("--employee", help="Extract a single employee using the PDF's sidecar index")
+    parser.add_argument("--index-dir", metavar="DIR",
+                        help="Write and read the employee index in DIR instead of next to the PDF")
+    return parser
+
+
+def run_serve(argv):
+    """Run the HTTP extraction service"""
+    parser = argparse.ArgumentParser(prog="app.py serve", description="HTTP extraction service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-queue", type=int, default=32, help="Requests allowed to wait for a worker")
+    parser.add_argument("--profile-dir", default="output/profiles", help="Folder for ?profile= request profiles")
+    parser.add_argument("--trace-dir", help="Save sampled document traces (Chrome trace JSON) in this folder")
+    parser.add_argument("--trace-sample", type=float, default=0.01,
+                        help="With --trace-dir, fraction of documents to trace (default: 0.01)")
+    parser.add_argument("--trace-slower-than", type=float, default=0.0, metavar="SECONDS",
+                        help="With --trace-dir, only keep traces of documents that took this long")
+    args = parser.parse_args(argv)
+
+    from src.service import serve
+    serve(args.host, args.port, args.workers, args.max_queue, args.profile_dir,
+          args.trace_dir, args.trace_sample, args.trace_slower_than)
+
+
+def run_daemon(argv):
+    """Run the pre-forked daemon that later app.py calls hand their jobs to"""
+    parser = argparse.ArgumentParser(prog="app.py daemon", description="Pre-forked extraction daemon")
+    parser.add_argument("--socket", help="Unix socket path (default: $PDF_DAEMON_SOCKET or a per-user path)")
+    parser.add_argument("--workers", type=int, help="Forked worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    from src.daemon import serve
+    serve(run_command, args.socket, args.workers)
+
+
+def run_watch(argv):
+    """Watch a directory and extract each new PDF once"""
+    parser = argparse.ArgumentParser(prog="app.py watch", description="Watch-folder ingestion")
+    parser.add_argument("directory", help="Directory to watch for PDFs")
+    parser.add_argument("-o", "--output", default="output/ingest", help="Root of the per-file output folders")
+    parser.add_argument("--workers", type=int, help="Files extracted at once (default: CPU count)")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between polls")
+    parser.add_argument("--stable-polls", type=int, default=2,
+                        help="Polls a file's size must stay unchanged before it is picked up")
+    parser.add_argument("--ledger", help="SQLite ledger path (default: <directory>/.ingest-ledger.sqlite)")
+    parser.add_argument("--once", action="store_true", help="Exit once every file present has been handled")
+    args = parser.parse_args(argv)
+
+    if not Path(args.directory).is_dir():
+        print(f"❌ Error: {args.directory} is not a directory")
         sys.exit(1)
-    
-    parser_type = sys.argv[1].lower()
-    test_mode = len(sys.argv) > 2 and sys.argv[2] == '--test'
-    custom_path = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] != '--test' else None
-    
-    # Test mode
-    if test_mode:
-        if parser_type == "attendance":
-            from src.attendance.test import test
-            success = test()
-        elif parser_type == "allowance":
-            from src.allowance.test import test
-            success = test()
-        else:
-            print(f"Unknown parser type: {parser_type}")
+
+    from src.watch import FolderWatcher
+    watcher = FolderWatcher(
+        args.directory, args.output, args.workers, args.interval, args.stable_polls, args.ledger
+    )
+    print(f"Watching {args.directory} → {args.output}/")
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+
+def run_batch(argv):
+    """Extract a batch of PDFs on one process pool"""
+    parser = argparse.ArgumentParser(prog="app.py batch", description="Batch extraction")
+    parser.add_argument("inputs", nargs="+", help="Directories, globs or PDF paths")
+    parser.add_argument("--parser", choices=sorted(PARSERS), help="Parser for every file (default: by file name)")
+    parser.add_argument("-o", "--output", default="output/batch", help="Root of the per-file output folders")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--compress", choices=["gzip", "xz"], help="Compress output files (.gz or .xz)")
+    parser.add_argument("--schedule", choices=["lpt", "fair"], default="lpt",
+                        help="lpt: finish the batch soonest; fair: interleave files so small ones finish early")
+    parser.add_argument("--trace", metavar="FILE", help="Save the traced files' spans to FILE (Chrome trace JSON)")
+    parser.add_argument("--trace-sample", type=float, default=1.0,
+                        help="With --trace, fraction of files to trace (default: 1)")
+    args = parser.parse_args(argv)
+
+    from src.batch import run_batch as batch
+    try:
+        counts = batch(args.inputs, args.parser, args.output, args.workers, args.compress, args.schedule,
+                       args.trace, args.trace_sample)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    if None in counts.values():
+        sys.exit(1)
+
+
+def run_test(parser_type):
+    """Compare the last extraction against correct.json"""
+    import importlib
+    test_module = importlib.import_module(get_parser_config(parser_type)['test_module'])
+    return test_module.test()
+
+
+def write_sharded_outputs(page_records, config, output_folder, args, pdf_path):
+    """Write records as JSON shards plus a manifest"""
+    from src import shards
+    from src.common import compression_suffix
+
+    Path(output_folder).mkdir(parents=True, exist_ok=True)
+    if args.shard_pages:
+        planned = shards.plan_page_shards(page_records, args.shard_pages)
+        mode, size = 'pages', args.shard_pages
+    else:
+        planned = shards.plan_record_shards(page_records, args.shard_records)
+        mode, size = 'records', args.shard_records
+
+    return shards.write_shards(
+        planned, output_folder, config['basename'], config['id_field'], mode, size,
+        source=pdf_path, suffix=compression_suffix(args.compress),
+    )
+
+
+def rewrite_single_shard(parser, config, output_folder, args, pdf_path):
+    """Re-extract the page range of one shard from an existing manifest"""
+    from src import shards
+
+    manifest_path = Path(output_folder) / shards.manifest_filename(config['basename'])
+    if not manifest_path.exists():
+        print(f"❌ Error: {manifest_path} not found. Run a sharded extraction first.")
+        sys.exit(1)
+
+    manifest = shards.load_manifest(manifest_path)
+    if not 1 <= args.only_shard <= len(manifest['shards']):
+        print(f"❌ Error: shard {args.only_shard} not in manifest ({len(manifest['shards'])} shards)")
+        sys.exit(1)
+
+    pages = shards.shard_pages(manifest, args.only_shard)
+    print(f"Re-extracting shard {args.only_shard} (pages {pages})")
+
+    parse_start = time.time()
+    page_records = list(parser.iter_table_records(pdf_path, pages))
+    parse_time = time.time() - parse_start
+
+    process_start = time.time()
+    entry = shards.rewrite_shard(manifest_path, args.only_shard, page_records)
+    process_time = time.time() - process_start
+
+    print(f"\n✓ Shard {args.only_shard}: {entry['record_count']} records → {output_folder}/{entry['file']}")
+    print_timing(parse_time, process_time)
+
+
+def run_lookup(parser_type, pdf_path, employee_id, index_dir=None):
+    """Extract one employee through the sidecar index and print the records"""
+    import json
+    from contextlib import redirect_stdout
+    from src.index import index_path_for, lookup_employee
+
+    index_path = index_path_for(pdf_path, index_dir)
+    start = time.time()
+    try:
+        # Keep stdout for the JSON result
+        with redirect_stdout(sys.stderr):
+            records = lookup_employee(parser_type, pdf_path, employee_id, index_path)
+    except FileNotFoundError:
+        print(f"❌ Error: {index_path} not found. Run a full extraction first.", file=sys.stderr)
+        sys.exit(1)
+    except ValueError as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if not records:
+        print(f"✗ Employee {employee_id} not found in index", file=sys.stderr)
+        sys.exit(1)
+
+    print(json.dumps(records, ensure_ascii=False, indent=2))
+    print(f"Lookup time: {time.time() - start:.2f} seconds", file=sys.stderr)
+
+
+def run_celery(parser_type, pdf_path, output_folder, args):
+    """Submit the document to Celery workers and wait for the merged result"""
+    from src.tasks import extract_document
+
+    start = time.time()
+    result = extract_document(
+        parser_type, pdf_path, args.pages, args.celery, output_folder, args.compress
+    )
+    print(f"Submitted to Celery (pages per shard: {args.celery}), waiting for workers...")
+    summary = result.get()
+    elapsed = time.time() - start
+
+    if not summary['records']:
+        print("\n✗ No data found")
+        return
+
+    print("\n" + "=" * 70)
+    print(f"✓ Complete! {summary['records']} records from {summary['shards']} shards → {summary['output_folder']}/")
+    print("=" * 70)
+    print(f"Total time: {elapsed:.2f} seconds")
+
+
+def report_quarantine(quarantine, config, output_folder):
+    """Print quarantined pages and save them next to the outputs"""
+    from src.common import save_json
+
+    if not quarantine:
+        return
+    Path(output_folder).mkdir(parents=True, exist_ok=True)
+    quarantine_path = f"{output_folder}/{config['basename']}.quarantine.json"
+    save_json(quarantine, quarantine_path)
+
+    print("\n" + "=" * 70)
+    print("QUARANTINED PAGES")
+    print("=" * 70)
+    for entry in quarantine:
+        outcome = "recovered by retry" if entry['recovered'] else "no records"
+        detail = f" ({entry['error']})" if entry['error'] else ""
+        print(f"Page {entry['page']}: {entry['reason']} after {entry['seconds']:.1f}s "
+              f"with {entry['settings']} settings{detail} - {outcome}")
+    print(f"Details: {quarantine_path}")
+
+
+def report_timing(collector, config, output_folder):
+    """Print the stage timing summary and save the report next to the outputs"""
+    Path(output_folder).mkdir(parents=True, exist_ok=True)
+    timing_path = f"{output_folder}/{config['basename']}.timing.json"
+    collector.save(timing_path)
+
+    print("\n" + "=" * 70)
+    print("STAGE TIMING")
+    print("=" * 70)
+    print(collector.summary())
+    print(f"Details: {timing_path}")
+
+
+def report_memory(collector, parser_type, config, output_folder):
+    """Print the memory summary and save the memory report next to the outputs"""
+    Path(output_folder).mkdir(parents=True, exist_ok=True)
+    memory_path = f"{output_folder}/{config['basename']}.memory.json"
+    timing = collector.report()
+    collector.save(memory_path, {
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'parser': parser_type,
+        'total_seconds': timing['total_seconds'],
+        'counts': timing['counts'],
+        **collector.memory.report(),
+    })
+
+    print("\n" + "=" * 70)
+    print("MEMORY")
+    print("=" * 70)
+    print(collector.memory_summary())
+    print(f"Details: {memory_path}")
+
+
+def report_profile(profile_data, config, output_folder):
+    """Save a run's profile next to the outputs and print its top functions"""
+    from src.profiling import profile_paths, print_top
+
+    Path(output_folder).mkdir(parents=True, exist_ok=True)
+    pstats_path, collapsed_path = profile_paths(output_folder, config['basename'])
+    profile_data.save(pstats_path, collapsed_path)
+
+    print("\n" + "=" * 70)
+    print("PROFILE")
+    print("=" * 70)
+    if profile_data.stats:
+        print_top(pstats_path)
+    print(f"pstats: {pstats_path}")
+    print(f"Collapsed stacks: {collapsed_path}")
+
+
+def print_timing(parse_time, process_time):
+    print("\n" + "=" * 70)
+    print("TIMING RESULTS")
+    print("=" * 70)
+    print(f"Parsing time: {parse_time:.2f} seconds")
+    print(f"Processing time: {process_time:.2f} seconds")
+
+
+def run_extraction(parser_type, args):
+    """Run a parser over a PDF and write its outputs"""
+    config = get_parser_config(parser_type)
+
+    if args.employee:
+        run_lookup(parser_type, args.pdf_path or config['default_pdf'], args.employee, args.index_dir)
+        return
+
+    print("\n" + "=" * 70)
+    print(f"Running {config['label']} Parser...")
+    print("=" * 70 + "\n")
+
+    parser = load_parser(parser_type)
+    pdf_path = args.pdf_path or config['default_pdf']
+    output_folder = args.output or config['output_folder']
+
+    print(f"PDF: {'<stdin>' if pdf_path == '-' else pdf_path}")
+    print("=" * 70)
+
+    # Parsers accept the bytes directly; nothing is written to disk
+    if pdf_path == '-':
+        pdf_path = sys.stdin.buffer.read()
+
+    if args.only_shard is not None:
+        rewrite_single_shard(parser, config, output_folder, args, pdf_path)
+        return
+
+    if args.celery:
+        from src.pdf_source import is_path
+        if not is_path(pdf_path):
+            print("❌ Error: --celery needs a PDF path that the workers can read")
             sys.exit(1)
-        
+        run_celery(parser_type, pdf_path, output_folder, args)
+        return
+
+    from src.index import EmployeeIndex, index_path_for
+    from src.pdf_source import is_path
+
+    sharded = args.shard_pages or args.shard_records
+    index = EmployeeIndex()
+
+    # Measure parsing time
+    quarantine = []
+    parse_start = time.time()
+    if args.page_budget:
+        from src.budget import parse_pdf_with_budget
+        page_records, quarantine = parse_pdf_with_budget(
+            parser_type, pdf_path, args.pages, args.page_budget, args.workers,
+            retry_cheap=not args.no_cheap_retry, index=index,
+        )
+        records = [record for _, table_records in page_records for record in table_records]
+    elif args.checkpoint:
+        from src.checkpoint import journal_path_for, parse_pdf_checkpointed
+        journal_path = journal_path_for(output_folder, config['basename'])
+        page_records = parse_pdf_checkpointed(parser_type, pdf_path, journal_path, args.pages, args.workers, index)
+        records = [record for _, table_records in page_records for record in table_records]
+    elif args.workers:
+        from src.shared_input import parse_pdf_parallel
+        page_records = parse_pdf_parallel(parser_type, pdf_path, args.pages, args.workers, index=index)
+        records = [record for _, table_records in page_records for record in table_records]
+    elif sharded:
+        page_records = list(parser.iter_table_records(pdf_path, args.pages, index))
+        records = [record for _, table_records in page_records for record in table_records]
+    else:
+        records = parser.parse_pdf(pdf_path, args.pages, index)
+    parse_time = time.time() - parse_start
+
+    report_quarantine(quarantine, config, output_folder)
+
+    if not records:
+        print("\n✗ No data found")
+        return
+
+    # Measure processing time
+    process_start = time.time()
+    if sharded:
+        manifest = write_sharded_outputs(page_records, config, output_folder, args, pdf_path)
+        summary = f"{len(records)} records in {len(manifest['shards'])} shards"
+    else:
+        from src.common import write_outputs
+        write_outputs(records, config, output_folder, args.compress)
+        summary = f"{len(records)} records"
+    process_time = time.time() - process_start
+
+    # A partial run would leave other employees out of the index
+    if args.pages == 'all' and is_path(pdf_path) and not quarantine:
+        index_path = index_path_for(pdf_path, args.index_dir)
+        try:
+            index.save(index_path, parser_type, pdf_path)
+        except OSError as e:
+            print(f"⚠️  Employee index not written ({e}); use --index-dir to keep it elsewhere")
+
+    print("\n" + "=" * 70)
+    print(f"✓ Complete! {summary} → {output_folder}/")
+    print("=" * 70)
+
+    print_timing(parse_time, process_time)
+
+
+def run_counted(parser_type, args):
+    """Run an extraction counted as a document in the metrics (and traced if sampled), writing --metrics/--trace"""
+    from src import metrics, tracing
+
+    # A daemon child runs many commands; report this one only
+    metrics.reset()
+    recorder = tracing.start() if args.trace and tracing.sampled(args.trace_sample) else None
+    status = 'error'
+    try:
+        with metrics.document(parser_type):
+            run_extraction(parser_type, args)
+        status = 'ok'
+    finally:
+        if args.metrics:
+            Path(args.metrics).parent.mkdir(parents=True, exist_ok=True)
+            metrics.write_textfile(args.metrics)
+            print(f"Metrics: {args.metrics}")
+        if recorder is not None:
+            tracing.stop()
+            source = args.pdf_path or get_parser_config(parser_type)['default_pdf']
+            seconds = recorder.finish(parser=parser_type, source=source, pages=args.pages, status=status)
+            if seconds >= args.trace_slower_than:
+                Path(args.trace).parent.mkdir(parents=True, exist_ok=True)
+                recorder.save(args.trace, {'parser': parser_type, 'source': source, 'seconds': round(seconds, 4)})
+                print(f"Trace: {args.trace}")
+
+
+def run_command(argv):
+    """Run an extraction or test command line in this process"""
+    args = build_arg_parser().parse_args(argv)
+    parser_type = args.parser_type.lower()
+
+    from src.log import configure_logging
+    configure_logging(args.log_level, args.log_json)
+
+    if parser_type not in PARSERS:
+        print(f"Unknown parser type: {parser_type}")
+        print("Valid options: attendance, allowance")
+        sys.exit(1)
+
+    # Test mode
+    if args.test:
+        success = run_test(parser_type)
         sys.exit(0 if success else 1)
-    
+
     # Normal extraction mode
-    if parser_type == "attendance":
-        print("\n" + "=" * 70)
-        print("Running Attendance Parser...")
-        print("=" * 70 + "\n")
-        
-        from src.attendance.parser import parse_pdf
-        from src.common import save_json, save_csv, save_markdown
-        
-        pdf_path = custom_path or 'materials/出勤簿 - shukkinbo - attendance book.pdf'
-        output_folder = 'output/attendance'
-        
-        print(f"PDF: {pdf_path}")
-        print("=" * 70)
-        
-        # Measure parsing time
-        parse_start = time.time()
-        records = parse_pdf(pdf_path)
-        parse_time = time.time() - parse_start
-        
-        # Measure processing time
-        process_start = time.time()
-        Path(output_folder).mkdir(parents=True, exist_ok=True)
-        save_json(records, f'{output_folder}/attendance_records.json')
-        save_csv(records, f'{output_folder}/attendance_records.csv')
-        save_markdown(records, f'{output_folder}/attendance_records.md', 'Attendance Records')
-        
-        process_time = time.time() - process_start
-        
-        print("\n" + "=" * 70)
-        print(f"Extracted {len(records)} employee records")
-        print("=" * 70)
-        
-        print("\n" + "=" * 70)
-        print("TIMING RESULTS")
-        print("=" * 70)
-        print(f"Parsing time: {parse_time:.2f} seconds")
-        print(f"Processing time: {process_time:.2f} seconds")
-    
-    elif parser_type == "allowance":
-        print("\n" + "=" * 70)
-        print("Running Allowance Parser...")
-        print("=" * 70 + "\n")
-        
-        from src.allowance.parser import parse_pdf
-        from src.common import save_json, save_csv, save_markdown
-        
-        pdf_path = custom_path or "materials/運転手手当一覧表 - Untenshu teate ichiran hyō - Driver Allowance List.pdf"
-        output_folder = 'output/allowance'
-        
-        print(f"PDF: {pdf_path}")
-        print("=" * 70)
-        
-        # Measure parsing time
-        parse_start = time.time()
-        employees = parse_pdf(pdf_path)
-        parse_time = time.time() - parse_start
-        
-        if employees:
-            # Measure processing time
-            process_start = time.time()
-            Path(output_folder).mkdir(parents=True, exist_ok=True)
-            save_json(employees, f'{output_folder}/driver_allowance.json')
-            save_csv(employees, f'{output_folder}/driver_allowance.csv')
-            save_markdown(employees, f'{output_folder}/driver_allowance.md', 'Driver Allowance List')
-            
-            process_time = time.time() - process_start
-            
-            print("\n" + "=" * 70)
-            print(f"✓ Complete! {len(employees)} records → {output_folder}/")
-            print("=" * 70)
-            
-            print("\n" + "=" * 70)
-            print("TIMING RESULTS")
-            print("=" * 70)
-            print(f"Parsing time: {parse_time:.2f} seconds")
-            print(f"Processing time: {process_time:.2f} seconds")
-        print("Valid options: attendance, allowance")
+    if not args.timing and not args.memory and not args.profile:
+        run_counted(parser_type, args)
+        return
+
+    from src import instrument
+    from src.profiling import Profiler
+    config = get_parser_config(parser_type)
+    output_folder = args.output or config['output_folder']
+
+    profiled_pages = None
+    if args.profile_pages:
+        from src.pages import count_pages, parse_page_selection
+        pdf_path = args.pdf_path or config['default_pdf']
+        if pdf_path == '-':
+            print("❌ Error: --profile-pages needs a PDF path")
+            sys.exit(1)
+        profiled_pages = parse_page_selection(args.profile_pages, count_pages(pdf_path))
+
+    collector = instrument.start(memory=args.memory) if args.timing or args.memory else None
+    profiler = Profiler(args.profile, profiled_pages).start() if args.profile else None
+    try:
+        run_counted(parser_type, args)
+    finally:
+        profile_data = profiler.stop() if profiler else None
+        if collector:
+            instrument.stop()
+    if args.timing:
+        report_timing(collector, config, output_folder)
+    if args.memory:
+        report_memory(collector, parser_type, config, output_folder)
+    if profile_data:
+        report_profile(profile_data, config, output_folder)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print_usage()
         sys.exit(1)
 
+    if sys.argv[1] == 'serve':
+        run_serve(sys.argv[2:])
+        return
+
+    if sys.argv[1] == 'daemon':
+        run_daemon(sys.argv[2:])
+        return
+
+    if sys.argv[1] == 'watch':
+        run_watch(sys.argv[2:])
+        return
+
+    if sys.argv[1] == 'batch':
+        run_batch(sys.argv[2:])
+        return
+
+    # Hand the job to a running daemon, which has the parsers imported already
+    if not os.environ.get('PDF_NO_DAEMON'):
+        from src.daemon import run_via_daemon
+        exit_code = run_via_daemon(sys.argv[1:])
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+    run_command(sys.argv[1:])
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1 @@
+"""Performance benchmarks for the attendance and allowance parsers"""
@@ -0,0 +1,141 @@
+"""
+Capture the real inputs of the parsers' inner functions
+
+    python -m benchmarks.capture_cells
+    python -m benchmarks.capture_cells --attendance book.pdf --pages 1-4
+
+Runs both parsers over PDFs (by default the samples in materials/) with the
+functions in CAPTURED_FUNCTIONS wrapped, and writes every argument tuple
+they receive, in call order, to a fixture file that benchmarks.micro
+replays without camelot. Capture with the camelot version pinned in
+requirements.txt; the fixture records which version produced it.
+"""
+
+import io
+import sys
+import json
+import argparse
+import functools
+import importlib
+from contextlib import redirect_stdout
+from pathlib import Path
+
+
+FIXTURE_FORMAT_VERSION = 1
+
+DEFAULT_FIXTURE = Path(__file__).parent / 'fixtures' / 'cell_inputs.json'
+
+# 'module:function' names of the captured functions
+CAPTURED_FUNCTIONS = (
+    'src.attendance.extract.numbers:extract_all_numbers',
+    'src.attendance.extract.numbers:is_spaced_digit_garbage',
+    'src.attendance.extract.salary:extract_salary_field_from_rows',
+    'src.attendance.extract.employee:parse_attendance_counts_from_salary_data',
+    'src.attendance.extract.employee:_extract_name_from_cell_content',
+    'src.allowance.parser:clean_number',
+)
+
+
+def resolve(qualified_name):
+    """Function for a 'module:function' name"""
+    module_name, function_name = qualified_name.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _install_recorders(calls):
+    """
+    Wrap the captured functions wherever the src package refers to them.
+
+    Callers bind these functions with 'from ... import', so every module
+    namespace holding the original gets the wrapper.
+
+    Returns:
+        List of (namespace, attribute, original) to restore
+    """
+    patched = []
+    for qualified_name in CAPTURED_FUNCTIONS:
+        original = resolve(qualified_name)
+        recorded = calls.setdefault(qualified_name, [])
+
+        def recorder(*args, _original=original, _recorded=recorded):
+            try:
+                # Only inputs that survive a JSON round trip can be replayed
+                _recorded.append(json.loads(json.dumps(list(args), ensure_ascii=False)))
+            except (TypeError, ValueError):
+                pass
+            return _original(*args)
+
+        functools.update_wrapper(recorder, original)
+        for module_name, module in list(sys.modules.items()):
+            if not module_name.startswith('src') or module is None:
+                continue
+            for attribute, value in list(vars(module).items()):
+                if value is original:
+                    setattr(module, attribute, recorder)
+                    patched.append((module, attribute, original))
+    return patched
+
+
+def capture(pdf_paths, pages='all'):
+    """
+    Run the parsers and collect the captured functions' inputs.
+
+    Args:
+        pdf_paths: Dictionary of parser type -> PDF path
+        pages: Camelot page selection for every PDF
+
+    Returns:
+        Dictionary of 'module:function' -> list of argument lists
+    """
+    from src.parsers import load_parser
+
+    parsers = {parser_type: load_parser(parser_type) for parser_type in pdf_paths}
+    calls = {}
+    patched = _install_recorders(calls)
+    try:
+        for parser_type, pdf_path in pdf_paths.items():
+            print(f"Capturing {parser_type}: {pdf_path}")
+            with redirect_stdout(io.StringIO()):
+                parsers[parser_type].parse_pdf(pdf_path, pages)
+    finally:
+        for module, attribute, original in patched:
+            setattr(module, attribute, original)
+    return calls
+
+
+def main(argv=None):
+    from src.parsers import get_parser_config
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.capture_cells",
+                                     description="Capture inner-function inputs for micro-benchmarks")
+    parser.add_argument("--attendance", default=get_parser_config('attendance')['default_pdf'],
+                        help="Attendance PDF (default: the sample in materials/)")
+    parser.add_argument("--allowance", default=get_parser_config('allowance')['default_pdf'],
+                        help="Allowance PDF (default: the sample in materials/)")
+    parser.add_argument("--pages", default="all", help="Pages to run through each parser")
+    parser.add_argument("-o", "--output", default=str(DEFAULT_FIXTURE), help="Fixture file")
+    args = parser.parse_args(argv)
+
+    from importlib.metadata import version
+
+    pdf_paths = {'attendance': args.attendance, 'allowance': args.allowance}
+    calls = capture(pdf_paths, args.pages)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'format_version': FIXTURE_FORMAT_VERSION,
+            'sources': {parser_type: Path(path).name for parser_type, path in pdf_paths.items()},
+            'pages': args.pages,
+            'camelot': version('camelot-py'),
+            'calls': calls,
+        }, f, ensure_ascii=False, indent=1)
+
+    for qualified_name, function_calls in calls.items():
+        print(f"  {qualified_name}: {len(function_calls)} calls")
+    print(f"Fixture: {output}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Synthetic benchmark corpus
+
+Builds attendance and allowance PDFs of a given number of employees with
+the existing generators (gen_attendance.py, gen_allowance.py) and caches
+them under benchmarks/corpus/. A PDF is reused while its sidecar
+<name>.json matches the requested employees, seed and CORPUS_VERSION;
+bump CORPUS_VERSION when a generator change should invalidate the cache.
+"""
+
+import io
+import json
+import random
+from contextlib import redirect_stdout
+from pathlib import Path
+
+
+CORPUS_VERSION = 1
+
+CORPUS_DIR = Path(__file__).parent / 'corpus'
+
+DEFAULT_SIZES = (40, 300, 3000, 30000)
+DEFAULT_SEED = 20240101
+
+ATTENDANCE_TEMPLATE = 'materials/出勤簿 - shukkinbo - attendance book.pdf'
+ALLOWANCE_TEMPLATE = 'materials/運転手手当一覧表 - Untenshu teate ichiran hyō - Driver Allowance List.pdf'
+
+# Names known to be covered by the allowance template's fonts
+ALLOWANCE_NAMES = 'materials/attendance300.json'
+
+
+def _generate_attendance(path, employees, seed):
+    from gen_attendance import generate_pdf_with_employees
+
+    random.seed(seed)
+    generate_pdf_with_employees(
+        output_path=str(path), num_employees=employees, template_path=ATTENDANCE_TEMPLATE,
+    )
+
+
+def _generate_allowance(path, employees, seed):
+    from gen_allowance import AllowancePDFGenerator, load_employees_from_json
+
+    # The allowance fonts only hold the glyphs of the template's names, so
+    # reuse known names with unique IDs
+    names = [employee['name'] for employee in load_employees_from_json(ALLOWANCE_NAMES)]
+    random.Random(seed).shuffle(names)
+    rows = [{'employee_id': str(100000 + i), 'name': names[i % len(names)]} for i in range(employees)]
+
+    generator = AllowancePDFGenerator(ALLOWANCE_TEMPLATE)
+    try:
+        generator.generate_allowance_pdf(str(path), rows)
+    finally:
+        generator.close()
+
+
+GENERATORS = {
+    'attendance': _generate_attendance,
+    'allowance': _generate_allowance,
+}
+
+
+def corpus_pdf(parser_type, employees, seed=DEFAULT_SEED, corpus_dir=CORPUS_DIR):
+    """
+    Path of a cached corpus PDF, generating it first if needed.
+
+    Args:
+        parser_type: 'attendance' or 'allowance'
+        employees: Number of employees in the document
+        seed: Random seed for the generated names and IDs
+        corpus_dir: Cache folder
+
+    Returns:
+        Path of the PDF
+    """
+    if parser_type not in GENERATORS:
+        raise ValueError(f"Unknown parser type: {parser_type}")
+
+    corpus_dir = Path(corpus_dir)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    path = corpus_dir / f"{parser_type}_{employees}.pdf"
+    meta_path = path.with_suffix('.json')
+    meta = {'corpus_version': CORPUS_VERSION, 'parser': parser_type, 'employees': employees, 'seed': seed}
+
+    if path.exists() and meta_path.exists():
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == meta:
+                return path
+
+    # The generators are chatty; keep their per-row output off the benchmark log
+    with redirect_stdout(io.StringIO()):
+        GENERATORS[parser_type](path, employees, seed)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    return path
@@ -0,0 +1,302 @@
+"""
+Performance regression gate against a committed baseline
+
+    python -m benchmarks.gate                 # compare with benchmarks/baseline.json
+    python -m benchmarks.gate --update        # record a new baseline
+    python -m benchmarks.gate --time-tolerance 0.25
+
+Runs a fixed benchmark set several times: each parser over its sample PDF
+(a fresh process per repeat, as in benchmarks.scaling), the
+micro-benchmarks over the captured cell inputs and the import time of the
+entry points in benchmarks.startup. Throughput, peak RSS, the time of every
+stage, the micro-benchmark results and the import times are compared with
+the samples stored in the baseline.
+
+A metric regresses when its median is worse than the baseline median by
+more than the tolerance, by more than NOISE_SIGMAS times the combined
+spread of the baseline and current samples, and by more than a small
+absolute floor (MIN_STAGE_SECONDS for stage and import times,
+MIN_MEMORY_BYTES for memory). The command then exits with status 1 and
+lists the regressed metrics and stages.
+
+Baselines are machine-specific: record one on the machine that runs the
+gate, with the pinned requirements, and again after an intended
+performance change. The baseline stores the environment it was recorded
+in; the gate refuses to compare when ENVIRONMENT_KEYS differ.
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .micro import run_micro
+from .scaling import run_case, _environment
+from .startup import run_startup
+
+
+BASELINE_FORMAT_VERSION = 1
+
+DEFAULT_BASELINE = Path(__file__).parent / 'baseline.json'
+
+DEFAULT_REPEATS = 5
+
+# Fixed benchmark set: case name -> (parser type, PDF, pages)
+BENCHMARK_SET = {
+    'attendance': ('attendance', 'materials/出勤簿 - shukkinbo - attendance book.pdf', '1-2'),
+    'allowance': ('allowance', 'materials/運転手手当一覧表 - Untenshu teate ichiran hyō - Driver Allowance List.pdf', 'all'),
+}
+
+# Default tolerances, stored in the baseline so the committed file configures the gate.
+# Nanosecond timings move with CPU frequency and cache state between processes,
+# so micro-benchmarks get a wider band than whole extractions. Import times of
+# a fresh interpreter move with the file cache and host load by up to 25%
+# between runs of the same tree.
+DEFAULT_TOLERANCE = {
+    'time': 0.15,
+    'micro': 0.30,
+    'startup': 0.35,
+    'memory': 0.10,
+}
+
+# A change must also exceed this many robust standard deviations of the samples
+NOISE_SIGMAS = 3.0
+
+# Stages faster than this are dominated by timer noise
+MIN_STAGE_SECONDS = 0.005
+
+# Smaller memory changes are allocator rounding
+MIN_MEMORY_BYTES = 64
+
+# Scale from the median absolute deviation to a standard deviation for normal data
+MAD_TO_SIGMA = 1.4826
+
+# Environment fields (see benchmarks.scaling._environment) that must match the baseline's
+ENVIRONMENT_KEYS = ('python', 'cpu_count', 'camelot', 'pandas', 'numpy', 'opencv', 'pypdf', 'pdfminer',
+                    'parser_versions')
+
+
+def _metric_kind(metric):
+    """('time', 'micro', 'startup' or 'memory', True if larger values are worse)"""
+    if metric == 'pages_per_second':
+        return 'time', False
+    if metric == 'ns_per_call':
+        return 'micro', True
+    if metric == 'import_seconds':
+        return 'startup', True
+    if metric in ('peak_rss_bytes', 'alloc_mean_bytes'):
+        return 'memory', True
+    return 'time', True
+
+
+def collect(repeats=DEFAULT_REPEATS, micro=True, startup=True):
+    """
+    Run the benchmark set.
+
+    Args:
+        repeats: Samples per metric
+        micro: Whether to include the micro-benchmarks
+        startup: Whether to include the entry point import times
+
+    Returns:
+        Dictionary of case -> metric -> list of samples. Stage times use
+        'stage:<name>' metrics; micro-benchmarks are 'micro:<function>' cases
+        and entry points 'startup:<entry point>' cases.
+    """
+    spawn = multiprocessing.get_context('spawn')
+    samples = {}
+    for case, (parser_type, pdf_path, pages) in BENCHMARK_SET.items():
+        metrics = samples.setdefault(case, {})
+        print(f"  {case}", flush=True)
+        for _ in range(repeats):
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                result = pool.submit(run_case, parser_type, pdf_path, pages).result()
+            metrics.setdefault('pages_per_second', []).append(result['pages_per_second'])
+            metrics.setdefault('peak_rss_bytes', []).append(result['peak_rss_bytes'])
+            for name, seconds in result['stage_seconds'].items():
+                metrics.setdefault(f"stage:{name}", []).append(seconds)
+
+    if micro:
+        print("  micro-benchmarks", flush=True)
+        for _ in range(repeats):
+            for qualified_name, result in run_micro(repeat=1).items():
+                metrics = samples.setdefault(f"micro:{qualified_name.split(':')[1]}", {})
+                metrics.setdefault('ns_per_call', []).append(result['ns_per_call'])
+                metrics.setdefault('alloc_mean_bytes', []).append(result['alloc_mean_bytes'])
+
+    if startup:
+        print("  start-up", flush=True)
+        for _ in range(repeats):
+            for name, result in run_startup(repeats=1).items():
+                metrics = samples.setdefault(f"startup:{name}", {})
+                metrics.setdefault('import_seconds', []).append(result['import_seconds'])
+    return samples
+
+
+def _spread(values):
+    """Robust standard deviation of the samples (scaled median absolute deviation)"""
+    median = statistics.median(values)
+    return statistics.median(abs(value - median) for value in values) * MAD_TO_SIGMA
+
+
+def compare(baseline, samples, tolerance):
+    """
+    Compare collected samples with the baseline.
+
+    Args:
+        baseline: Baseline dictionary (see save_baseline)
+        samples: Result of collect()
+        tolerance: Dictionary of 'time'/'micro'/'startup'/'memory' -> allowed relative change
+
+    Returns:
+        List of comparison dictionaries, one per metric in both runs
+    """
+    comparisons = []
+    for case, metrics in samples.items():
+        for metric, values in metrics.items():
+            base_values = baseline['samples'].get(case, {}).get(metric)
+            values = [value for value in values if value is not None]
+            if not base_values or not values:
+                continue
+            kind, larger_is_worse = _metric_kind(metric)
+            base, current = statistics.median(base_values), statistics.median(values)
+            worse_by = (current - base) if larger_is_worse else (base - current)
+            noise = (_spread(base_values) ** 2 + _spread(values) ** 2) ** 0.5
+            limit = max(tolerance[kind] * base, NOISE_SIGMAS * noise)
+            if metric.startswith('stage:') or metric == 'import_seconds':
+                limit = max(limit, MIN_STAGE_SECONDS)
+            elif kind == 'memory':
+                limit = max(limit, MIN_MEMORY_BYTES)
+            comparisons.append({
+                'case': case,
+                'metric': metric,
+                'baseline': base,
+                'current': current,
+                'change': (current - base) / base if base else 0.0,
+                'regressed': worse_by > limit,
+            })
+    return comparisons
+
+
+def _format_value(metric, value):
+    if metric.endswith('_bytes'):
+        return f"{value / 2**20:.1f}Mi" if value >= 2**20 else f"{value:.0f}B"
+    if metric.startswith('stage:') or metric == 'import_seconds':
+        return f"{value * 1000:.1f}ms"
+    if metric == 'ns_per_call':
+        return f"{value:.0f}ns"
+    return f"{value:.3f}"
+
+
+def print_comparisons(comparisons):
+    print(f"{'Case':<46} {'Metric':<56} {'Baseline':>10} {'Current':>10} {'Change':>8}")
+    for comparison in comparisons:
+        metric = comparison['metric']
+        flag = "  ✗ REGRESSED" if comparison['regressed'] else ""
+        print(f"{comparison['case']:<46} {metric:<56} {_format_value(metric, comparison['baseline']):>10} "
+              f"{_format_value(metric, comparison['current']):>10} {comparison['change']:>+7.1%}{flag}")
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    with open(path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('format_version') != BASELINE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported baseline format {baseline.get('format_version')} in {path}")
+    return baseline
+
+
+def save_baseline(samples, path=DEFAULT_BASELINE, tolerance=None):
+    """Write the samples as a new baseline, keeping the given tolerances"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'format_version': BASELINE_FORMAT_VERSION,
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            **_environment(),
+            'benchmark_set': {case: {'parser': parser_type, 'pdf': Path(pdf_path).name, 'pages': pages}
+                              for case, (parser_type, pdf_path, pages) in BENCHMARK_SET.items()},
+            'tolerance': tolerance or DEFAULT_TOLERANCE,
+            'samples': samples,
+        }, f, ensure_ascii=False, indent=1)
+
+
+def _environment_changes(baseline):
+    current = _environment()
+    return [
+        f"{key}: {baseline.get(key)} -> {current[key]}"
+        for key in ENVIRONMENT_KEYS
+        if baseline.get(key) != current[key]
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.gate",
+                                     description="Performance regression gate against a stored baseline")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline file")
+    parser.add_argument("--update", action="store_true", help="Record a new baseline instead of comparing")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Samples per metric")
+    parser.add_argument("--time-tolerance", type=float, help="Allowed relative slowdown (default: from baseline)")
+    parser.add_argument("--micro-tolerance", type=float,
+                        help="Allowed relative micro-benchmark slowdown (default: from baseline)")
+    parser.add_argument("--startup-tolerance", type=float,
+                        help="Allowed relative import time slowdown (default: from baseline)")
+    parser.add_argument("--memory-tolerance", type=float, help="Allowed relative memory growth (default: from baseline)")
+    parser.add_argument("--no-micro", action="store_true", help="Skip the micro-benchmarks")
+    parser.add_argument("--no-startup", action="store_true", help="Skip the entry point import times")
+    args = parser.parse_args(argv)
+    if args.repeats < 2:
+        parser.error("--repeats must be at least 2 to estimate noise")
+
+    baseline = None
+    if not args.update:
+        try:
+            baseline = load_baseline(args.baseline)
+        except FileNotFoundError:
+            print(f"✗ No baseline at {args.baseline}; record one with --update")
+            return 2
+        changes = _environment_changes(baseline)
+        if changes:
+            print(f"✗ Environment differs from the baseline at {args.baseline}:")
+            for change in changes:
+                print(f"  {change}")
+            print("Install the pinned requirements, or record a baseline for this environment with --update")
+            return 2
+
+    tolerance = {**DEFAULT_TOLERANCE, **(baseline['tolerance'] if baseline else {})}
+    if args.time_tolerance is not None:
+        tolerance['time'] = args.time_tolerance
+    if args.micro_tolerance is not None:
+        tolerance['micro'] = args.micro_tolerance
+    if args.startup_tolerance is not None:
+        tolerance['startup'] = args.startup_tolerance
+    if args.memory_tolerance is not None:
+        tolerance['memory'] = args.memory_tolerance
+
+    print(f"Running benchmark set ({args.repeats} repeats)...")
+    samples = collect(args.repeats, micro=not args.no_micro, startup=not args.no_startup)
+
+    if args.update:
+        save_baseline(samples, args.baseline, tolerance)
+        print(f"✓ Baseline written: {args.baseline}")
+        return 0
+
+    comparisons = compare(baseline, samples, tolerance)
+    print_comparisons(comparisons)
+
+    regressed = [comparison for comparison in comparisons if comparison['regressed']]
+    print(f"\nTolerance: time {tolerance['time']:.0%}, micro {tolerance['micro']:.0%}, "
+          f"startup {tolerance['startup']:.0%}, memory {tolerance['memory']:.0%}")
+    if not regressed:
+        print("✓ No performance regression")
+        return 0
+    print(f"✗ {len(regressed)} regression(s):")
+    for comparison in regressed:
+        print(f"  {comparison['case']} {comparison['metric']}: {comparison['change']:+.1%}")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Micro-benchmarks of the parsers' inner functions over captured inputs
+
+    python -m benchmarks.micro
+    python -m benchmarks.micro --function clean_number --json micro.json
+
+Replays the argument lists in the fixture written by
+benchmarks.capture_cells through each function in isolation, with no
+camelot or PDF work. For every function it reports:
+
+- ns per call: the best of several timed passes over all captured inputs,
+  with the garbage collector off (as timeit does);
+- allocation: the tracemalloc peak above the starting point during each
+  call, averaged over the inputs and at its largest. This is the memory a
+  call needs at once; allocations freed before a later, larger one are not
+  added up.
+"""
+
+import gc
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+from .capture_cells import DEFAULT_FIXTURE, resolve
+
+
+# Timed passes per function; the fastest one is reported
+DEFAULT_REPEAT = 5
+
+# Each timed pass runs the inputs enough times to take at least this long
+MIN_PASS_SECONDS = 0.05
+
+
+def load_fixture(path=DEFAULT_FIXTURE):
+    """Captured calls: dictionary of 'module:function' -> list of argument lists"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['calls']
+
+
+def _time_pass(fn, calls, loops):
+    started = time.perf_counter_ns()
+    for _ in range(loops):
+        for args in calls:
+            fn(*args)
+    return time.perf_counter_ns() - started
+
+
+def time_per_call(fn, calls, repeat=DEFAULT_REPEAT):
+    """Best nanoseconds per call over several passes through the inputs"""
+    loops = 1
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        # Calibrate: grow the loop count until a pass is long enough to time
+        while _time_pass(fn, calls, loops) < MIN_PASS_SECONDS * 1e9:
+            loops *= 2
+        best = min(_time_pass(fn, calls, loops) for _ in range(repeat))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best / (loops * len(calls))
+
+
+def allocation_per_call(fn, calls):
+    """Mean and largest tracemalloc peak (bytes) above the start of each call"""
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    peaks = []
+    try:
+        for args in calls:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn(*args)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return sum(peaks) / len(peaks), max(peaks)
+
+
+def run_micro(fixture=DEFAULT_FIXTURE, functions=None, repeat=DEFAULT_REPEAT):
+    """
+    Benchmark the captured functions.
+
+    Args:
+        fixture: Fixture file from benchmarks.capture_cells
+        functions: Function names (or 'module:function' names) to run; None for all
+        repeat: Timed passes per function
+
+    Returns:
+        Dictionary of 'module:function' -> {'calls', 'ns_per_call',
+        'alloc_mean_bytes', 'alloc_max_bytes'}
+    """
+    results = {}
+    for qualified_name, calls in load_fixture(fixture).items():
+        short_name = qualified_name.split(':')[1]
+        if functions and short_name not in functions and qualified_name not in functions:
+            continue
+        if not calls:
+            continue
+        fn = resolve(qualified_name)
+        alloc_mean, alloc_max = allocation_per_call(fn, calls)
+        results[qualified_name] = {
+            'calls': len(calls),
+            'ns_per_call': round(time_per_call(fn, calls, repeat), 1),
+            'alloc_mean_bytes': round(alloc_mean, 1),
+            'alloc_max_bytes': alloc_max,
+        }
+    return results
+
+
+def print_results(results):
+    print(f"{'Function':<48} {'Inputs':>7} {'ns/call':>10} {'alloc mean B':>13} {'alloc max B':>12}")
+    for qualified_name, result in results.items():
+        print(f"{qualified_name.split(':')[1]:<48} {result['calls']:>7} {result['ns_per_call']:>10.1f} "
+              f"{result['alloc_mean_bytes']:>13.1f} {result['alloc_max_bytes']:>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.micro",
+                                     description="Micro-benchmarks over captured cell inputs")
+    parser.add_argument("--fixture", default=str(DEFAULT_FIXTURE), help="Fixture from benchmarks.capture_cells")
+    parser.add_argument("--function", action="append", dest="functions",
+                        help="Only this function (repeatable)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed passes per function")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run_micro(args.fixture, args.functions, args.repeat)
+    if not results:
+        print("✗ No captured inputs for the selected functions")
+        return 1
+    print_results(results)
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults: {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Scaling benchmark: both parsers over corpora of growing size
+
+    python -m benchmarks.scaling
+    python -m benchmarks.scaling --sizes 40,300 --parsers allowance
+
+Every case extracts one cached corpus PDF (see benchmarks.corpus) with
+stage timing on, in a freshly spawned process so that its peak RSS belongs
+to that case alone. Results go to a versioned JSON file in
+benchmarks/results/ together with the git commit, library and parser
+versions, so runs can be compared as the code changes.
+
+The attendance parser needs about 3.5 s per page; the 30,000-employee
+attendance book (7,500 pages) takes hours, so pick --sizes to suit.
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import multiprocessing
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .corpus import CORPUS_VERSION, DEFAULT_SIZES, DEFAULT_SEED, corpus_pdf
+
+
+RESULTS_FORMAT_VERSION = 1
+
+RESULTS_DIR = Path(__file__).parent / 'results'
+
+PARSER_TYPES = ('attendance', 'allowance')
+
+
+def run_case(parser_type, pdf_path, pages='all'):
+    """
+    Worker task: extract one PDF with stage timing.
+
+    Args:
+        parser_type: 'attendance' or 'allowance'
+        pdf_path: PDF to extract
+        pages: Camelot page selection
+
+    Returns:
+        Dictionary of measurements
+    """
+    from src import instrument
+    from src.pages import count_pages, parse_page_selection
+    from src.parsers import load_parser
+
+    # Imports and page counting are not part of the measurement
+    parser = load_parser(parser_type)
+    page_count = len(parse_page_selection(pages, count_pages(pdf_path)))
+
+    collector = instrument.start()
+    started = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        records = parser.parse_pdf(pdf_path, pages)
+    seconds = time.perf_counter() - started
+    instrument.stop()
+
+    report = collector.report()
+    return {
+        'pages': page_count,
+        'records': len(records),
+        'seconds': round(seconds, 4),
+        'pages_per_second': round(page_count / seconds, 3),
+        'employees_per_second': round(len(records) / seconds, 3),
+        'peak_rss_bytes': instrument.peak_rss(),
+        'stage_seconds': {name: stage['seconds'] for name, stage in report['stages'].items()},
+        'counts': report['counts'],
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment():
+    from importlib.metadata import version, PackageNotFoundError
+    from src.parsers import load_parser
+
+    def package_version(name):
+        try:
+            return version(name)
+        except PackageNotFoundError:
+            return None
+
+    return {
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': multiprocessing.cpu_count(),
+        'camelot': package_version('camelot-py'),
+        'pandas': package_version('pandas'),
+        'numpy': package_version('numpy'),
+        'opencv': package_version('opencv-python-headless'),
+        'pypdf': package_version('pypdf'),
+        'pdfminer': package_version('pdfminer.six'),
+        'parser_versions': {parser_type: load_parser(parser_type).PARSER_VERSION for parser_type in PARSER_TYPES},
+    }
+
+
+def run_scaling(sizes=DEFAULT_SIZES, parser_types=PARSER_TYPES, seed=DEFAULT_SEED, results_dir=RESULTS_DIR):
+    """
+    Run every parser over every corpus size and save the results.
+
+    Returns:
+        Path of the results file
+    """
+    spawn = multiprocessing.get_context('spawn')
+    results = []
+    print(f"{'Parser':<11} {'Employees':>9} {'Pages':>6} {'Records':>8} {'Seconds':>9} "
+          f"{'Pages/s':>8} {'Empl/s':>8} {'Peak RSS':>9}")
+    for parser_type in parser_types:
+        for employees in sizes:
+            pdf_path = corpus_pdf(parser_type, employees, seed)
+            # A fresh process per case: peak RSS cannot carry over from a larger case
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                result = pool.submit(run_case, parser_type, str(pdf_path)).result()
+            result = {'parser': parser_type, 'employees': employees, **result}
+            results.append(result)
+            print(f"{parser_type:<11} {employees:>9} {result['pages']:>6} {result['records']:>8} "
+                  f"{result['seconds']:>9.2f} {result['pages_per_second']:>8.2f} "
+                  f"{result['employees_per_second']:>8.1f} {(result['peak_rss_bytes'] or 0) / 2**20:>7.0f}Mi")
+
+    environment = _environment()
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    results_path = results_dir / f"scaling-{time.strftime('%Y%m%d-%H%M%S')}-{environment['git_commit'] or 'nogit'}.json"
+    with open(results_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'format_version': RESULTS_FORMAT_VERSION,
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'corpus_version': CORPUS_VERSION,
+            'seed': seed,
+            **environment,
+            'results': results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nResults: {results_path}")
+    return results_path
+
+
+def _int_list(text):
+    return [int(part) for part in text.split(',') if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.scaling", description="Parser scaling benchmark")
+    parser.add_argument("--sizes", type=_int_list, default=list(DEFAULT_SIZES),
+                        help="Comma-separated employee counts (default: 40,300,3000,30000)")
+    parser.add_argument("--parsers", default=",".join(PARSER_TYPES),
+                        help="Comma-separated parser types (default: attendance,allowance)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Corpus random seed")
+    parser.add_argument("-o", "--output", default=str(RESULTS_DIR), help="Results folder")
+    args = parser.parse_args(argv)
+
+    parser_types = [name.strip() for name in args.parsers.split(',') if name.strip()]
+    unknown = [name for name in parser_types if name not in PARSER_TYPES]
+    if unknown:
+        parser.error(f"unknown parser type(s): {', '.join(unknown)}")
+    run_scaling(args.sizes, parser_types, args.seed, args.output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Start-up benchmark: import time per entry point
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeats 10 --json startup.json
+
+Runs every entry point in ENTRY_POINTS in a fresh interpreter with
+python -X importtime and reports the wall time of the whole process and
+the time spent importing. It also lists the heavy libraries (pandas,
+camelot, OpenCV) that were imported. Entry points that only print usage,
+compare JSON files or build PDFs must not import them; if one does, the
+command exits with status 1 and names the module.
+
+The extraction commands are not listed: they need camelot anyway, and
+benchmarks.scaling measures them.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+
+
+DEFAULT_REPEATS = 5
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ('pandas', 'camelot', 'cv2')
+
+# Entry point -> (interpreter arguments, heavy modules it must not import)
+ENTRY_POINTS = {
+    'app.py': (['app.py'], HEAVY_MODULES),
+    'app.py --help': (['app.py', '--help'], HEAVY_MODULES),
+    'app.py attendance --test': (['app.py', 'attendance', '--test'], HEAVY_MODULES),
+    'app.py allowance --test': (['app.py', 'allowance', '--test'], HEAVY_MODULES),
+    'python -m src.attendance.test': (['-m', 'src.attendance.test'], HEAVY_MODULES),
+    'python -m src.allowance.test': (['-m', 'src.allowance.test'], HEAVY_MODULES),
+    'import src.attendance.parser': (['-c', 'import src.attendance.parser'], HEAVY_MODULES),
+    'import src.allowance.parser': (['-c', 'import src.allowance.parser'], HEAVY_MODULES),
+    'import gen_attendance': (['-c', 'import gen_attendance'], HEAVY_MODULES),
+    'import gen_allowance': (['-c', 'import gen_allowance'], HEAVY_MODULES),
+    'import generate_test_pdf': (['-c', 'import generate_test_pdf'], HEAVY_MODULES),
+}
+
+
+def parse_importtime(stderr):
+    """
+    Read python -X importtime output.
+
+    Returns:
+        Tuple of (seconds spent in top-level imports, set of imported module names)
+    """
+    seconds = 0.0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line.split('|', 2)
+        if not cumulative.strip().isdigit():
+            # Header line
+            continue
+        name = name[1:]
+        modules.add(name.strip())
+        # Nested imports are indented; their time is in their parent's cumulative time
+        if not name.startswith(' '):
+            seconds += int(cumulative) / 1e6
+    return seconds, modules
+
+
+def measure(argv):
+    """
+    Run one entry point in a fresh interpreter.
+
+    Returns:
+        Tuple of (wall seconds, import seconds, imported module names)
+    """
+    env = dict(os.environ, PDF_NO_DAEMON='1')
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', *argv], cwd=REPO_ROOT, env=env,
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    wall = time.perf_counter() - started
+    return (wall, *parse_importtime(completed.stderr))
+
+
+def run_startup(repeats=DEFAULT_REPEATS, entry_points=None):
+    """
+    Measure every entry point, keeping the fastest of several runs.
+
+    Args:
+        repeats: Runs per entry point
+        entry_points: Names from ENTRY_POINTS to run; None for all
+
+    Returns:
+        Dictionary of entry point -> {'wall_seconds', 'import_seconds',
+        'modules', 'heavy', 'forbidden'}
+    """
+    results = {}
+    for name, (argv, forbidden) in ENTRY_POINTS.items():
+        if entry_points and name not in entry_points:
+            continue
+        runs = [measure(argv) for _ in range(repeats)]
+        modules = runs[-1][2]
+        heavy = [module for module in HEAVY_MODULES if module in modules]
+        results[name] = {
+            'wall_seconds': round(min(wall for wall, _, _ in runs), 4),
+            'import_seconds': round(min(imports for _, imports, _ in runs), 4),
+            'modules': len(modules),
+            'heavy': heavy,
+            'forbidden': [module for module in heavy if module in forbidden],
+        }
+    return results
+
+
+def print_results(results):
+    print(f"{'Entry point':<32} {'Wall ms':>8} {'Import ms':>10} {'Modules':>8}  Heavy imports")
+    for name, result in results.items():
+        flag = f"  ✗ must not import {', '.join(result['forbidden'])}" if result['forbidden'] else ""
+        print(f"{name:<32} {result['wall_seconds'] * 1000:>8.0f} {result['import_seconds'] * 1000:>10.0f} "
+              f"{result['modules']:>8}  {', '.join(result['heavy']) or '-'}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup",
+                                     description="Import time per entry point")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Runs per entry point")
+    parser.add_argument("--entry", action="append", dest="entry_points", choices=list(ENTRY_POINTS),
+                        help="Only this entry point (repeatable)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run_startup(args.repeats, args.entry_points)
+    print_results(results)
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults: {args.json}")
+
+    if any(result['forbidden'] for result in results.values()):
+        print("\n✗ Heavy libraries imported by entry points that do not need them")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
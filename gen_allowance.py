@@ -14,6 +14,7 @@ Features:
 """
 
 import json
+import logging
 import re
 import sys
 from pathlib import Path
@@ -22,6 +23,10 @@ from typing import Dict, List, Optional
 import pikepdf
 
 
+# Named explicitly: the module also runs as __main__
+log = logging.getLogger('gen_allowance')
+
+
 class AllowancePDFGenerator:
     """Generates allowance test PDFs from a template by duplicating and editing pages."""
     
@@ -227,7 +232,7 @@ class AllowancePDFGenerator:
                         count = result.count(old_cid_hex)
                         result = result.replace(old_cid_hex, new_cid_hex)
                         if count > 0:
-                            print(f"    Replaced ({font_name}): {old_text} → {new_text} ({count} occurrences)")
+                            log.debug("    Replaced (%s): %s → %s (%d occurrences)", font_name, old_text, new_text, count)
                     
                     # For Japanese text, also try pattern with spacing adjustments
                     # Pattern: <XXXX>NUMBER<YYYY>NUMBER<ZZZZ>...
@@ -261,7 +266,8 @@ class AllowancePDFGenerator:
                                 
                                 result = result[:match.start()] + new_match + result[match.end():]
                             
-                            print(f"    Replaced ({font_name}): {old_text} → {new_text} ({len(matches)} occurrences with spacing)")
+                            log.debug("    Replaced (%s): %s → %s (%d occurrences with spacing)",
+                                      font_name, old_text, new_text, len(matches))
         
         return result
     
@@ -334,7 +340,7 @@ class AllowancePDFGenerator:
         # Create pages and fill them with employees
         employee_index = 0
         for page_num in range(pages_needed):
-            print(f"\n  Page {page_num + 1}:")
+            log.debug("\n  Page %d:", page_num + 1)
             
             # Build replacements for this page
             replacements = {}
@@ -361,7 +367,8 @@ class AllowancePDFGenerator:
                 new_name_no_space = name.replace(" ", "")
                 replacements[template_name_no_space] = new_name_no_space
                 
-                print(f"    Row {row_index + 1}: {name} (ID: {employee_id})")
+                log.debug("    Row %d: %s (ID: %s)", row_index + 1, name, employee_id,
+                          extra={'employee_id': employee_id, 'employee_name': name})
                 employee_index += 1
             
             # Create the page with all replacements for this page
@@ -432,6 +439,7 @@ def load_employees_from_json(json_path: str) -> List[Dict[str, str]]:
 def main():
     """Main entry point with CLI support."""
     import argparse
+    from src.log import configure_logging
     
     parser = argparse.ArgumentParser(
         description="Generate driver allowance test PDFs",
@@ -479,8 +487,14 @@ Examples:
         default='materials/運転手手当一覧表 - Untenshu teate ichiran hyō - Driver Allowance List.pdf',
         help='Template PDF path'
     )
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='Log every page, row and replacement'
+    )
     
     args = parser.parse_args()
+    configure_logging('debug' if args.verbose else 'info', loggers=('gen_allowance', 'generate_test_pdf'))
     
     print("=" * 60)
     print("Driver Allowance PDF Test Data Generator")
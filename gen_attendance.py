@@ -283,6 +283,7 @@ def generate_pdf_with_random_employees(
 def main():
     """Main entry point."""
     import argparse
+    from src.log import configure_logging
     
     parser = argparse.ArgumentParser(
         description="Generate test PDFs with employees from random generation or JSON file"
@@ -317,8 +318,14 @@ def main():
         action="store_true",
         help="Only include generated pages (exclude original 8 template pages)"
     )
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Log every page created and every replacement"
+    )
     
     args = parser.parse_args()
+    configure_logging("debug" if args.verbose else "info", loggers=("generate_test_pdf",))
     
     # Set random seed if provided (only for random mode)
     if args.seed and not args.json:
@@ -14,12 +14,17 @@ This tool handles:
 
 import re
 import sys
+import logging
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import pikepdf
 
 
+# Named explicitly: the module also runs as __main__
+log = logging.getLogger('generate_test_pdf')
+
+
 class PDFTestDataGenerator:
     """Generates test PDFs from a template by duplicating and editing pages."""
     
@@ -198,7 +203,7 @@ class PDFTestDataGenerator:
                     count = result.count(old_cid_hex)
                     result = result.replace(old_cid_hex, new_cid_hex)
                     if count > 0:
-                        print(f"  Replaced ({font_name}): {old_text} → {new_text} ({count} occurrences)")
+                        log.debug("  Replaced (%s): %s → %s (%d occurrences)", font_name, old_text, new_text, count)
         
         return result
     
@@ -273,7 +278,7 @@ class PDFTestDataGenerator:
                 # Keep the first set of original pages
                 continue
             
-            print(f"Creating page {i + 1}...")
+            log.debug("Creating page %d...", i + 1)
             self.create_page_with_replacements(
                 output_pdf,
                 template_page_index,
@@ -296,6 +301,9 @@ class PDFTestDataGenerator:
 
 def main():
     """Example usage of the PDF generator with real employee data."""
+    from src.log import configure_logging
+    configure_logging('debug', loggers=('generate_test_pdf',))
+    
     template_path = "materials/出勤簿 - shukkinbo - attendance book.pdf"
     
     print("=== PDF Test Data Generator ===\n")
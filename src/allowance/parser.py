@@ -1,135 +1,211 @@
 """Allowance parser - working logic preserved, just refactored into src/allowance/"""
 
-import camelot
-import pandas as pd
 import re
+import logging
+
+from .. import async_api
+from .. import instrument
+from .. import metrics
+from .. import tracing
+from ..common import is_missing
+from ..pdf_source import as_pdf_input, describe_source
+from .config import get_columns
+
+
+log = logging.getLogger(__name__)
+
+# Bump when a change alters the records produced; invalidates checkpoint journals
+PARSER_VERSION = 1
 
 
 def clean_text(text):
     """Clean text"""
-    if pd.isna(text) or text == '':
+    if is_missing(text) or text == '':
         return ''
     return str(text).strip()
 
 
 def clean_number(text):
     """Extract number"""
-    if pd.isna(text) or text == '':
+    if is_missing(text) or text == '':
         return ''
     text = str(text).replace(',', '').replace(' ', '').strip()
     match = re.search(r'[\d\.]+', text)
     return match.group(0) if match else ''
 
 
-def parse_pdf(pdf_path):
-    """Parse allowance PDF - WORKING LOGIC PRESERVED"""
-    print(f"Extracting from: {pdf_path}")
-    
-    try:
-        tables = camelot.read_pdf(pdf_path, pages='all', flavor='stream')
-        print(f"✓ Used stream method - Found {len(tables)} table(s)")
-    except:
-        tables = camelot.read_pdf(pdf_path, pages='all', flavor='lattice')
-        print(f"✓ Used lattice method - Found {len(tables)} table(s)")
-    
-    # Column mappings
-    cols_37 = ['untenshu', 'sagawa_a', 'sagawa_b', 'sagawa_ba', 'sagawa_bb', 'sagawa_bba', 'sagawa_bbb', 'sagawa_bbba',
-               'rinji_teate', 'chokyori_teate', 'joshu', 'ippan_a', 'ippan_b', 'ippan_ba', 'ippan_bb', 'ippan_bba',
-               'ippan_bbb', 'yontonsha_a', 'yontonsha_b', 'yontonsha_ba', 'yontonsha_bb', 'yontonsha_bba',
-               'yontonsha_bbb', 'yontonsha_bbba', 'sagawa_ippan_b', 'sagawa_ippan_ba', 'sagawa_ippan_bb',
-               'sagawa_ippan_bba', 'juyon_yonhei_b', 'juyon_yonhei_ba', 'juyon_yonhei_bb', 'juronton_yontonhei_bba',
-               'lorry_a', 'lorry_b', 'lorry_ba', 'lorry_bb', 'gokei']
+@instrument.timed('camelot.read')
+def read_tables(pdf_path, pages='all', **camelot_options):
+    """Read tables with stream flavor, falling back to lattice (path, bytes or file-like)"""
+    import camelot
+
+    with as_pdf_input(pdf_path) as pdf_input:
+        if 'flavor' in camelot_options:
+            # Explicit settings (e.g. a cheap retry): one attempt, no fallback
+            tables = camelot.read_pdf(pdf_input, pages=pages, **camelot_options)
+            tracing.annotate(**camelot_options)
+            log.info("✓ Used %s method - Found %d table(s)", camelot_options['flavor'], len(tables))
+            return tables
+        try:
+            tables = camelot.read_pdf(pdf_input, pages=pages, flavor='stream')
+            tracing.annotate(flavor='stream')
+            log.info("✓ Used stream method - Found %d table(s)", len(tables))
+        except Exception:
+            metrics.FLAVOR_FALLBACKS.inc(parser='allowance', from_flavor='stream', to_flavor='lattice')
+            tables = camelot.read_pdf(pdf_input, pages=pages, flavor='lattice')
+            tracing.annotate(flavor='lattice', fallback='stream failed')
+            log.info("✓ Used lattice method - Found %d table(s)", len(tables))
+    return tables
+
+
+def _fill_fields(current, row, cols):
+    """Copy non-empty cells of a row into the current employee record"""
+    for col_idx in range(1, min(len(row), len(cols))):
+        value = clean_text(str(row.iloc[col_idx]))
+        if value and value not in ['', '-', '―', '－']:
+            field = cols[col_idx]
+            if field not in current:
+                num = clean_number(value)
+                current[field] = num if num else value
+
+
+def _finish_employee(employees, current, table, first_row, end_row, index, started=None):
+    """Keep a completed employee record (and its row span) if it has a name"""
+    if current:
+        tracing.record('employee', started, 'employee', employee_id=current.get('shain_id'),
+                       rows=[first_row, end_row])
+    if current and current.get('shimei'):
+        employees.append(current)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("  Extracted: %s (ID: %s)", current.get('shimei'), current.get('shain_id'),
+                      extra={'employee_id': current.get('shain_id'), 'employee_name': current.get('shimei')})
+        if index is not None:
+            index.add(current['shain_id'], int(table.page), table.order, first_row, end_row)
+    elif current:
+        metrics.RECORDS_MISSING.inc(parser='allowance', field='name')
+
+
+@instrument.timed('allowance.row_walk')
+def _walk_rows(table, cols, start_row, end_row, index=None):
+    """Walk table rows, starting a new employee at each ID row"""
+    df = table.df
+    employees = []
+    current = None
+    current_row = None
+    current_started = None
+    for idx in range(start_row, end_row):
+        row = df.iloc[idx]
+        first_col = clean_text(str(row.iloc[0]))
+        
+        # Employee ID
+        if re.match(r'^\d{6}$', first_col):
+            _finish_employee(employees, current, table, current_row, idx, index, current_started)
+            
+            current = {'shain_id': first_col}
+            current_row = idx
+            current_started = tracing.now()
+            _fill_fields(current, row, cols)
+        
+        # Name
+        elif re.search(r'[\u4e00-\u9fff\u3040-\u309f\u30a0-\u30ff]{2,}', first_col):
+            if current:
+                current['shimei'] = first_col
+                _fill_fields(current, row, cols)
+        
+        # More data
+        elif current:
+            _fill_fields(current, row, cols)
     
-    cols_44 = ['untenshu', 'sagawa_a', 'sagawa_b', 'sagawa_ba', 'sagawa_bb', 'sagawa_bba', 'sagawa_bbb', 'sagawa_bbba',
-               'rinji_teate', 'chokyori_teate', 'joshu', 'ippan_a', 'ippan_b', 'ippan_b', 'ippan_ba', 'ippan_ba',
-               'ippan_bb', 'ippan_bb', 'ippan_bba', 'ippan_bbb', 'yontonsha_a', 'yontonsha_b', 'yontonsha_b',
-               'yontonsha_ba', 'yontonsha_ba', 'yontonsha_bb', 'yontonsha_bba', 'yontonsha_bbb', 'yontonsha_bbba',
-               'sagawa_ippan_b', 'sagawa_ippan_ba', 'sagawa_ippan_bb', 'sagawa_ippan_bba', 'juyon_yonhei_b',
-               'juyon_yonhei_ba', 'juyon_yonhei_bb', 'juronton_yontonhei_bba', 'lorry_a', 'lorry_b', 'lorry_b',
-               'lorry_ba', 'lorry_ba', 'lorry_bb', 'gokei']
+    # Last employee
+    _finish_employee(employees, current, table, current_row, end_row, index, current_started)
     
-    all_employees = []
+    return employees
+
+
+def process_table(table, tidx, index=None):
+    """Extract employee records from a single table"""
+    df = table.df
+    cols = get_columns(len(df.columns))
+    log.debug("Processing table %d from page %s, shape: %s, %d-column mapping",
+              tidx + 1, table.page, df.shape, len(cols))
     
-    for tidx, table in enumerate(tables):
-        print(f"\nProcessing table {tidx + 1} from page {table.page}...")
-        df = table.df
-        print(f"Table shape: {df.shape}")
-        
-        # Get columns
-        num_cols = len(df.columns)
-        cols = cols_37 if num_cols == 37 else (cols_44 if num_cols == 44 else cols_37[:num_cols] if num_cols <= 37 else cols_44[:num_cols])
-        print(f"Using {len(cols)}-column mapping")
-        
-        # Find header
-        header_idx = None
+    # Find header
+    header_idx = None
+    with instrument.stage('allowance.header_search'):
         for idx, row in df.iterrows():
-            row_text = ' '.join([clean_text(str(cell)) for cell in row if pd.notna(cell)])
+            row_text = ' '.join([clean_text(str(cell)) for cell in row if not is_missing(cell)])
             if 'A' in row_text and 'B' in row_text and ('BA' in row_text or '手当' in row_text):
                 header_idx = idx
-                print(f"Found header row at index {idx}")
+                log.debug("Found header row at index %s", idx)
                 break
-        
-        if header_idx is None:
-            print("Could not find header row, skipping table")
-            continue
-        
-        # Parse rows
-        current = None
-        for idx in range(header_idx + 1, len(df)):
-            row = df.iloc[idx]
-            first_col = clean_text(str(row.iloc[0]))
-            
-            # Employee ID
-            if re.match(r'^\d{6}$', first_col):
-                if current and current.get('shimei'):
-                    all_employees.append(current)
-                    print(f"  Extracted: {current.get('shimei')} (ID: {current.get('shain_id')})")
-                
-                current = {'shain_id': first_col}
-                for col_idx in range(1, min(len(row), len(cols))):
-                    value = clean_text(str(row.iloc[col_idx]))
-                    if value and value not in ['', '-', '―', '－']:
-                        field = cols[col_idx]
-                        if field not in current:
-                            num = clean_number(value)
-                            current[field] = num if num else value
-            
-            # Name
-            elif re.search(r'[\u4e00-\u9fff\u3040-\u309f\u30a0-\u30ff]{2,}', first_col):
-                if current:
-                    current['shimei'] = first_col
-                    for col_idx in range(1, min(len(row), len(cols))):
-                        value = clean_text(str(row.iloc[col_idx]))
-                        if value and value not in ['', '-', '―', '－']:
-                            field = cols[col_idx]
-                            if field not in current:
-                                num = clean_number(value)
-                                current[field] = num if num else value
-            
-            # More data
-            elif current:
-                for col_idx in range(1, min(len(row), len(cols))):
-                    value = clean_text(str(row.iloc[col_idx]))
-                    if value and value not in ['', '-', '―', '－']:
-                        field = cols[col_idx]
-                        if field not in current:
-                            num = clean_number(value)
-                            current[field] = num if num else value
-        
-        # Last employee
-        if current and current.get('shimei'):
-            all_employees.append(current)
-            print(f"  Extracted: {current.get('shimei')} (ID: {current.get('shain_id')})")
     
-    print(f"\n✓ Extracted {len(all_employees)} employee records")
+    if header_idx is None:
+        log.warning("Could not find header row in table %d from page %s, skipping table", tidx + 1, table.page)
+        return []
+    
+    # Parse rows
+    return _walk_rows(table, cols, header_idx + 1, len(df), index)
+
+
+def extract_employee_rows(table, start_row, end_row):
+    """Extract the employee whose rows span [start_row, end_row) of a table"""
+    return _walk_rows(table, get_columns(len(table.df.columns)), start_row, end_row)
+
+
+def process_tables(tables, index=None):
+    """Yield (page_number, employees) for each already-read table"""
+    seen_pages = set()
+    for tidx, table in enumerate(tables):
+        page_number = int(table.page)
+        if page_number not in seen_pages:
+            seen_pages.add(page_number)
+            metrics.PAGES.inc(parser='allowance')
+        metrics.TABLES.inc(parser='allowance')
+        instrument.count('tables')
+        instrument.count('cells', table.df.size)
+        table_span = tracing.span('table', 'table', page=page_number, table=tidx, shape=table.df.shape)
+        with instrument.page(page_number), table_span, instrument.stage('allowance.process_table'):
+            employees = process_table(table, tidx, index)
+        metrics.EMPLOYEES.inc(len(employees), parser='allowance')
+        instrument.count('employees', len(employees))
+        yield page_number, employees
+
+
+def iter_table_records(pdf_path, pages='all', index=None):
+    """Yield (page_number, employees) for each table in the PDF"""
+    yield from process_tables(read_tables(pdf_path, pages), index)
+
+
+def parse_pdf(pdf_path, pages='all', index=None):
+    """Parse allowance PDF - WORKING LOGIC PRESERVED"""
+    log.info("Extracting from: %s", describe_source(pdf_path))
+    
+    all_employees = []
+    for _, employees in iter_table_records(pdf_path, pages, index):
+        all_employees.extend(employees)
+    
+    log.info("✓ Extracted %d employee records", len(all_employees))
     return all_employees
 
 
+def iter_records_async(pdf_path, pages='all', executor=None, semaphore=None, prefetch=None, index=None):
+    """Async generator of records as pages finish (see src.async_api)"""
+    return async_api.iter_records_async('allowance', pdf_path, pages, executor, semaphore, prefetch, index)
+
+
+async def parse_pdf_async(pdf_path, pages='all', executor=None, semaphore=None, prefetch=None, index=None):
+    """Parse allowance PDF without blocking the event loop (see src.async_api)"""
+    return await async_api.parse_pdf_async('allowance', pdf_path, pages, executor, semaphore, prefetch, index)
+
+
 def main():
     """Main entry point"""
     from pathlib import Path
     from ..common import save_json, save_csv, save_markdown
+    from ..log import configure_logging
     
+    configure_logging()
+
     pdf_path = "materials/運転手手当一覧表 - Untenshu teate ichiran hyō - Driver Allowance List.pdf"
     output_folder = 'output/allowance'
     
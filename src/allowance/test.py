@@ -3,8 +3,7 @@ Test allowance parser output against correct.json
 Usage: python -m src.allowance.test
 """
 
-import json
-from pathlib import Path
+from ..common import find_output, load_json
 
 
 def compare_records(actual, expected):
@@ -45,22 +44,19 @@ def test():
     print("TESTING ALLOWANCE PARSER")
     print("=" * 70 + "\n")
     
-    actual_path = 'output/allowance/driver_allowance.json'
-    expected_path = 'output/allowance/correct.json'
+    actual_path = find_output('output/allowance/driver_allowance.json')
+    expected_path = find_output('output/allowance/correct.json')
     
-    if not Path(actual_path).exists():
+    if not actual_path.exists():
         print(f"❌ Error: {actual_path} not found. Run extraction first.")
         return False
     
-    if not Path(expected_path).exists():
+    if not expected_path.exists():
         print(f"❌ Error: {expected_path} not found.")
         return False
     
-    with open(actual_path, 'r', encoding='utf-8') as f:
-        actual = json.load(f)
-    
-    with open(expected_path, 'r', encoding='utf-8') as f:
-        expected = json.load(f)
+    actual = load_json(actual_path)
+    expected = load_json(expected_path)
     
     print(f"Loaded {len(actual)} actual records")
     print(f"Loaded {len(expected)} expected records\n")
@@ -1,19 +1,20 @@
 """Text utilities for allowance parsing"""
 
-import pandas as pd
 import re
 
+from ..common import is_missing
+
 
 def clean_text(text):
     """Clean text by removing extra whitespace"""
-    if pd.isna(text) or text == '':
+    if is_missing(text) or text == '':
         return ''
     return str(text).strip()
 
 
 def clean_number(text):
     """Extract number from text"""
-    if pd.isna(text) or text == '':
+    if is_missing(text) or text == '':
         return ''
     text = str(text).replace(',', '').replace(' ', '').strip()
     match = re.search(r'[\d\.]+', text)
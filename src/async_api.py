@@ -0,0 +1,100 @@
+"""
+Asyncio entry points for the parsers
+
+The PDF is split into single-page documents (see shared_input) on a
+background thread, and each page is parsed on an executor as soon as it is
+split: the loop's default thread pool, or a ProcessPoolExecutor for real
+parallelism. Records come back to the event
+loop in page order as pages finish. An optional asyncio.Semaphore, shared
+between documents, bounds how many pages are being parsed at once across
+the whole process.
+
+Cancelling the consuming task (or closing the async generator) cancels the
+pages that have not started and removes the split copy of the PDF.
+"""
+
+import os
+import asyncio
+from collections import deque
+
+from .shared_input import SharedPdf, parse_shared_pages
+
+
+async def _parse_page(executor, semaphore, parser_type, shared, page_number):
+    if not shared.ready([page_number]):
+        await asyncio.to_thread(shared.wait, [page_number])
+    handle = shared.handle_for([page_number])
+    loop = asyncio.get_running_loop()
+    if semaphore is None:
+        return await loop.run_in_executor(executor, parse_shared_pages, parser_type, handle, [page_number])
+    async with semaphore:
+        return await loop.run_in_executor(executor, parse_shared_pages, parser_type, handle, [page_number])
+
+
+async def iter_records_async(parser_type, source, pages='all', executor=None, semaphore=None,
+                             prefetch=None, index=None):
+    """
+    Parse a PDF without blocking the event loop, yielding records as pages finish.
+
+    Args:
+        parser_type: 'attendance' or 'allowance'
+        source: Path, bytes, memoryview or binary file-like object
+        pages: Camelot page selection, defaults to every page
+        executor: concurrent.futures executor for parsing (default: the loop's thread pool)
+        semaphore: Optional asyncio.Semaphore limiting pages parsed at once
+        prefetch: Pages of this document submitted ahead (default: CPU count)
+        index: Optional EmployeeIndex that receives each employee's row span
+
+    Yields:
+        Employee records, in page order
+    """
+    prefetch = prefetch or os.cpu_count() or 1
+    # Reads the page tree only; pages are split behind the parsing
+    shared = await asyncio.to_thread(SharedPdf.create, source, None, pages, True)
+    pending = deque()
+
+    try:
+        page_numbers = deque(shared.page_numbers)
+
+        def submit_next():
+            page_number = page_numbers.popleft()
+            task = asyncio.ensure_future(
+                _parse_page(executor, semaphore, parser_type, shared, page_number)
+            )
+            # Pages abandoned after an error or cancellation must not log "never retrieved"
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            pending.append(task)
+
+        while page_numbers and len(pending) < prefetch:
+            submit_next()
+
+        while pending:
+            page_records, employees = await pending.popleft()
+            if page_numbers:
+                submit_next()
+            if index is not None:
+                index.update(employees)
+            for _, records in page_records:
+                for record in records:
+                    yield record
+    finally:
+        for task in pending:
+            task.cancel()
+        shared.close()
+
+
+async def parse_pdf_async(parser_type, source, pages='all', executor=None, semaphore=None,
+                          prefetch=None, index=None):
+    """
+    Async counterpart of parse_pdf.
+
+    Takes the same arguments as iter_records_async.
+
+    Returns:
+        List of employee records
+    """
+    records = iter_records_async(parser_type, source, pages, executor, semaphore, prefetch, index)
+    try:
+        return [record async for record in records]
+    finally:
+        await records.aclose()
@@ -4,6 +4,8 @@ Employee extraction for attendance parser
 
 import re
 
+from ...instrument import timed
+
 
 # Keywords to exclude when extracting employee names
 # These are attendance status markers, not name components
@@ -50,6 +52,7 @@ def _scan_row_for_employee_id(table_dataframe, row_index):
     return None
 
 
+@timed('attendance.find_employee_rows_in_table')
 def find_employee_rows_in_table(table_dataframe):
     """
     Locate all employee records in a table by searching for 6-digit employee IDs.
@@ -3,12 +3,13 @@ Number extraction utilities for attendance parser
 """
 
 import re
-import pandas as pd
+
+from ...common import is_missing
 
 
 def extract_all_numbers(text):
     """Extract all integers from text, removing commas and spaces"""
-    if not text or pd.isna(text):
+    if not text or is_missing(text):
         return []
     text_str = str(text).replace(',', '').replace(' ', '')
     numbers = re.findall(r'\d+', text_str)
@@ -3,15 +3,24 @@ Salary field extraction for attendance parser
 """
 
 import re
+import logging
+
+from ... import tracing
+from ...instrument import timed
 from .numbers import extract_all_numbers, is_spaced_digit_garbage, extract_count_from_spaced_garbage
 
 
+log = logging.getLogger(__name__)
+
 FIELD_LABELS = [
     "基 本 給", "基本給", "保障残業", "乗車手当", "佐川割増手当",
     "ダブル手当", "臨時手当", "夜勤手当", "休日手当", "長距離手当",
     "その他", "計", "稼働時間"
 ]
 
+# Column holding the salary labels in tables without day columns
+SALARY_COLUMN = 6
+
 # Fields that require special garbage pattern handling
 FIELDS_WITH_GARBAGE_PATTERNS = ['長距離手当', 'その他', '休日手当']
 
@@ -190,9 +199,16 @@ def extract_salary_field_from_rows(rows_data, field_label):
     Returns:
         Dictionary with 'count' and 'amount' keys
     """
+    with tracing.span('field', 'field', field=field_label):
+        return _extract_field_from_rows(rows_data, field_label)
+
+
+def _extract_field_from_rows(rows_data, field_label):
+    """extract_salary_field_from_rows without the trace span"""
     # Find the row containing this field
     row_with_field = _find_field_in_rows(rows_data, field_label)
     if row_with_field is None:
+        tracing.annotate(strategy='not found')
         return {'count': 0, 'amount': 0}
     
     # Handle fields with special garbage patterns
@@ -204,9 +220,11 @@ def extract_salary_field_from_rows(rows_data, field_label):
         
         result = _extract_special_field_result(field_label, all_nums, garbage_count)
         if result is not None:
+            tracing.annotate(strategy='garbage pattern', garbage_count=garbage_count)
             return result
     
     # Standard extraction for other fields
+    tracing.annotate(strategy='standard')
     all_nums = extract_all_numbers(row_with_field)
     return _extract_standard_field_result(all_nums)
 
@@ -307,7 +325,7 @@ def extract_salary_field(col6_text, field_label):
         return _extract_standard_field_result(numbers)
         
     except Exception as exception:
-        print(f"  Error extracting {field_label}: {exception}")
+        log.warning("  Error extracting %s: %s", field_label, exception, extra={'field': field_label})
         return {'count': 0, 'amount': 0}
 
 
@@ -373,11 +391,40 @@ def extract_all_salary_field_components(salary_column_rows):
     }
 
 
+def find_salary_column(table_dataframe, employee_start_row_index, employee_end_row_index):
+    """
+    Find the column holding the salary labels in an employee's rows.
+    
+    Tables with one column per day of the month put the labels after the
+    day columns, with each count and amount in its own cell to the right;
+    narrower tables hold label, count and amount in one cell of column 6.
+    
+    Args:
+        table_dataframe: DataFrame from the table
+        employee_start_row_index: Starting row index for this employee
+        employee_end_row_index: Ending row index for this employee
+    
+    Returns:
+        Index of the column holding 稼働時間, or None if no cell does
+    """
+    employee_rows = table_dataframe.iloc[employee_start_row_index:employee_end_row_index]
+    for row in employee_rows.itertuples(index=False):
+        for column_index, cell_content in enumerate(row):
+            if '稼働時間' in str(cell_content):
+                return column_index
+    return None
+
+
+@timed('attendance.extract_column6_salary_data')
 def extract_column6_salary_data(table_dataframe, employee_start_row_index, employee_end_row_index):
     """
-    Extract all salary data from column 6 for an employee.
+    Extract all salary data from the salary column for an employee.
     
-    Column 6 contains structured salary information across multiple rows.
+    The salary column contains structured salary information across multiple
+    rows. In tables with day columns find_salary_column locates it after them
+    and the count and amount cells to its right are joined to each row's
+    label, one line per cell; otherwise column 6 is read alone, since the
+    columns right of it hold unrelated data.
     We preserve the row-by-row structure to properly parse different field formats.
     Also extracts working hours (稼働時間) which appears in this column.
     
@@ -391,10 +438,18 @@ def extract_column6_salary_data(table_dataframe, employee_start_row_index, emplo
     """
     extracted_working_hours = ""
     extracted_salary_rows = []
+    found_column_index = find_salary_column(table_dataframe, employee_start_row_index, employee_end_row_index)
+    # Only labels found after the day columns have their values in separate cells
+    joins_value_cells = found_column_index is not None and found_column_index > SALARY_COLUMN
+    salary_column_index = found_column_index if joins_value_cells else SALARY_COLUMN
     
-    # Scan column 6 from employee start to end row
+    # Scan the salary column from employee start to end row
     for row_index in range(employee_start_row_index, min(employee_end_row_index, len(table_dataframe))):
-        column6_cell_content = str(table_dataframe.iloc[row_index, 6])
+        if joins_value_cells:
+            row_cells = table_dataframe.iloc[row_index, salary_column_index:]
+            column6_cell_content = '\n'.join(str(cell) for cell in row_cells if str(cell))
+        else:
+            column6_cell_content = str(table_dataframe.iloc[row_index, salary_column_index])
         extracted_salary_rows.append(column6_cell_content)
         
         # Look for working hours (時:分 format)
@@ -406,6 +461,7 @@ def extract_column6_salary_data(table_dataframe, employee_start_row_index, emplo
     return extracted_salary_rows, extracted_working_hours
 
 
+@timed('attendance.extract_all_salary_field_components')
 def extract_all_salary_field_components(salary_column_rows):
     """
     Extract all salary components from column 6 rows.
@@ -4,6 +4,7 @@ from .validation import validate_pdf_tables
 from .table import process_table
 from .employee import (
     process_employee_in_table,
+    process_employee_rows,
     build_employee_record,
 )
 from .extraction import extract_attendance_and_salary_data
@@ -18,6 +19,7 @@ __all__ = [
     'determine_employee_data_range',
     'process_table',
     'process_employee_in_table',
+    'process_employee_rows',
     'build_employee_record',
     'extract_attendance_and_salary_data',
 ]
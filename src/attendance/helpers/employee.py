@@ -1,5 +1,9 @@
 """Employee record helpers for PDF parsing"""
 
+import logging
+
+from ... import metrics
+from ... import tracing
 from ..extract import (
     extract_employee_id_and_name,
     extract_column6_salary_data,
@@ -8,6 +12,9 @@ from .utils import table_has_salary_column, determine_employee_data_range
 from .extraction import extract_attendance_and_salary_data
 
 
+log = logging.getLogger(__name__)
+
+
 def process_employee_in_table(
     table_dataframe, employee_sequence_index, employee_row_index, employee_row_indices
 ):
@@ -20,33 +27,58 @@ def process_employee_in_table(
         employee_row_index: Row index of this employee
         employee_row_indices: All employee row indices
 
+    Returns:
+        Employee record dictionary or None if employee should be skipped
+    """
+    # Determine data range for this employee
+    employee_data_start_row_index, employee_data_end_row_index = (
+        determine_employee_data_range(
+            employee_sequence_index,
+            employee_row_index,
+            employee_row_indices,
+            table_dataframe,
+        )
+    )
+
+    return process_employee_rows(
+        table_dataframe, employee_data_start_row_index, employee_data_end_row_index
+    )
+
+
+def process_employee_rows(
+    table_dataframe, employee_data_start_row_index, employee_data_end_row_index
+):
+    """
+    Process the employee whose rows span a known range of a table.
+
+    Args:
+        table_dataframe: DataFrame from the table
+        employee_data_start_row_index: Row holding the employee ID
+        employee_data_end_row_index: First row after this employee's data
+
     Returns:
         Employee record dictionary or None if employee should be skipped
     """
     # Extract basic employee info
     employee_id, employee_name = extract_employee_id_and_name(
-        table_dataframe, employee_row_index
+        table_dataframe, employee_data_start_row_index
     )
 
+    tracing.annotate(employee_id=employee_id)
     if not employee_id:
+        metrics.RECORDS_MISSING.inc(parser='attendance', field='id')
         return None
+    if not employee_name:
+        metrics.RECORDS_MISSING.inc(parser='attendance', field='name')
 
-    print(f"    Employee: {employee_id} - {employee_name}")
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("    Employee: %s - %s", employee_id, employee_name,
+                  extra={'employee_id': employee_id, 'employee_name': employee_name})
 
     # Ensure table has salary data column
     if not table_has_salary_column(table_dataframe):
         return None
 
-    # Determine data range for this employee
-    employee_data_start_row_index, employee_data_end_row_index = (
-        determine_employee_data_range(
-            employee_sequence_index,
-            employee_row_index,
-            employee_row_indices,
-            table_dataframe,
-        )
-    )
-
     # Extract column 6 salary data for this employee
     extracted_salary_rows, extracted_working_hours = extract_column6_salary_data(
         table_dataframe, employee_data_start_row_index, employee_data_end_row_index
@@ -1,10 +1,17 @@
 """Table-level helpers for PDF parsing"""
 
+import logging
+
+from ... import tracing
 from ..extract import find_employee_rows_in_table
-from .employee import process_employee_in_table
+from .employee import process_employee_rows
+from .utils import determine_employee_data_range
+
+
+log = logging.getLogger(__name__)
 
 
-def process_table(table_object, table_sequence_index, total_tables):
+def process_table(table_object, table_sequence_index, total_tables, index=None):
     """
     Process all employees in a single table.
     
@@ -12,26 +19,39 @@ def process_table(table_object, table_sequence_index, total_tables):
         table_object: Camelot table object
         table_sequence_index: Position in table list
         total_tables: Total number of tables
+        index: Optional EmployeeIndex that receives each employee's row span
     
     Returns:
         List of employee records from this table
     """
     table_dataframe = table_object.df
-    print(f"Processing table {table_sequence_index + 1}/{total_tables}, shape: {table_dataframe.shape}")
+    log.debug("Processing table %d/%d, shape: %s", table_sequence_index + 1, total_tables, table_dataframe.shape)
     
     # Find all employee records in this table
     employee_row_indices = find_employee_rows_in_table(table_dataframe)
-    print(f"  Found {len(employee_row_indices)} employees at rows: {employee_row_indices}")
+    log.debug("  Found %d employees at rows: %s", len(employee_row_indices), employee_row_indices)
     
     table_employee_records = []
     
     # Process each employee in the table
     for employee_sequence_index, employee_row_index in enumerate(employee_row_indices):
-        employee_record = process_employee_in_table(
-            table_dataframe, employee_sequence_index, employee_row_index, employee_row_indices
+        employee_data_start_row_index, employee_data_end_row_index = determine_employee_data_range(
+            employee_sequence_index, employee_row_index, employee_row_indices, table_dataframe
         )
+        with tracing.span('employee', 'employee', rows=[employee_data_start_row_index, employee_data_end_row_index]):
+            employee_record = process_employee_rows(
+                table_dataframe, employee_data_start_row_index, employee_data_end_row_index
+            )
         
         if employee_record is not None:
             table_employee_records.append(employee_record)
+            if index is not None:
+                index.add(
+                    employee_record['employee_id'],
+                    int(table_object.page),
+                    table_object.order,
+                    employee_data_start_row_index,
+                    employee_data_end_row_index,
+                )
     
     return table_employee_records
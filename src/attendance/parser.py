@@ -8,18 +8,119 @@ to perform specific extraction tasks.
 PDF structure:
 - Multiple tables (one per day)
 - Each table has 4 employees at fixed row positions
-- Employee IDs in columns 0-2, salary data in column 6
+- Employee IDs in columns 0-2, salary labels in the column after the day
+  columns (column 6 in tables without them), values to their right
 """
 
-import camelot
-
+from .. import async_api
+from .. import instrument
+from .. import metrics
+from .. import tracing
+from ..pdf_source import as_pdf_input
 from .helpers import (
     validate_pdf_tables,
     process_table,
+    process_employee_rows,
 )
 
 
-def parse_pdf(pdf_path):
+# Bump when a change alters the records produced; invalidates checkpoint journals
+PARSER_VERSION = 2
+
+
+@instrument.timed('camelot.read')
+def read_tables(pdf_path, pages='all', **camelot_options):
+    """
+    Read the attendance tables of a PDF.
+    
+    Args:
+        pdf_path: Path, bytes, memoryview or binary file-like object
+        pages: Camelot page selection ('all', '3', '1-4,7', ...)
+        **camelot_options: Overrides for camelot.read_pdf (e.g. resolution)
+    
+    Returns:
+        Camelot TableList
+    """
+    import camelot
+
+    # Extract tables from PDF using lattice flavor for structured data
+    options = {'flavor': 'lattice', **camelot_options}
+    tracing.annotate(**options)
+    with as_pdf_input(pdf_path) as pdf_input:
+        return camelot.read_pdf(pdf_input, pages=pages, **options)
+
+
+def process_tables(extracted_pdf_tables, index=None):
+    """
+    Process already-read tables one at a time.
+    
+    Args:
+        extracted_pdf_tables: Camelot TableList (or list of tables)
+        index: Optional EmployeeIndex that receives each employee's row span
+    
+    Yields:
+        Tuple of (page_number, table_employee_records)
+    """
+    seen_pages = set()
+    # Process each table in the PDF
+    for table_sequence_index, table_object in enumerate(extracted_pdf_tables):
+        page_number = int(table_object.page)
+        if page_number not in seen_pages:
+            seen_pages.add(page_number)
+            metrics.PAGES.inc(parser='attendance')
+        metrics.TABLES.inc(parser='attendance')
+        instrument.count('tables')
+        instrument.count('cells', table_object.df.size)
+        table_span = tracing.span('table', 'table', page=page_number, table=table_sequence_index,
+                                  shape=table_object.df.shape)
+        with instrument.page(page_number), table_span, instrument.stage('attendance.process_table'):
+            table_employee_records = process_table(
+                table_object, table_sequence_index, len(extracted_pdf_tables), index
+            )
+        metrics.EMPLOYEES.inc(len(table_employee_records), parser='attendance')
+        instrument.count('employees', len(table_employee_records))
+        yield page_number, table_employee_records
+
+
+def iter_table_records(pdf_path, pages='all', index=None):
+    """
+    Parse PDF tables one at a time, yielding the records of each table.
+    
+    Args:
+        pdf_path: Path, bytes, memoryview or binary file-like object
+        pages: Camelot page selection ('all', '3', '1-4,7', ...)
+        index: Optional EmployeeIndex that receives each employee's row span
+    
+    Yields:
+        Tuple of (page_number, table_employee_records)
+    """
+    extracted_pdf_tables = read_tables(pdf_path, pages)
+    
+    # Validate extraction was successful
+    validate_pdf_tables(extracted_pdf_tables)
+    
+    yield from process_tables(extracted_pdf_tables, index)
+
+
+def extract_employee_rows(table_object, start_row_index, end_row_index):
+    """
+    Extract the employee whose data spans known rows of a table.
+    
+    Used by index lookups, which already know where an employee sits.
+    
+    Args:
+        table_object: Camelot table object
+        start_row_index: Row holding the employee ID
+        end_row_index: First row after the employee's data
+    
+    Returns:
+        List with the employee record, or an empty list
+    """
+    employee_record = process_employee_rows(table_object.df, start_row_index, end_row_index)
+    return [employee_record] if employee_record is not None else []
+
+
+def parse_pdf(pdf_path, pages='all', index=None):
     """
     Parse PDF and extract all employee attendance and salary records.
     
@@ -31,25 +132,49 @@ def parse_pdf(pdf_path):
     4. Assemble complete employee records
     
     Args:
-        pdf_path: Path to the attendance PDF file
+        pdf_path: Path to the attendance PDF file, or its contents as bytes,
+            memoryview or a binary file-like object
+        pages: Camelot page selection, defaults to every page
+        index: Optional EmployeeIndex that receives each employee's row span
     
     Returns:
         List of employee records, each containing ID, name, attendance counts,
         and salary components (count and amount for each field)
     """
-    # Extract tables from PDF using lattice flavor for structured data
-    extracted_pdf_tables = camelot.read_pdf(pdf_path, pages='all', flavor='lattice')
-    
-    # Validate extraction was successful
-    validate_pdf_tables(extracted_pdf_tables)
-    
     all_employee_records = []
     
-    # Process each table in the PDF
-    for table_sequence_index, table_object in enumerate(extracted_pdf_tables):
-        table_employee_records = process_table(
-            table_object, table_sequence_index, len(extracted_pdf_tables)
-        )
+    for _, table_employee_records in iter_table_records(pdf_path, pages, index):
         all_employee_records.extend(table_employee_records)
     
     return all_employee_records
+
+
+def iter_records_async(pdf_path, pages='all', executor=None, semaphore=None, prefetch=None, index=None):
+    """
+    Async generator of employee records, yielded as pages finish.
+    
+    Pages are parsed on the executor (default: the loop's thread pool); see
+    src.async_api for the cancellation and concurrency details.
+    
+    Args:
+        pdf_path: Path, bytes, memoryview or binary file-like object
+        pages: Camelot page selection, defaults to every page
+        executor: concurrent.futures executor that parses the pages
+        semaphore: Optional asyncio.Semaphore limiting pages parsed at once
+        prefetch: Pages submitted ahead of the one being consumed
+        index: Optional EmployeeIndex that receives each employee's row span
+    
+    Returns:
+        Async iterator of employee records in page order
+    """
+    return async_api.iter_records_async('attendance', pdf_path, pages, executor, semaphore, prefetch, index)
+
+
+async def parse_pdf_async(pdf_path, pages='all', executor=None, semaphore=None, prefetch=None, index=None):
+    """
+    Async counterpart of parse_pdf; takes the same arguments as iter_records_async.
+    
+    Returns:
+        List of employee records
+    """
+    return await async_api.parse_pdf_async('attendance', pdf_path, pages, executor, semaphore, prefetch, index)
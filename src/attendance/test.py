@@ -3,8 +3,7 @@ Test attendance parser output against correct.json
 Usage: python -m src.attendance.test
 """
 
-import json
-from pathlib import Path
+from ..common import find_output, load_json
 
 
 def compare_records(actual, expected):
@@ -45,22 +44,19 @@ def test():
     print("TESTING ATTENDANCE PARSER")
     print("=" * 70 + "\n")
     
-    actual_path = 'output/attendance/attendance_records.json'
-    expected_path = 'output/attendance/correct.json'
+    actual_path = find_output('output/attendance/attendance_records.json')
+    expected_path = find_output('output/attendance/correct.json')
     
-    if not Path(actual_path).exists():
+    if not actual_path.exists():
         print(f"❌ Error: {actual_path} not found. Run extraction first.")
         return False
     
-    if not Path(expected_path).exists():
+    if not expected_path.exists():
         print(f"❌ Error: {expected_path} not found.")
         return False
     
-    with open(actual_path, 'r', encoding='utf-8') as f:
-        actual = json.load(f)
-    
-    with open(expected_path, 'r', encoding='utf-8') as f:
-        expected = json.load(f)
+    actual = load_json(actual_path)
+    expected = load_json(expected_path)
     
     print(f"Loaded {len(actual)} actual records")
     print(f"Loaded {len(expected)} expected records\n")
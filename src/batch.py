@@ -0,0 +1,306 @@
+"""
+Batch extraction over directories and globs
+
+Page counts are read up front (pypdf, no camelot) and turned into work
+units of roughly equal estimated cost: large files are split into page
+ranges and small files are packed together. Units are submitted to a
+process pool longest first (LPT), so the last units to start are the
+short ones and the batch finishes close to total work / workers.
+
+Each input gets its own output folder, <output>/<file stem>/, written as
+soon as all of that file's units are done. A unit that fails marks its
+files failed in the summary; the rest of the batch carries on.
+
+With a trace path, each file is traced with probability trace_sample and
+the spans of all traced files, one document span per file (per unit part
+with lpt), are saved in one Chrome trace file (see src.tracing), so a slow
+file and the page or employee that made it slow show up side by side.
+"""
+
+import os
+import glob
+import math
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from . import tracing
+from .common import write_outputs
+from .pages import count_pages, chunk_pages, format_pages
+from .parsers import get_parser_config, load_parser, parser_for_filename
+from .scheduler import FairScheduler
+
+
+# One file's pages within a work unit
+WorkItem = namedtuple('WorkItem', ['path', 'parser_type', 'pages', 'cost'])
+
+# Units per worker to aim for; more units smooth out estimate errors
+UNITS_PER_WORKER = 3
+
+
+def collect_inputs(patterns):
+    """
+    Expand directories, globs and file paths into a sorted list of PDFs.
+
+    Directories contribute the PDFs directly inside them.
+    """
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.update(str(path) for path in Path(pattern).iterdir()
+                         if path.is_file() and path.suffix.lower() == '.pdf')
+        elif glob.has_magic(pattern):
+            paths.update(path for path in glob.glob(pattern, recursive=True)
+                         if path.lower().endswith('.pdf'))
+        elif os.path.isfile(pattern):
+            paths.add(pattern)
+        else:
+            raise ValueError(f"No such file or directory: {pattern}")
+    return sorted(paths)
+
+
+def plan_units(files, workers):
+    """
+    Split large files and pack small ones into units of similar cost.
+
+    Args:
+        files: List of (path, parser_type, page_count)
+        workers: Number of worker processes
+
+    Returns:
+        List of units (each a list of WorkItem), most expensive first
+    """
+    page_costs = {path: get_parser_config(parser_type)['page_cost'] for path, parser_type, _ in files}
+    total_cost = sum(page_costs[path] * page_count for path, _, page_count in files)
+    target_cost = total_cost / max(workers * UNITS_PER_WORKER, 1)
+
+    units = []
+    small_items = []
+    for path, parser_type, page_count in files:
+        page_cost = page_costs[path]
+        pages_per_unit = max(1, math.floor(target_cost / page_cost)) if target_cost else page_count
+        if page_count > pages_per_unit:
+            for chunk in chunk_pages(list(range(1, page_count + 1)), pages_per_unit):
+                units.append([WorkItem(path, parser_type, format_pages(chunk), len(chunk) * page_cost)])
+        elif page_count:
+            small_items.append(WorkItem(path, parser_type, 'all', page_count * page_cost))
+
+    # First-fit decreasing: fill each bundle up to the target cost
+    bundles = []
+    for item in sorted(small_items, key=lambda item: item.cost, reverse=True):
+        for bundle in bundles:
+            if bundle['cost'] + item.cost <= target_cost:
+                bundle['items'].append(item)
+                bundle['cost'] += item.cost
+                break
+        else:
+            bundles.append({'items': [item], 'cost': item.cost})
+    units.extend(bundle['items'] for bundle in bundles)
+
+    return sorted(units, key=unit_cost, reverse=True)
+
+
+def unit_cost(unit):
+    """Estimated cost of a work unit"""
+    return sum(item.cost for item in unit)
+
+
+def extract_unit(unit, traced=()):
+    """
+    Worker task: extract every item of a unit.
+
+    Pages without tables contribute no records, so a page range of a larger
+    book is never rejected for being empty.
+
+    Args:
+        unit: List of WorkItem
+        traced: Paths whose items are traced
+
+    Returns:
+        Tuple of ([(path, page_records, error), ...], seconds spent, trace
+        events); error is None, or the message of the item's exception
+    """
+    started = time.time()
+    results = []
+    trace_events = []
+    for item in unit:
+        parser = load_parser(item.parser_type)
+        with tracing.recording(item.path in traced) as recorder:
+            try:
+                tables = parser.read_tables(item.path, item.pages)
+                results.append((item.path, list(parser.process_tables(tables)), None))
+            except Exception as e:
+                # Other files packed into this unit still get their records
+                results.append((item.path, [], str(e) or type(e).__name__))
+        if recorder is not None:
+            recorder.finish(path=item.path, parser=item.parser_type, pages=item.pages)
+            trace_events.extend(recorder.events)
+    return results, time.time() - started, trace_events
+
+
+def _output_folders(paths, output_root):
+    """Output folder per input, numbering stems that occur more than once"""
+    folders = {}
+    used = set()
+    for path in paths:
+        stem = Path(path).stem
+        name, n = stem, 2
+        while name in used:
+            name, n = f"{stem}-{n}", n + 1
+        used.add(name)
+        folders[path] = Path(output_root) / name
+    return folders
+
+
+def _run_lpt(files, workers, file_done, trace=None, traced=()):
+    """
+    Run packed units longest first; returns the busy seconds.
+
+    file_done(path, page_records, error) is called once per file, when its
+    last unit has finished; error is the first failure among its units.
+    """
+    units = plan_units(files, workers)
+    print(f"{len(units)} work units, longest first")
+
+    remaining = Counter(item.path for unit in units for item in unit)
+    page_records = {path: [] for path, _, _ in files}
+    errors = {}
+    for path, _, _ in files:
+        if not remaining[path]:
+            # No pages, so no units
+            file_done(path, page_records.pop(path), None)
+
+    busy_seconds = 0.0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Submission order is the order idle workers pick units up: longest first
+        futures = {
+            pool.submit(extract_unit, unit, [item.path for item in unit if item.path in traced]): unit
+            for unit in units
+        }
+        for future in as_completed(futures):
+            try:
+                results, seconds, trace_events = future.result()
+            except Exception as e:
+                # e.g. BrokenProcessPool: every file of the unit failed
+                error = str(e) or type(e).__name__
+                results, seconds, trace_events = [(item.path, [], error) for item in futures[future]], 0.0, []
+            busy_seconds += seconds
+            if trace is not None:
+                trace.merge(trace_events)
+            for path, records, error in results:
+                page_records[path].extend(records)
+                if error is not None:
+                    errors.setdefault(path, error)
+                remaining[path] -= 1
+                if not remaining[path]:
+                    file_done(path, page_records.pop(path), errors.get(path))
+    return busy_seconds
+
+
+def _run_fair(files, workers, file_done, trace=None, traced=()):
+    """Run every file as a job on the fair scheduler; small files finish early"""
+    busy_seconds = 0.0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        scheduler = FairScheduler(pool, workers)
+        jobs = [(path, scheduler.submit(file_parser, path, trace=path in traced)) for path, file_parser, _ in files]
+        for path, job in jobs:
+            try:
+                file_done(path, job.result(), None)
+            except Exception as e:
+                file_done(path, [], str(e) or type(e).__name__)
+            if job.trace is not None and trace is not None:
+                trace.merge(job.trace.events)
+            stats = job.stats()
+            busy_seconds += stats['service_seconds']
+            print(f"  {Path(path).name}: waited {stats['queue_seconds']:.2f}s, "
+                  f"service {stats['service_seconds']:.2f}s, done after {stats['total_seconds']:.2f}s")
+    return busy_seconds
+
+
+def run_batch(patterns, parser_type=None, output_root='output/batch', workers=None, compression=None,
+              schedule='lpt', trace_path=None, trace_sample=1.0):
+    """
+    Extract many PDFs on one process pool.
+
+    Args:
+        patterns: Directories, globs or PDF paths
+        parser_type: 'attendance' or 'allowance' for every file, or None to route by file name
+        output_root: Root of the per-file output folders
+        workers: Worker processes (default: CPU count)
+        compression: None, 'gzip' or 'xz'
+        schedule: 'lpt' to finish the whole batch soonest, 'fair' to interleave
+            files so small ones finish early (see scheduler.FairScheduler)
+        trace_path: Save the traced files' spans to this Chrome trace file
+        trace_sample: With trace_path, fraction of files to trace
+
+    Returns:
+        Dictionary of path -> record count, None for a file that failed
+    """
+    workers = workers or os.cpu_count() or 1
+    paths = collect_inputs(patterns)
+    if not paths:
+        print("✗ No PDFs found")
+        return {}
+
+    files = []
+    counts = {}
+    for path in paths:
+        file_parser = parser_type or parser_for_filename(path)
+        if file_parser is None:
+            print(f"✗ {path}: cannot tell which parser to use, skipped (pass --parser)")
+            continue
+        try:
+            page_count = count_pages(path)
+        except Exception as e:
+            # Unreadable or corrupt: fail this file, not the batch
+            counts[path] = None
+            print(f"✗ {path}: failed: {e}")
+            continue
+        files.append((path, file_parser, page_count))
+
+    total_pages = sum(page_count for _, _, page_count in files)
+    print(f"{len(files)} files, {total_pages} pages on {workers} workers")
+
+    trace = tracing.Recorder() if trace_path else None
+    traced = {path for path, _, _ in files if trace_path and tracing.sampled(trace_sample)}
+
+    folders = _output_folders([path for path, _, _ in files], output_root)
+    parsers = {path: file_parser for path, file_parser, _ in files}
+
+    def file_done(path, page_records, error):
+        if error is not None:
+            counts[path] = None
+            print(f"✗ {path}: failed: {error}")
+            return
+        # Units of one file cover disjoint page ranges; restore page order
+        ordered = sorted(page_records, key=lambda pair: pair[0])
+        records = [record for _, table_records in ordered for record in table_records]
+        counts[path] = len(records)
+        if records:
+            write_outputs(records, get_parser_config(parsers[path]), folders[path], compression)
+            print(f"✓ {path}: {len(records)} records → {folders[path]}/")
+        else:
+            print(f"✗ {path}: no data found")
+
+    start = time.time()
+    if schedule == 'fair':
+        busy_seconds = _run_fair(files, workers, file_done, trace, traced)
+    else:
+        busy_seconds = _run_lpt(files, workers, file_done, trace, traced)
+
+    if trace is not None:
+        trace.finish('batch', 'batch', files=len(files), traced=len(traced))
+        Path(trace_path).parent.mkdir(parents=True, exist_ok=True)
+        trace.save(trace_path, {'files': len(files), 'traced': sorted(traced)})
+        print(f"Trace: {trace_path} ({len(traced)} of {len(files)} files traced)")
+
+    elapsed = time.time() - start
+    failed = [path for path, count in counts.items() if count is None]
+    print("\n" + "=" * 70)
+    if failed:
+        print(f"Failed: {len(failed)} of {len(counts)} files")
+    print(f"Batch time: {elapsed:.2f} seconds")
+    print(f"Worker busy time: {busy_seconds:.2f} seconds "
+          f"({busy_seconds / (elapsed * workers):.0%} of {workers} workers)")
+    return counts
@@ -0,0 +1,190 @@
+"""
+Per-page time budgets with a quarantine list
+
+Pages are parsed one at a time in worker processes the parent can kill. A
+page that runs past its budget (or crashes its worker, or raises) is
+recorded in the quarantine list with its page number and timing; its
+worker is replaced and the other pages carry on. Quarantined pages are
+retried once at the end with the parser's cheaper camelot settings
+('cheap_read_options' in the parser registry, e.g. a lower lattice
+resolution), under the same budget. Parsers without cheaper settings are
+not retried.
+"""
+
+import os
+import time
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
+from . import metrics
+from . import tracing
+from .parsers import get_parser_config
+from .shared_input import SharedPdf, _parse_task, _warm_worker
+
+
+def _worker_main(conn, parser_type):
+    _warm_worker(parser_type)
+    # Budgets start once imports are done
+    conn.send(('ready', None))
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            conn.send(('ok', _parse_task(*task)))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    """One killable worker process and the page it is working on"""
+
+    def __init__(self, parser_type):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main, args=(child_conn, parser_type), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.task = None
+        self.started = None
+        self.trace_started = None
+
+    def start(self, task, args):
+        self.task = task
+        self.started = time.time()
+        self.trace_started = tracing.now()
+        self.conn.send(args)
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def parse_pdf_with_budget(parser_type, source, pages='all', budget=60.0, workers=None,
+                          retry_cheap=True, index=None):
+    """
+    Parse a PDF page by page, killing any page that runs past its budget.
+
+    Args:
+        parser_type: 'attendance' or 'allowance'
+        source: Path, bytes, memoryview or binary file-like object
+        pages: Camelot page selection, defaults to every page
+        budget: Seconds allowed per page
+        workers: Worker processes (default: CPU count)
+        retry_cheap: Retry quarantined pages with the parser's cheaper settings
+        index: Optional EmployeeIndex that receives each employee's row span
+
+    Returns:
+        Tuple of ([(page_number, records), ...] in page order, quarantine list).
+        Each quarantine entry has page, reason ('timeout', 'error' or 'crashed'),
+        seconds, settings ('default' or 'cheap'), error and whether a retry
+        recovered the page.
+    """
+    workers = workers or os.cpu_count() or 1
+    cheap_options = get_parser_config(parser_type)['cheap_read_options'] if retry_cheap else None
+    traced = tracing.active() is not None
+
+    results = {}
+    quarantine = []
+    with SharedPdf.create(source, pages=pages) as shared:
+        # (page, settings) in the order they are handed out
+        queue = deque((page, 'default') for page in shared.page_numbers)
+        pool = [_Worker(parser_type) for _ in range(min(workers, len(queue)) or 1)]
+
+        def quarantine_page(worker, reason, error=None):
+            page, settings = worker.task
+            quarantine.append({
+                'page': page,
+                'reason': reason,
+                'seconds': round(time.time() - worker.started, 3),
+                'settings': settings,
+                'error': error,
+                'recovered': False,
+            })
+            metrics.PAGES_QUARANTINED.inc(parser=parser_type, reason=reason, settings=settings)
+            # The worker's own spans are lost with it; show the page's time in the parent
+            tracing.record('page', worker.trace_started, 'page', page=page, settings=settings, quarantined=reason)
+            if settings == 'default' and cheap_options is not None:
+                queue.append((page, 'cheap'))
+
+        try:
+            while queue or any(worker.task for worker in pool):
+                for worker in pool:
+                    if worker.ready and worker.task is None and queue:
+                        page, settings = queue.popleft()
+                        options = cheap_options if settings == 'cheap' else None
+                        handle = shared.handle_for([page])
+                        worker.start((page, settings), (parser_type, handle, [page], options, traced))
+
+                busy = [worker for worker in pool if worker.task is not None]
+                timeout = None
+                if busy:
+                    timeout = max(min(worker.started + budget for worker in busy) - time.time(), 0)
+                waiting = [worker.conn for worker in pool if worker.task is not None or not worker.ready]
+                ready = wait(waiting, timeout)
+
+                for i, worker in enumerate(pool):
+                    if worker.conn in ready and not worker.ready:
+                        try:
+                            worker.conn.recv()
+                        except (EOFError, OSError):
+                            raise RuntimeError(f"{parser_type} worker failed to start")
+                        worker.ready = True
+                        continue
+                    if worker.task is None:
+                        continue
+                    if worker.conn in ready:
+                        try:
+                            status, payload = worker.conn.recv()
+                        except (EOFError, OSError):
+                            quarantine_page(worker, 'crashed')
+                            worker.kill()
+                            pool[i] = _Worker(parser_type)
+                            continue
+                        page, _ = worker.task
+                        if status == 'ok':
+                            results[page], worker_metrics, worker_events = payload
+                            metrics.merge(worker_metrics)
+                            tracing.merge(worker_events)
+                        else:
+                            quarantine_page(worker, 'error', payload)
+                        worker.task = None
+                    elif time.time() - worker.started >= budget:
+                        quarantine_page(worker, 'timeout')
+                        worker.kill()
+                        pool[i] = _Worker(parser_type)
+        finally:
+            for worker in pool:
+                if worker.task is not None:
+                    worker.kill()
+                else:
+                    worker.stop()
+
+    for entry in quarantine:
+        entry['recovered'] = entry['page'] in results
+
+    page_records = []
+    for page in sorted(results):
+        chunk_records, employees = results[page]
+        page_records.extend(chunk_records)
+        if index is not None:
+            index.update(employees)
+    return page_records, quarantine
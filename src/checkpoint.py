@@ -0,0 +1,189 @@
+"""
+Resumable extraction with a page journal
+
+Every finished page is appended to a JSON Lines journal and fsync'd before
+the next page starts. The journal's first line records the PDF's SHA-256
+and the parser type and version; a rerun with the same key skips the pages
+already journaled, so a run killed at page 2,800 of 3,000 only parses the
+last 200 pages. Records are reassembled from the journal in page order, so
+the output is identical to an uninterrupted run.
+
+A journal written for another file, parser or parser version is discarded
+and started over. A torn last line from a crash mid-write, or any line that
+does not parse, is cut off with everything after it.
+"""
+
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from . import metrics
+from . import tracing
+from .index import EmployeeIndex
+from .pages import count_pages, format_pages, parse_page_selection
+from .parsers import load_parser
+from .pdf_source import read_source_bytes, is_path
+from .shared_input import SharedPdf, _parse_task, _warm_worker
+from .shards import file_sha256
+
+
+JOURNAL_VERSION = 1
+
+
+def journal_path_for(output_folder, basename):
+    """Journal path in an output folder, e.g. attendance_records.journal.jsonl"""
+    return Path(output_folder) / f"{basename}.journal.jsonl"
+
+
+def journal_key(parser_type, source):
+    """Identity of a run: PDF content hash plus parser type and version"""
+    if is_path(source):
+        sha256 = file_sha256(source)
+    else:
+        sha256 = hashlib.sha256(read_source_bytes(source)).hexdigest()
+    return {
+        'version': JOURNAL_VERSION,
+        'sha256': sha256,
+        'parser': parser_type,
+        'parser_version': load_parser(parser_type).PARSER_VERSION,
+    }
+
+
+class PageJournal:
+    """Append-only, fsync'd journal of finished pages"""
+
+    def __init__(self, filepath, key):
+        self.filepath = Path(filepath)
+        self.key = key
+        # page -> {'tables': [records, ...], 'employees': {...}}
+        self.completed = {}
+        self._file = None
+
+    @classmethod
+    def open(cls, filepath, key):
+        """Open a journal, keeping the pages of a previous run with the same key"""
+        journal = cls(filepath, key)
+        if journal.filepath.exists() and journal._load():
+            journal._file = open(journal.filepath, 'a', encoding='utf-8')
+        else:
+            journal.filepath.parent.mkdir(parents=True, exist_ok=True)
+            journal._file = open(journal.filepath, 'w', encoding='utf-8')
+            journal._write({'type': 'header', **key})
+        return journal
+
+    def _load(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            lines = f.read().split('\n')
+
+        # The text after the last newline is empty, or a write torn by a crash
+        lines = lines[:-1]
+        try:
+            header = json.loads(lines[0])
+        except (ValueError, IndexError):
+            return False
+        if not isinstance(header, dict) or header.get('type') != 'header':
+            return False
+        if {k: header.get(k) for k in self.key} != self.key:
+            return False
+
+        valid_length = len(lines[0].encode('utf-8')) + 1
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+                page_entry = {'tables': entry['tables'], 'employees': entry['employees']}
+                page = entry['page']
+            except (ValueError, KeyError, TypeError):
+                # A damaged line: keep the pages before it and parse the rest again
+                break
+            self.completed[page] = page_entry
+            valid_length += len(line.encode('utf-8')) + 1
+
+        # Drop a torn or damaged tail so new entries start on a fresh line
+        with open(self.filepath, 'r+b') as f:
+            f.truncate(valid_length)
+        return True
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, page, page_records, employees):
+        """Record a finished page: its (page, records) pairs and index entries"""
+        tables = [records for _, records in page_records]
+        self._write({'page': page, 'tables': tables, 'employees': employees})
+        self.completed[page] = {'tables': tables, 'employees': employees}
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _parse_pages_serial(parser_type, source, page_numbers, journal):
+    parser = load_parser(parser_type)
+    for page in page_numbers:
+        index = EmployeeIndex()
+        page_records = list(parser.process_tables(parser.read_tables(source, str(page)), index))
+        journal.append(page, page_records, index.employees)
+
+
+def _parse_pages_parallel(parser_type, source, page_numbers, journal, workers):
+    with SharedPdf.create(source, pages=format_pages(page_numbers)) as shared, ProcessPoolExecutor(
+        max_workers=workers, initializer=_warm_worker, initargs=(parser_type,)
+    ) as pool:
+        traced = tracing.active() is not None
+        futures = {
+            pool.submit(_parse_task, parser_type, shared.handle_for([page]), [page], None, traced): page
+            for page in page_numbers
+        }
+        # Journal pages as they finish; order does not matter for the journal
+        for future in as_completed(futures):
+            (page_records, employees), worker_metrics, worker_events = future.result()
+            metrics.merge(worker_metrics)
+            tracing.merge(worker_events)
+            journal.append(futures[future], page_records, employees)
+
+
+def parse_pdf_checkpointed(parser_type, source, journal_path, pages='all', workers=None, index=None):
+    """
+    Parse a PDF page by page, journaling each page and skipping journaled pages.
+
+    Args:
+        parser_type: 'attendance' or 'allowance'
+        source: Path, bytes, memoryview or binary file-like object
+        journal_path: Journal file (created or resumed)
+        pages: Camelot page selection, defaults to every page
+        workers: Parse missing pages in N worker processes
+        index: Optional EmployeeIndex that receives each employee's row span
+
+    Returns:
+        List of (page_number, records) in page order
+    """
+    if not is_path(source):
+        source = bytes(read_source_bytes(source))
+
+    journal = PageJournal.open(journal_path, journal_key(parser_type, source))
+    try:
+        page_numbers = parse_page_selection(pages, count_pages(source))
+        missing = [page for page in page_numbers if page not in journal.completed]
+        if len(missing) < len(page_numbers):
+            print(f"Resuming from {journal_path}: {len(page_numbers) - len(missing)} of "
+                  f"{len(page_numbers)} pages already done")
+
+        if missing and workers:
+            _parse_pages_parallel(parser_type, source, missing, journal, workers)
+        elif missing:
+            _parse_pages_serial(parser_type, source, missing, journal)
+    finally:
+        journal.close()
+
+    page_records = []
+    for page in page_numbers:
+        entry = journal.completed[page]
+        page_records.extend((page, records) for records in entry['tables'])
+        if index is not None:
+            index.update(entry['employees'])
+    return page_records
@@ -1,23 +1,178 @@
-"""Common output functions"""
+"""Common output functions and cell helpers"""
 
+import io
+import os
+import gzip
 import json
-import pandas as pd
+import lzma
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
+from .instrument import timed
 
+
+# Output suffix -> compression format
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.xz': 'xz'}
+
+# Uncompressed bytes per independently compressed block
+COMPRESSION_BLOCK_SIZE = 1 << 20
+
+_compression_executor = None
+
+
+def is_missing(value):
+    """True for an empty camelot cell (None or NaN); pandas.isna for one value without importing pandas"""
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def compression_suffix(compression):
+    """File suffix for a compression format ('gzip' -> '.gz', None -> '')"""
+    if not compression:
+        return ''
+    for suffix, name in COMPRESSION_SUFFIXES.items():
+        if name == compression:
+            return suffix
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def compression_for(filepath):
+    """Compression format implied by a file name, or None"""
+    return COMPRESSION_SUFFIXES.get(Path(filepath).suffix.lower())
+
+
+def _get_compression_executor():
+    """Shared thread pool for block compression (zlib and lzma release the GIL)"""
+    global _compression_executor
+    if _compression_executor is None:
+        _compression_executor = ThreadPoolExecutor(
+            max_workers=os.cpu_count() or 2, thread_name_prefix='compress'
+        )
+    return _compression_executor
+
+
+def _compress_block(data, compression):
+    if compression == 'gzip':
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return lzma.compress(data, format=lzma.FORMAT_XZ)
+
+
+class ParallelCompressedWriter(io.RawIOBase):
+    """
+    Binary writer that compresses fixed-size blocks on background threads.
+
+    Each block is written as an independent gzip member or xz stream. Both
+    formats allow concatenated members, so the result reads back with
+    gzip.open/lzma.open (and the gzip/xz command line tools) unchanged.
+    """
+
+    def __init__(self, filepath, compression, block_size=COMPRESSION_BLOCK_SIZE):
+        super().__init__()
+        self._file = open(filepath, 'wb')
+        self._compression = compression
+        self._block_size = block_size
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._max_pending = 2 * (os.cpu_count() or 2)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self._block_size:
+            self._submit(bytes(self._buffer[:self._block_size]))
+            del self._buffer[:self._block_size]
+        return len(data)
+
+    def _submit(self, block):
+        future = _get_compression_executor().submit(_compress_block, block, self._compression)
+        self._pending.append(future)
+        # Bound memory: write finished blocks once enough are in flight
+        while len(self._pending) > self._max_pending:
+            self._file.write(self._pending.popleft().result())
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffer or not self._pending:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._file.write(self._pending.popleft().result())
+        finally:
+            self._file.close()
+            super().close()
+
+
+def open_output(filepath, encoding='utf-8', newline=None):
+    """Open a text file for writing, compressing when the name ends in .gz or .xz"""
+    compression = compression_for(filepath)
+    if compression is None:
+        return open(filepath, 'w', encoding=encoding, newline=newline)
+    return io.TextIOWrapper(
+        ParallelCompressedWriter(filepath, compression), encoding=encoding, newline=newline
+    )
+
+
+def open_input(filepath, encoding='utf-8'):
+    """Open a text file for reading, transparently decompressing .gz and .xz"""
+    compression = compression_for(filepath)
+    if compression == 'gzip':
+        return gzip.open(filepath, 'rt', encoding=encoding)
+    if compression == 'xz':
+        return lzma.open(filepath, 'rt', encoding=encoding)
+    return open(filepath, 'r', encoding=encoding)
+
+
+def find_output(filepath):
+    """
+    Locate an output file that may have been written compressed.
+
+    Args:
+        filepath: Uncompressed output path, e.g. 'output/x/records.json'
+
+    Returns:
+        The most recently written of filepath, filepath.gz and filepath.xz,
+        or filepath itself if none exist
+    """
+    candidates = [Path(f"{filepath}{suffix}") for suffix in ('', *COMPRESSION_SUFFIXES)]
+    existing = [path for path in candidates if path.exists()]
+    if not existing:
+        return Path(filepath)
+    return max(existing, key=lambda path: path.stat().st_mtime)
+
+
+def load_json(filepath):
+    """Load JSON, transparently decompressing .gz and .xz"""
+    with open_input(filepath) as f:
+        return json.load(f)
+
+
+@timed('write.json')
 def save_json(data, filepath):
     """Save to JSON"""
-    with open(filepath, 'w', encoding='utf-8') as f:
+    with open_output(filepath) as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
 
+@timed('write.csv')
 def save_csv(data, filepath):
     """Save to CSV"""
-    pd.DataFrame(data).to_csv(filepath, index=False, encoding='utf-8-sig')
+    import pandas as pd
+
+    if compression_for(filepath) is None:
+        pd.DataFrame(data).to_csv(filepath, index=False, encoding='utf-8-sig')
+        return
+    with open_output(filepath, encoding='utf-8-sig', newline='') as f:
+        pd.DataFrame(data).to_csv(f, index=False)
 
 
+@timed('write.markdown')
 def save_markdown(data, filepath, title):
     """Save to Markdown"""
-    with open(filepath, 'w', encoding='utf-8') as f:
+    with open_output(filepath) as f:
         f.write(f"# {title}\n\nTotal: {len(data)}\n\n")
         if data:
             keys = list(data[0].keys())
@@ -25,3 +180,13 @@ def save_markdown(data, filepath, title):
             f.write("|" + "|".join(["-"*(len(k)+2) for k in keys]) + "|\n")
             for item in data:
                 f.write("| " + " | ".join([str(item.get(k, '')) for k in keys]) + " |\n")
+
+
+def write_outputs(records, config, output_folder, compression=None):
+    """Write JSON, CSV and Markdown outputs"""
+    basename = f"{output_folder}/{config['basename']}"
+    suffix = compression_suffix(compression)
+    Path(output_folder).mkdir(parents=True, exist_ok=True)
+    save_json(records, f'{basename}.json{suffix}')
+    save_csv(records, f'{basename}.csv{suffix}')
+    save_markdown(records, f'{basename}.md{suffix}', config['title'])
@@ -0,0 +1,298 @@
+"""
+Pre-forked extraction daemon on a Unix domain socket
+
+The daemon imports both parsers (camelot, OpenCV, pdfminer, pandas) once,
+freezes the garbage collector so the imported objects stay in shared
+copy-on-write pages, and forks a pool of children that accept jobs on one
+listening socket. A job is an app.py command line: the client passes its
+working directory and its stdin, stdout and stderr file descriptors over
+the socket, so the command reads and prints exactly as if it ran locally,
+and gets back the exit code. Ctrl+C in the client is forwarded over the
+socket and interrupts the job in the child.
+
+    python app.py daemon --workers 4     # foreground; stop with Ctrl+C or SIGTERM
+    python app.py attendance book.pdf    # runs in the daemon when it is up
+
+Set PDF_NO_DAEMON=1 to always run in-process, and PDF_DAEMON_SOCKET to use
+another socket path.
+"""
+
+import os
+import gc
+import sys
+import json
+import signal
+import socket
+import struct
+import _thread
+import tempfile
+import threading
+import traceback
+
+from .parsers import PARSERS, warm_parser
+
+
+# Largest job request (argv and working directory) accepted
+MAX_REQUEST_SIZE = 1 << 16
+
+# Children exit after this many jobs and are replaced, bounding leaks
+MAX_JOBS_PER_CHILD = 500
+
+# Sent by the client while a job runs to interrupt it
+CANCEL = b'\x03'
+
+# Exit code of a job stopped by Ctrl+C, as a shell reports it
+INTERRUPTED_EXIT_CODE = 130
+
+
+def default_socket_path():
+    """Socket path from PDF_DAEMON_SOCKET, or a per-user path in the runtime directory"""
+    if os.environ.get('PDF_DAEMON_SOCKET'):
+        return os.environ['PDF_DAEMON_SOCKET']
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f'pdf-extract-{os.getuid()}.sock')
+
+
+def run_via_daemon(argv, socket_path=None):
+    """
+    Run an app.py command line in the daemon, sharing this process's stdio.
+
+    Args:
+        argv: Command-line arguments after 'app.py'
+        socket_path: Daemon socket (default: default_socket_path())
+
+    Returns:
+        The command's exit code, or None when no daemon is listening
+    """
+    socket_path = socket_path or default_socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        peer_uid = _peer_uid(sock, socket_path)
+    except OSError:
+        # Missing, stale, unreadable or over-long socket path: run locally
+        sock.close()
+        return None
+    if peer_uid != os.getuid():
+        # Another user's process on a shared path (e.g. /tmp): never hand it our stdio
+        sock.close()
+        print(f"⚠️  Ignoring {socket_path}: it belongs to uid {peer_uid}, not {os.getuid()}", file=sys.stderr)
+        return None
+
+    with sock:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        request = json.dumps({'argv': argv, 'cwd': os.getcwd()}).encode('utf-8')
+        socket.send_fds(sock, [request], [0, 1, 2])
+        try:
+            reply = _wait_for_reply(sock)
+        except KeyboardInterrupt:
+            # Second Ctrl+C: stop waiting; closing the socket also stops the job
+            return INTERRUPTED_EXIT_CODE
+
+    if not reply:
+        # The job may have partly run, so do not silently run it again
+        print("❌ Error: daemon worker exited before finishing the job", file=sys.stderr)
+        return 1
+    return json.loads(reply)['exit_code']
+
+
+def _peer_uid(sock, socket_path):
+    """User id of the process listening on the other end of a connected socket"""
+    if hasattr(socket, 'SO_PEERCRED'):
+        credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+        _, uid, _ = struct.unpack('3i', credentials)
+        return uid
+    # No peer credentials (e.g. macOS): the socket file is owned by the process that bound it
+    return os.stat(socket_path).st_uid
+
+
+def _wait_for_reply(sock):
+    """Read the reply until EOF, forwarding the first Ctrl+C to the job"""
+    chunks = []
+    cancelled = False
+    while True:
+        try:
+            chunk = sock.recv(4096)
+        except KeyboardInterrupt:
+            if cancelled:
+                raise
+            cancelled = True
+            sock.sendall(CANCEL)
+            continue
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+
+
+def _watch_client(conn, finished):
+    """Interrupt the running job when the client sends Ctrl+C or goes away"""
+    try:
+        conn.recv(1)
+    except OSError:
+        pass
+    if not finished.is_set():
+        _thread.interrupt_main()
+
+
+def _run_job(handler, argv):
+    try:
+        handler(argv)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("Interrupted", file=sys.stderr)
+        return INTERRUPTED_EXIT_CODE
+    except Exception:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def _handle_connection(conn, handler):
+    message, fds, _, _ = socket.recv_fds(conn, MAX_REQUEST_SIZE, 3)
+    if len(fds) != 3:
+        for fd in fds:
+            os.close(fd)
+        return
+
+    request = json.loads(message)
+    saved_fds = [os.dup(fd) for fd in (0, 1, 2)]
+    saved_cwd = os.getcwd()
+    finished = threading.Event()
+    watcher = threading.Thread(target=_watch_client, args=(conn, finished), daemon=True)
+    try:
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+        os.chdir(request['cwd'])
+        # Children ignore SIGINT between jobs; the watcher raises it in a job
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        watcher.start()
+        exit_code = _run_job(handler, request['argv'])
+    finally:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        finished.set()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for target, fd in enumerate(saved_fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        for fd in fds:
+            os.close(fd)
+        os.chdir(saved_cwd)
+
+    try:
+        conn.sendall(json.dumps({'exit_code': exit_code}).encode('utf-8'))
+    finally:
+        # Wakes the watcher's recv so it can exit
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        watcher.join()
+
+
+def _child_loop(listener, handler):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for _ in range(MAX_JOBS_PER_CHILD):
+        conn, _ = listener.accept()
+        with conn:
+            try:
+                _handle_connection(conn, handler)
+            except (OSError, ValueError):
+                # Client went away or sent a bad request; keep serving
+                pass
+
+
+def _spawn_child(listener, handler):
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            _child_loop(listener, handler)
+        except BaseException:
+            exit_code = 1
+        finally:
+            # Never run the parent's cleanup in a child
+            os._exit(exit_code)
+    return pid
+
+
+def _bind(socket_path):
+    """Listen on the socket path, replacing a stale socket left by a dead daemon"""
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            os.unlink(socket_path)
+        else:
+            raise RuntimeError(f"A daemon is already listening on {socket_path}")
+        finally:
+            probe.close()
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Owner-only from the moment it exists, not after a chmod
+    old_umask = os.umask(0o177)
+    try:
+        listener.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    listener.listen(128)
+    return listener
+
+
+def serve(handler, socket_path=None, workers=None):
+    """
+    Warm up, fork the worker pool and serve jobs until SIGTERM or Ctrl+C.
+
+    Args:
+        handler: Callable run in a child with the job's argv (app.py's command runner)
+        socket_path: Socket to listen on (default: default_socket_path())
+        workers: Number of forked children (default: CPU count)
+    """
+    socket_path = socket_path or default_socket_path()
+    workers = workers or os.cpu_count() or 1
+
+    for parser_type in PARSERS:
+        warm_parser(parser_type)
+
+    listener = _bind(socket_path)
+
+    # Move everything imported so far out of the collector's reach; children
+    # then avoid touching (and copying) those pages during collections
+    gc.collect()
+    gc.freeze()
+
+    children = set()
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        for _ in range(workers):
+            children.add(_spawn_child(listener, handler))
+        print(f"Daemon {os.getpid()} serving {workers} worker(s) on {socket_path}", flush=True)
+
+        while True:
+            pid, _ = os.wait()
+            children.discard(pid)
+            children.add(_spawn_child(listener, handler))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        print("Daemon stopped")
@@ -0,0 +1,127 @@
+"""
+Sidecar page-to-employee index
+
+Extraction records where each employee sits (page, table and row span) in a
+small JSON file next to the PDF, or in another folder such as the output
+folder when the PDF's own folder is read-only. A later lookup for one
+employee reads only the pages listed in the index instead of running camelot
+over the whole book.
+"""
+
+import json
+from pathlib import Path
+
+from .parsers import get_parser_config, load_parser
+from .shards import file_sha256
+
+
+INDEX_VERSION = 1
+
+
+def index_path_for(pdf_path, folder=None):
+    """Index path for a PDF, e.g. book.pdf -> book.pdf.index.json, next to it unless folder is given"""
+    if folder is not None:
+        return Path(folder) / f"{Path(pdf_path).name}.index.json"
+    return Path(f"{pdf_path}.index.json")
+
+
+def _pdf_fingerprint(pdf_path, sha256=None):
+    stat = Path(pdf_path).stat()
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': sha256 or file_sha256(pdf_path),
+    }
+
+
+class EmployeeIndex:
+    """Collects employee row spans while a parser walks the tables"""
+
+    def __init__(self, employees=None):
+        # employee_id -> list of {'page', 'table', 'rows': [start, end)}
+        self.employees = employees or {}
+
+    def add(self, employee_id, page, table, start_row, end_row):
+        """Record that an employee's data spans rows [start_row, end_row) of a table"""
+        self.employees.setdefault(str(employee_id), []).append(
+            {'page': page, 'table': table, 'rows': [start_row, end_row]}
+        )
+
+    def update(self, employees):
+        """Merge entries collected elsewhere (e.g. by a worker process)"""
+        for employee_id, locations in employees.items():
+            self.employees.setdefault(employee_id, []).extend(locations)
+
+    def locations(self, employee_id):
+        """All (page, table, rows) locations recorded for an employee"""
+        return self.employees.get(str(employee_id), [])
+
+    def save(self, filepath, parser_type, pdf_path):
+        """Write the index with a fingerprint of the PDF it describes"""
+        data = {
+            'version': INDEX_VERSION,
+            'parser': parser_type,
+            'pdf': _pdf_fingerprint(pdf_path),
+            'employees': self.employees,
+        }
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, filepath, parser_type, pdf_path):
+        """
+        Load an index and check it still matches the PDF.
+
+        Raises:
+            FileNotFoundError: If there is no index for the PDF
+            ValueError: If the index was built by another parser or the PDF changed
+        """
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if data.get('version') != INDEX_VERSION or data.get('parser') != parser_type:
+            raise ValueError(f"Index {filepath} was not built by the {parser_type} parser")
+
+        # Size and mtime are enough when unchanged; fall back to the checksum
+        recorded = data['pdf']
+        stat = Path(pdf_path).stat()
+        if (stat.st_size, stat.st_mtime_ns) != (recorded['size'], recorded['mtime_ns']):
+            if file_sha256(pdf_path) != recorded['sha256']:
+                raise ValueError(f"Index {filepath} is out of date for {pdf_path}; re-run extraction")
+
+        return cls(data['employees'])
+
+
+def lookup_employee(parser_type, pdf_path, employee_id, index_path=None):
+    """
+    Extract one employee's records using the sidecar index.
+
+    Only the pages the index lists for the employee are read, and only the
+    employee's own rows are parsed.
+
+    Args:
+        parser_type: 'attendance' or 'allowance'
+        pdf_path: Path to the PDF the index was built from
+        employee_id: 6-digit employee ID
+        index_path: Index file (defaults to the sidecar next to the PDF)
+
+    Returns:
+        List of records for the employee (empty if not in the index)
+    """
+    index = EmployeeIndex.load(index_path or index_path_for(pdf_path), parser_type, pdf_path)
+    locations = index.locations(employee_id)
+    if not locations:
+        return []
+
+    parser = load_parser(parser_type)
+    id_field = get_parser_config(parser_type)['id_field']
+    pages = ','.join(str(page) for page in sorted({loc['page'] for loc in locations}))
+
+    records = []
+    for table in parser.read_tables(pdf_path, pages):
+        for loc in locations:
+            if (loc['page'], loc['table']) == (int(table.page), table.order):
+                start_row, end_row = loc['rows']
+                records.extend(parser.extract_employee_rows(table, start_row, end_row))
+
+    return [record for record in records if str(record.get(id_field)) == str(employee_id)]
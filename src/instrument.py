@@ -0,0 +1,455 @@
+"""
+Stage timing and memory instrumentation
+
+Code marks its stages with the timed() decorator or the stage() context
+manager and reports counts with count(). Every stage's time feeds the
+always-on pdf_stage_seconds histogram in src.metrics; nothing else is
+recorded unless a collector is active (start() ... stop()), and the
+inactive path is a single global check, so the marks stay in place in
+normal runs. While a trace is recorded (src.tracing), every stage is also
+a span.
+
+While a collector is active, camelot's per-page parse is wrapped as well,
+giving the camelot read time of every page.
+
+page() marks the work on one page (reading or processing it). Page
+observers, such as a profiler limited to a page range, are entered around
+each marked page; nested marks keep the outermost page number, so a worker
+reading a single-page copy still reports the original page.
+
+A collector started with memory=True also records, per stage and per page,
+the tracemalloc peak above the memory held when the stage began. It also
+samples the process RSS in the background and lists the allocation sites
+holding the most memory at the highest point seen at a page boundary.
+tracemalloc slows Python allocations down considerably, so timings taken
+alongside memory tracing are inflated.
+
+Only the current process is measured; pages parsed in worker processes
+(--workers and similar modes) are not included.
+"""
+
+import os
+import sys
+import json
+import time
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext, ExitStack
+
+from . import metrics
+from . import tracing
+
+
+_collector = None
+_NULL_STAGE = nullcontext()
+
+# Callables observer(page_number) -> context manager, entered around each page
+_page_observers = []
+_page_state = threading.local()
+
+
+# Seconds between RSS samples; doubled whenever MAX_RSS_SAMPLES is reached
+RSS_SAMPLE_INTERVAL = 0.1
+MAX_RSS_SAMPLES = 2000
+
+# Allocation sites listed in the memory report
+TOP_ALLOCATION_SITES = 25
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if unavailable"""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None if unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryTracker:
+    """tracemalloc peaks per stage and per page, RSS samples and top allocation sites"""
+
+    def __init__(self):
+        # name -> [calls, max peak, max net]
+        self.stages = {}
+        # page number -> max peak
+        self.pages = {}
+        self.rss_samples = []
+        self.rss_interval = RSS_SAMPLE_INTERVAL
+        self.top_sites = []
+        self.snapshot_bytes = 0
+        self.traced_peak = 0
+        # One [traced at entry, highest peak so far] per open stage
+        self._stack = []
+        self._started = time.perf_counter()
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_rss, name='rss-sampler', daemon=True)
+        self._sampler.start()
+
+    def begin(self):
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        self._stack.append([current, current])
+
+    def end(self):
+        """Close the innermost stage; returns (peak above its start, net retained)"""
+        current, peak = tracemalloc.get_traced_memory()
+        start, highest = self._stack.pop()
+        highest = max(highest, peak)
+        self.traced_peak = max(self.traced_peak, highest)
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], highest)
+        return highest - start, current - start
+
+    def add(self, name, peak, net):
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [1, peak, net]
+        else:
+            entry[0] += 1
+            entry[1] = max(entry[1], peak)
+            entry[2] = max(entry[2], net)
+
+    @contextmanager
+    def observe_page(self, page_number):
+        """Page observer: peak of each page, and a snapshot at new highs"""
+        self.begin()
+        try:
+            yield
+        finally:
+            peak, _ = self.end()
+            self.pages[page_number] = max(self.pages.get(page_number, 0), peak)
+            current, _ = tracemalloc.get_traced_memory()
+            # Snapshots are slow; only take one when the held memory grows by 10%
+            if current > self.snapshot_bytes * 1.1:
+                self._snapshot(current)
+
+    def _snapshot(self, current):
+        # Module code loaded by imports is not something a run can act on
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        ])
+        statistics = snapshot.statistics('lineno')
+        self.snapshot_bytes = current
+        self.top_sites = [
+            {'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+             'bytes': stat.size, 'blocks': stat.count}
+            for stat in statistics[:TOP_ALLOCATION_SITES]
+        ]
+
+    def _sample_rss(self):
+        while not self._stop.wait(self.rss_interval):
+            rss = current_rss()
+            if rss is None:
+                return
+            self.rss_samples.append([round(time.perf_counter() - self._started, 3), rss])
+            if len(self.rss_samples) >= MAX_RSS_SAMPLES:
+                # Keep the whole run covered at half the resolution
+                self.rss_samples = self.rss_samples[::2]
+                self.rss_interval *= 2
+
+    def finish(self):
+        """Stop sampling, snapshot the end state and stop tracemalloc if it was ours"""
+        self._stop.set()
+        self._sampler.join()
+        current, _ = tracemalloc.get_traced_memory()
+        if not self.top_sites or current > self.snapshot_bytes:
+            self._snapshot(current)
+        self.traced_peak = max(self.traced_peak, tracemalloc.get_traced_memory()[1])
+        if self._started_tracing:
+            tracemalloc.stop()
+
+    def report(self):
+        """Machine-readable memory report as a dictionary"""
+        rss_values = [rss for _, rss in self.rss_samples]
+        return {
+            'traced_peak_bytes': self.traced_peak,
+            'stages': {
+                name: {'calls': calls, 'peak_bytes': peak, 'max_net_bytes': net}
+                for name, (calls, peak, net) in sorted(self.stages.items())
+            },
+            'page_peak_bytes': {str(page): peak for page, peak in sorted(self.pages.items())},
+            'rss': {
+                'peak_bytes': peak_rss() or max(rss_values, default=None),
+                'interval_seconds': self.rss_interval,
+                'samples': self.rss_samples,
+            },
+            'top_allocations': {
+                'traced_bytes': self.snapshot_bytes,
+                'sites': self.top_sites,
+            },
+        }
+
+
+class Collector:
+    """Accumulates stage timings, per-page camelot times and counts (and optionally memory)"""
+
+    def __init__(self, memory=False):
+        self.started = time.perf_counter()
+        self.finished = None
+        # name -> [calls, total, min, max]
+        self.stages = {}
+        # page number -> camelot seconds (summed over reads of that page)
+        self.pages = {}
+        self.counts = {}
+        self.memory = MemoryTracker() if memory else None
+
+    def begin(self):
+        """Open a stage; pass the result to end()"""
+        if self.memory is not None:
+            self.memory.begin()
+        return time.perf_counter()
+
+    def end(self, name, begin):
+        """Close the stage opened by begin(); returns its seconds"""
+        seconds = time.perf_counter() - begin
+        self.add(name, seconds)
+        if self.memory is not None:
+            self.memory.add(name, *self.memory.end())
+        return seconds
+
+    def add(self, name, seconds):
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [1, seconds, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = min(entry[2], seconds)
+            entry[3] = max(entry[3], seconds)
+
+    def add_page(self, page_number, seconds):
+        self.pages[page_number] = self.pages.get(page_number, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def report(self):
+        """Machine-readable report as a dictionary"""
+        total = (self.finished or time.perf_counter()) - self.started
+        return {
+            'total_seconds': round(total, 6),
+            'stages': {
+                name: {
+                    'calls': calls,
+                    'seconds': round(seconds, 6),
+                    'mean_ms': round(seconds / calls * 1000, 3),
+                    'min_ms': round(low * 1000, 3),
+                    'max_ms': round(high * 1000, 3),
+                }
+                for name, (calls, seconds, low, high) in sorted(self.stages.items())
+            },
+            'camelot_page_seconds': {str(page): round(seconds, 6) for page, seconds in sorted(self.pages.items())},
+            'counts': dict(sorted(self.counts.items())),
+        }
+
+    def save(self, filepath, report=None):
+        """Write the report (default: the timing report) as JSON"""
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(report or self.report(), f, ensure_ascii=False, indent=2)
+
+    def memory_summary(self):
+        """Human-readable memory summary, highest peaks first"""
+        report = self.memory.report()
+        lines = [f"{'Stage':<48} {'Calls':>7} {'Peak MiB':>9} {'Net MiB':>9}"]
+        for name, stage in sorted(report['stages'].items(), key=lambda item: -item[1]['peak_bytes']):
+            lines.append(
+                f"{name:<48} {stage['calls']:>7} {stage['peak_bytes'] / 2**20:>9.2f} "
+                f"{stage['max_net_bytes'] / 2**20:>9.2f}"
+            )
+        pages = report['page_peak_bytes']
+        if pages:
+            highest = max(pages.items(), key=lambda item: item[1])
+            lines.append(f"Pages: {len(pages)}, highest peak on page {highest[0]} ({highest[1] / 2**20:.2f} MiB)")
+        if report['rss']['peak_bytes']:
+            lines.append(f"Peak RSS: {report['rss']['peak_bytes'] / 2**20:.1f} MiB")
+        sites = report['top_allocations']['sites'][:5]
+        if sites:
+            lines.append(f"Top allocation sites ({report['top_allocations']['traced_bytes'] / 2**20:.1f} MiB traced):")
+            lines.extend(f"  {site['bytes'] / 2**20:8.2f} MiB  {site['site']}" for site in sites)
+        return '\n'.join(lines)
+
+    def summary(self):
+        """Human-readable summary, slowest stages first"""
+        report = self.report()
+        total = report['total_seconds'] or 1e-9
+        lines = [f"{'Stage':<48} {'Calls':>7} {'Seconds':>9} {'Share':>6} {'Mean ms':>9}"]
+        for name, stage in sorted(report['stages'].items(), key=lambda item: -item[1]['seconds']):
+            lines.append(
+                f"{name:<48} {stage['calls']:>7} {stage['seconds']:>9.3f} "
+                f"{stage['seconds'] / total:>6.1%} {stage['mean_ms']:>9.2f}"
+            )
+        pages = report['camelot_page_seconds']
+        if pages:
+            slowest = max(pages.items(), key=lambda item: item[1])
+            lines.append(f"Camelot pages: {len(pages)}, slowest page {slowest[0]} ({slowest[1]:.3f}s)")
+        if report['counts']:
+            lines.append("Counts: " + ", ".join(f"{name}={n}" for name, n in report['counts'].items()))
+        lines.append(f"Total: {total:.3f} seconds (nested stages overlap)")
+        return '\n'.join(lines)
+
+
+def active():
+    """The active collector, or None"""
+    return _collector
+
+
+def start(memory=False):
+    """Start collecting (with memory tracing if asked); returns the new collector"""
+    global _collector
+    _collector = Collector(memory)
+    _hook_camelot_pages()
+    if _collector.memory is not None:
+        add_page_observer(_collector.memory.observe_page)
+    return _collector
+
+
+def stop():
+    """Stop collecting and return the finished collector"""
+    global _collector
+    collector, _collector = _collector, None
+    if collector is not None and collector.memory is not None:
+        remove_page_observer(collector.memory.observe_page)
+        collector.memory.finish()
+    if not _page_observers:
+        _unhook_camelot_pages()
+    if collector is not None:
+        collector.finished = time.perf_counter()
+    return collector
+
+
+@contextmanager
+def _timed_stage(name, collector):
+    begin = collector.begin() if collector is not None else time.perf_counter()
+    try:
+        with tracing.span(name):
+            yield
+    finally:
+        seconds = collector.end(name, begin) if collector is not None else time.perf_counter() - begin
+        metrics.STAGE_SECONDS.observe(seconds, stage=name)
+
+
+def stage(name):
+    """Context manager timing a block as a named stage"""
+    return _timed_stage(name, _collector)
+
+
+def timed(name):
+    """Decorator timing every call of a function as a named stage"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            collector = _collector
+            begin = collector.begin() if collector is not None else time.perf_counter()
+            try:
+                with tracing.span(name):
+                    return fn(*args, **kwargs)
+            finally:
+                seconds = collector.end(name, begin) if collector is not None else time.perf_counter() - begin
+                metrics.STAGE_SECONDS.observe(seconds, stage=name)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    """Add to a named count"""
+    if _collector is not None:
+        _collector.count(name, n)
+
+
+def add_page_observer(observer):
+    """Enter observer(page_number) around the work on every page"""
+    _page_observers.append(observer)
+    _hook_camelot_pages()
+
+
+def remove_page_observer(observer):
+    """Stop calling a page observer"""
+    _page_observers.remove(observer)
+    if _collector is None and not _page_observers:
+        _unhook_camelot_pages()
+
+
+def page(page_number):
+    """Context manager marking the work on one page"""
+    if not _page_observers:
+        return _NULL_STAGE
+    return _page_scope(page_number)
+
+
+@contextmanager
+def _page_scope(page_number):
+    if getattr(_page_state, 'page', None) is not None:
+        # Nested mark: the outer page already entered the observers
+        yield
+        return
+    _page_state.page = page_number
+    try:
+        with ExitStack() as stack:
+            for observer in list(_page_observers):
+                stack.enter_context(observer(page_number))
+            yield
+    finally:
+        _page_state.page = None
+
+
+# Original camelot PDFHandler._parse_page while the hook is installed
+_original_parse_page = None
+
+
+def _hook_camelot_pages():
+    global _original_parse_page
+    try:
+        from camelot.handlers import PDFHandler
+    except ImportError:
+        return
+    original = getattr(PDFHandler, '_parse_page', None)
+    if original is None or _original_parse_page is not None:
+        return
+
+    @functools.wraps(original)
+    def parse_page(self, camelot_page, *args, **kwargs):
+        # camelot 1.x passes the page number, 2.x a page object
+        page_number = getattr(_page_state, 'page', None)
+        if page_number is None:
+            page_index = getattr(camelot_page, 'page_idx', None)
+            page_number = page_index + 1 if page_index is not None else camelot_page
+        with page(page_number):
+            collector = _collector
+            if collector is None:
+                return original(self, camelot_page, *args, **kwargs)
+            begin = collector.begin()
+            try:
+                return original(self, camelot_page, *args, **kwargs)
+            finally:
+                collector.add_page(page_number, collector.end('camelot.parse_page', begin))
+                collector.count('pages')
+
+    _original_parse_page = original
+    PDFHandler._parse_page = parse_page
+
+
+def _unhook_camelot_pages():
+    global _original_parse_page
+    if _original_parse_page is None:
+        return
+    from camelot.handlers import PDFHandler
+    PDFHandler._parse_page = _original_parse_page
+    _original_parse_page = None
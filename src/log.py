@@ -0,0 +1,82 @@
+"""
+Leveled logging for the parsers, as plain text or JSON lines
+
+Modules log through logging.getLogger(__name__), under the 'src' logger.
+Document-level messages are INFO; per-table and per-record messages are
+DEBUG and pass their values as arguments, so at the default INFO level a
+hot loop pays one level check per record and formats nothing.
+
+    from src.log import configure_logging
+    configure_logging('debug')                  # per-table and per-record messages too
+    configure_logging('info', json_lines=True)  # one JSON object per line
+
+Records go to whatever sys.stdout is when they are emitted, so callers that
+quiet a parse with contextlib.redirect_stdout() quiet its log lines as well.
+A JSON line holds the time, level, logger and message plus the fields a
+call passed in extra=, e.g. {"employee_id": "240631"}.
+"""
+
+import sys
+import json
+import logging
+from datetime import datetime, timezone
+
+
+LOG_LEVELS = ('debug', 'info', 'warning', 'error')
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Stream handler bound to the current sys.stdout rather than the one at setup"""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the record's extra= fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level='info', json_lines=False, loggers=('src',)):
+    """
+    Send the given loggers' records at or above level to stdout.
+
+    Args:
+        level: One of LOG_LEVELS
+        json_lines: Write JSON lines instead of the plain messages
+        loggers: Logger names to configure; their children inherit the setup
+    """
+    if level not in LOG_LEVELS:
+        raise ValueError(f"Unknown log level '{level}' (expected one of {', '.join(LOG_LEVELS)})")
+    handler = _StdoutHandler()
+    handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter('%(message)s'))
+    for name in loggers:
+        logger = logging.getLogger(name)
+        logger.handlers[:] = [handler]
+        logger.setLevel(level.upper())
+        # Keep third-party handlers on the root logger from printing them twice
+        logger.propagate = False
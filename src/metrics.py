@@ -0,0 +1,224 @@
+"""
+Always-on extraction metrics in the Prometheus text format
+
+The registry counts documents, pages, tables and employees per parser,
+records dropped or incomplete for a missing ID or name, camelot flavor
+fallbacks and quarantined pages, and keeps latency histograms of the
+stages marked with instrument.timed()/stage() and of whole documents.
+Updating a metric takes a lock and a dictionary update, so the metrics
+stay enabled in production; they are only updated per table, stage or
+document, never per cell.
+
+    from src import metrics
+    metrics.TABLES.inc(parser='attendance')
+    metrics.exposition()                    # Prometheus text format
+    metrics.write_textfile('run.prom')      # for node_exporter's textfile collector
+
+Each process has its own registry, reset in forked children. Worker tasks
+return drain() (their changes since the last drain) with their results and
+the parent adds them with merge(), so the service and the CLI's parallel
+modes report the work done in their workers.
+"""
+
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+
+# Upper bounds in seconds; a camelot page takes seconds, a table step milliseconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_registry = {}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def drain(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for key, amount in values.items():
+                self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, amount in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(amount)}"
+
+
+class Histogram(Counter):
+    """Observation counts per bucket, with their sum, per label combination"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket counts (the last one past every bound), then the sum
+                entry = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    def merge(self, values):
+        with self._lock:
+            for key, other in values.items():
+                entry = self._values.get(key)
+                if entry is None:
+                    self._values[key] = list(other)
+                else:
+                    for i, amount in enumerate(other):
+                        entry[i] += amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, list(entry)) for key, entry in self._values.items())
+        for key, entry in values:
+            cumulative = 0
+            for bound, amount in zip((*self.buckets, float('inf')), entry[:-1]):
+                cumulative += amount
+                labels = _format_labels(self.labelnames, key, [('le', _format_number(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_number(entry[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+def counter(name, documentation, labelnames=()):
+    """Create and register a counter"""
+    metric = _registry[name] = Counter(name, documentation, labelnames)
+    return metric
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Create and register a histogram"""
+    metric = _registry[name] = Histogram(name, documentation, labelnames, buckets)
+    return metric
+
+
+DOCUMENTS = counter('pdf_documents_total', 'Documents extracted, by outcome', ('parser', 'status'))
+DOCUMENT_SECONDS = histogram('pdf_document_seconds', 'Time to extract a whole document', ('parser',))
+PAGES = counter('pdf_pages_total', 'Pages that produced at least one table', ('parser',))
+TABLES = counter('pdf_tables_total', 'Tables processed', ('parser',))
+EMPLOYEES = counter('pdf_employees_total', 'Employee records extracted', ('parser',))
+RECORDS_MISSING = counter(
+    'pdf_records_missing_field_total',
+    'Employee rows dropped or kept incomplete for a missing ID or name', ('parser', 'field'),
+)
+FLAVOR_FALLBACKS = counter(
+    'pdf_flavor_fallbacks_total', 'Camelot reads retried with another flavor', ('parser', 'from_flavor', 'to_flavor'),
+)
+PAGES_QUARANTINED = counter(
+    'pdf_pages_quarantined_total', 'Pages quarantined under a page budget', ('parser', 'reason', 'settings'),
+)
+REQUESTS_REJECTED = counter('pdf_requests_rejected_total', 'Service requests refused with a full queue', ('parser',))
+STAGE_SECONDS = histogram('pdf_stage_seconds', 'Latency of the instrumented extraction stages', ('stage',))
+
+
+@contextmanager
+def document(parser_type):
+    """Count a document and time it; an exception counts it as an error"""
+    started = time.perf_counter()
+    status = 'error'
+    try:
+        yield
+        status = 'ok'
+    finally:
+        DOCUMENTS.inc(parser=parser_type, status=status)
+        DOCUMENT_SECONDS.observe(time.perf_counter() - started, parser=parser_type)
+
+
+def drain():
+    """Take this process's changes since the last drain, for a parent to merge()"""
+    drained = {}
+    for name, metric in _registry.items():
+        values = metric.drain()
+        if values:
+            drained[name] = values
+    return drained
+
+
+def merge(drained):
+    """Add the changes a worker returned from drain()"""
+    for name, values in drained.items():
+        _registry[name].merge(values)
+
+
+def reset():
+    """Zero every metric"""
+    for metric in _registry.values():
+        metric.drain()
+
+
+def exposition():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry.values():
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path):
+    """Write the exposition to a file, replacing it atomically"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(exposition())
+    os.replace(temp_path, path)
+
+
+def _after_fork():
+    # A forked worker must not report (and its parent then merge) the parent's
+    # counts again. New locks too: another thread may have held one at the fork.
+    for metric in _registry.values():
+        metric._lock = threading.Lock()
+        metric._values = {}
+
+
+os.register_at_fork(after_in_child=_after_fork)
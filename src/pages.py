@@ -0,0 +1,76 @@
+"""Page counting and page-range helpers shared by the parallel runners"""
+
+from .pdf_source import as_pdf_input
+
+
+def count_pages(source):
+    """
+    Count the pages of a PDF without running camelot.
+
+    Args:
+        source: Path, bytes, memoryview or binary file-like object
+
+    Returns:
+        Number of pages
+    """
+    from pypdf import PdfReader
+
+    with as_pdf_input(source) as pdf_input:
+        return len(PdfReader(pdf_input, strict=False).pages)
+
+
+def parse_page_selection(pages, page_count):
+    """
+    Expand a camelot-style page selection into sorted page numbers.
+
+    Args:
+        pages: 'all', '3', '1-4,7' or '10-end'
+        page_count: Number of pages in the document
+
+    Returns:
+        Sorted list of unique 1-based page numbers
+
+    Raises:
+        ValueError: If a page is outside the document
+    """
+    if pages == 'all':
+        return list(range(1, page_count + 1))
+
+    selected = set()
+    for part in str(pages).split(','):
+        part = part.strip()
+        if '-' in part:
+            first, last = part.split('-', 1)
+            last = page_count if last.strip() == 'end' else int(last)
+            selected.update(range(int(first), last + 1))
+        elif part:
+            selected.add(int(part))
+
+    out_of_range = [page for page in selected if not 1 <= page <= page_count]
+    if out_of_range:
+        raise ValueError(f"Pages {out_of_range} outside document of {page_count} pages")
+    return sorted(selected)
+
+
+def chunk_pages(page_numbers, pages_per_chunk):
+    """Split sorted page numbers into consecutive chunks of at most N pages"""
+    return [
+        page_numbers[start:start + pages_per_chunk]
+        for start in range(0, len(page_numbers), pages_per_chunk)
+    ]
+
+
+def format_pages(page_numbers):
+    """Compact camelot page selection for page numbers, e.g. [1, 2, 3, 7] -> '1-3,7'"""
+    parts = []
+    run_start = previous = None
+    for page in sorted(page_numbers):
+        if previous is not None and page == previous + 1:
+            previous = page
+            continue
+        if run_start is not None:
+            parts.append(str(run_start) if run_start == previous else f"{run_start}-{previous}")
+        run_start = previous = page
+    if run_start is not None:
+        parts.append(str(run_start) if run_start == previous else f"{run_start}-{previous}")
+    return ','.join(parts)
@@ -0,0 +1,91 @@
+"""Registry of the available PDF parsers and their default locations"""
+
+import importlib
+from pathlib import Path
+
+
+# Libraries the parsers import on first use; camelot brings pandas, OpenCV and pdfminer
+HEAVY_IMPORTS = ('camelot',)
+
+PARSERS = {
+    'attendance': {
+        'module': 'src.attendance.parser',
+        'test_module': 'src.attendance.test',
+        'label': 'Attendance',
+        'default_pdf': 'materials/出勤簿 - shukkinbo - attendance book.pdf',
+        'output_folder': 'output/attendance',
+        'basename': 'attendance_records',
+        'title': 'Attendance Records',
+        'id_field': 'employee_id',
+        'filename_keywords': ('attendance', 'shukkinbo', '出勤簿'),
+        # Rough seconds per page, used only to balance batch work
+        'page_cost': 3.0,
+        # Cheaper camelot settings for retrying pages that ran out of time
+        # (None: no retry)
+        'cheap_read_options': {'resolution': 150},
+    },
+    'allowance': {
+        'module': 'src.allowance.parser',
+        'test_module': 'src.allowance.test',
+        'label': 'Allowance',
+        'default_pdf': 'materials/運転手手当一覧表 - Untenshu teate ichiran hyō - Driver Allowance List.pdf',
+        'output_folder': 'output/allowance',
+        'basename': 'driver_allowance',
+        'title': 'Driver Allowance List',
+        'id_field': 'shain_id',
+        'filename_keywords': ('allowance', 'teate', '手当'),
+        'page_cost': 0.25,
+        # Stream is already the first attempt, and lattice is slower and
+        # finds no tables in these ruling-free lists: nothing cheaper to retry with
+        'cheap_read_options': None,
+    },
+}
+
+
+def get_parser_config(parser_type):
+    """
+    Look up the registry entry for a parser type.
+    
+    Args:
+        parser_type: 'attendance' or 'allowance'
+    
+    Returns:
+        Configuration dictionary for the parser
+    
+    Raises:
+        ValueError: If the parser type is unknown
+    """
+    try:
+        return PARSERS[parser_type]
+    except KeyError:
+        raise ValueError(f"Unknown parser type: {parser_type}")
+
+
+def parser_for_filename(filename):
+    """
+    Pick the parser whose filename keywords appear in a file name.
+    
+    Args:
+        filename: File name or path
+    
+    Returns:
+        Parser type, or None if no parser (or more than one) matches
+    """
+    name = Path(filename).name.lower()
+    matches = [
+        parser_type for parser_type, config in PARSERS.items()
+        if any(keyword in name for keyword in config['filename_keywords'])
+    ]
+    return matches[0] if len(matches) == 1 else None
+
+
+def load_parser(parser_type):
+    """Import and return the parser module for a parser type"""
+    return importlib.import_module(get_parser_config(parser_type)['module'])
+
+
+def warm_parser(parser_type):
+    """Import a parser together with the heavy libraries it would import on first use"""
+    for module_name in HEAVY_IMPORTS:
+        importlib.import_module(module_name)
+    return load_parser(parser_type)
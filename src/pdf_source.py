@@ -0,0 +1,64 @@
+"""
+PDF input from paths, bytes or binary file-like objects
+
+Camelot and pypdf read binary file objects directly, so in-memory input is
+handed to them as a BytesIO and never touches the disk.
+"""
+
+import io
+import os
+from contextlib import contextmanager
+
+
+def is_path(source):
+    """True if the source is a filesystem path rather than in-memory data"""
+    return isinstance(source, (str, os.PathLike))
+
+
+def read_source_bytes(source):
+    """
+    Return in-memory PDF data as a bytes-like object.
+
+    Args:
+        source: bytes, bytearray, memoryview or a binary file-like object
+
+    Raises:
+        TypeError: If the source is not binary PDF data
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    if hasattr(source, 'read'):
+        data = source.read()
+        if not isinstance(data, (bytes, bytearray)):
+            raise TypeError("PDF file-like objects must be opened in binary mode")
+        return data
+    raise TypeError(f"Unsupported PDF source: {type(source).__name__}")
+
+
+def describe_source(source):
+    """Short printable description of a PDF source"""
+    if is_path(source):
+        return str(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"<{len(memoryview(source).cast('B'))} bytes in memory>"
+    return f"<{getattr(source, 'name', type(source).__name__)}>"
+
+
+@contextmanager
+def as_pdf_input(source):
+    """
+    Context manager yielding something camelot and pypdf can read.
+
+    Args:
+        source: Path, bytes, bytearray, memoryview or binary file-like object
+
+    Yields:
+        The original path or seekable file object, or a BytesIO over the data
+    """
+    if is_path(source):
+        yield source
+    elif hasattr(source, 'read') and hasattr(source, 'seek') and source.seekable():
+        yield source
+    else:
+        yield io.BytesIO(read_source_bytes(source))
+
@@ -0,0 +1,249 @@
+"""
+Profiling of extraction runs
+
+Two modes:
+- 'cprofile': deterministic profile of every call (cProfile)
+- 'sample': a background thread samples the profiled thread's stack every
+  few milliseconds; the overhead does not grow with the number of calls
+
+Both write a pstats file (pstats, snakeviz, ...) and a collapsed-stack text
+file, one "frame;frame;frame microseconds" line per stack, for
+flamegraph.pl, speedscope or inferno. Sampled stacks are exact; each sample
+stands for the wall time since the previous one, and sampled pstats count
+samples rather than calls. cProfile only records caller/callee pairs, so its
+stacks are rebuilt by splitting each function's time across its callers in
+proportion.
+
+A profiler can be limited to some pages: it then records only while one of
+those pages is read or processed (see instrument.page).
+"""
+
+import os
+import sys
+import time
+import marshal
+import pstats
+import cProfile
+import functools
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from . import instrument
+
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+# Seconds between stack samples in 'sample' mode
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# Reconstructed cProfile stacks deeper than this, or cheaper than this many
+# seconds, are cut off
+MAX_STACK_DEPTH = 200
+MIN_STACK_SECONDS = 1e-4
+
+
+def profile_paths(output_folder, basename):
+    """pstats and collapsed-stack paths in an output folder"""
+    prefix = f"{output_folder}/{basename}"
+    return f"{prefix}.pstats", f"{prefix}.collapsed.txt"
+
+
+@functools.lru_cache(maxsize=None)
+def _label(func):
+    """Flame graph frame name of a pstats function key"""
+    filename, line, name = func
+    if filename == '~':
+        label = name
+    else:
+        for prefix in sorted(sys.path, key=len, reverse=True):
+            if prefix and filename.startswith(prefix + os.sep):
+                filename = filename[len(prefix) + 1:]
+                break
+        label = f"{name} ({filename}:{line})"
+    # ';' separates frames in the collapsed format
+    return label.replace(';', ':')
+
+
+class ProfileData:
+    """pstats-format statistics plus collapsed stacks; picklable across processes"""
+
+    def __init__(self, stats=None, stacks=None):
+        # func -> (primitive calls, calls, own seconds, cumulative seconds, callers)
+        self.stats = stats or {}
+        # 'frame;frame;frame' -> value
+        self.stacks = Counter(stacks or {})
+
+    def merge(self, other):
+        """Add another profile (e.g. from another worker) into this one"""
+        for func, stat in other.stats.items():
+            if func in self.stats:
+                self.stats[func] = pstats.add_func_stats(self.stats[func], stat)
+            else:
+                self.stats[func] = stat
+        self.stacks.update(other.stacks)
+
+    def save(self, pstats_path, collapsed_path):
+        """Write the pstats file and the collapsed-stack file"""
+        with open(pstats_path, 'wb') as f:
+            marshal.dump(self.stats, f)
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            for stack, value in sorted(self.stacks.items()):
+                if value > 0:
+                    f.write(f"{stack} {value}\n")
+
+
+def _collapse_cprofile(stats):
+    """Rebuild collapsed stacks (microseconds) from cProfile caller/callee pairs"""
+    children = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+
+    stacks = Counter()
+
+    def walk(func, path, on_path, share):
+        _, _, own, cumulative, _ = stats[func]
+        path = f"{path};{_label(func)}" if path else _label(func)
+        value = round(own * share * 1e6)
+        if value:
+            stacks[path] += value
+        if len(on_path) >= MAX_STACK_DEPTH:
+            return
+        on_path = on_path | {func}
+        for child, edge_seconds in children.get(func, ()):
+            child_cumulative = stats[child][3]
+            # Recursion shows up as a cycle; its time is already in the caller
+            if child in on_path or not child_cumulative:
+                continue
+            child_share = share * edge_seconds / child_cumulative
+            if child_share * child_cumulative >= MIN_STACK_SECONDS:
+                walk(child, path, on_path, child_share)
+
+    for func, (_, _, _, _, callers) in stats.items():
+        # Roots, except the profiler's own enable/disable calls
+        if not callers and func[0] != __file__:
+            walk(func, '', frozenset(), 1.0)
+    return stacks
+
+
+def _frame_key(frame):
+    code = frame.f_code
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+class Profiler:
+    """
+    Profile the calling thread, optionally only while given pages are worked on.
+
+    Args:
+        mode: 'cprofile' or 'sample'
+        pages: Page numbers to profile, or None for the whole run
+        interval: Seconds between samples in 'sample' mode
+    """
+
+    def __init__(self, mode='cprofile', pages=None, interval=DEFAULT_SAMPLE_INTERVAL):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode} (choose from {', '.join(PROFILE_MODES)})")
+        self.mode = mode
+        self.pages = set(pages) if pages is not None else None
+        self.interval = interval
+        self._profile = cProfile.Profile() if mode == 'cprofile' else None
+        # stack -> (samples, seconds)
+        self._samples = {}
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        if self.mode == 'sample':
+            self._sampler = threading.Thread(target=self._sample_loop, name='profile-sampler', daemon=True)
+            self._sampler.start()
+        if self.pages is None:
+            self._enable()
+        else:
+            instrument.add_page_observer(self._observe_page)
+        return self
+
+    def stop(self):
+        """Stop profiling and return the ProfileData"""
+        if self.pages is None:
+            self._disable()
+        else:
+            instrument.remove_page_observer(self._observe_page)
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            return self._sampled_data()
+        self._profile.create_stats()
+        stats = self._profile.stats
+        return ProfileData(stats, _collapse_cprofile(stats))
+
+    @contextmanager
+    def _observe_page(self, page_number):
+        if page_number not in self.pages:
+            yield
+            return
+        self._enable()
+        try:
+            yield
+        finally:
+            self._disable()
+
+    def _enable(self):
+        self._thread_id = threading.get_ident()
+        if self._profile is not None:
+            self._profile.enable()
+
+    def _disable(self):
+        if self._profile is not None:
+            self._profile.disable()
+        self._thread_id = None
+
+    def _sample_loop(self):
+        own_thread = threading.get_ident()
+        previous = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            # A long call that holds the GIL delays the next sample, so each
+            # sample stands for the wall time since the previous one
+            now = time.perf_counter()
+            elapsed, previous = now - previous, now
+            thread_id = self._thread_id
+            if thread_id is None or thread_id == own_thread:
+                continue
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            if stack:
+                key = tuple(reversed(stack))
+                count, seconds = self._samples.get(key, (0, 0.0))
+                self._samples[key] = (count + 1, seconds + elapsed)
+
+    def _sampled_data(self):
+        stats = {}
+        stacks = Counter()
+        for stack, (n, seconds) in self._samples.items():
+            stacks[';'.join(_label(func) for func in stack)] += round(seconds * 1e6)
+            seen = set()
+            for depth, func in enumerate(stack):
+                calls, total, own, cumulative, callers = stats.get(func, (0, 0, 0.0, 0.0, {}))
+                leaf = depth == len(stack) - 1
+                if leaf:
+                    own += seconds
+                if func not in seen:
+                    seen.add(func)
+                    calls, total, cumulative = calls + n, total + n, cumulative + seconds
+                if depth:
+                    caller = stack[depth - 1]
+                    edge = callers.get(caller, (0, 0, 0.0, 0.0))
+                    callers[caller] = (edge[0] + n, edge[1] + n, edge[2] + (seconds if leaf else 0.0),
+                                       edge[3] + seconds)
+                stats[func] = (calls, total, own, cumulative, callers)
+        return ProfileData(stats, stacks)
+
+
+def print_top(pstats_path, limit=15):
+    """Print the functions with the most cumulative time"""
+    pstats.Stats(str(pstats_path)).sort_stats('cumulative').print_stats(limit)
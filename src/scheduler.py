@@ -0,0 +1,396 @@
+"""
+Priority and weighted fair scheduling of extraction jobs
+
+Each job is split into page shards. The scheduler keeps at most one shard
+per worker in flight and picks the next shard only when a worker frees up:
+
+- jobs with a higher priority always go first;
+- within a priority, jobs share workers by weighted fair queuing: every job
+  has a virtual time that advances by shard cost / weight, and the job whose
+  next shard would finish earliest in virtual time runs next. A job that arrives later starts at the
+  current virtual time, so it neither waits for nor catches up with work
+  submitted earlier.
+
+A single-page correction submitted while a 2,000-page book runs therefore
+waits for one shard, not for the book. Every job reports its queue wait and
+service time.
+
+A job's shared page file is created when the job is first picked for a
+worker and is split on a background thread; the job's shards are dispatched
+as their pages are split, and the file is removed when the job finishes, so
+queued jobs hold no copy of their document in /dev/shm. Shard results can
+be consumed in order as they arrive (Job.iter_shards), which is how the
+service streams.
+"""
+
+import io
+import time
+import logging
+import itertools
+import threading
+from contextlib import redirect_stdout
+from concurrent.futures import CancelledError
+
+from . import metrics
+from . import tracing
+from .pages import count_pages, parse_page_selection, chunk_pages, format_pages
+from .parsers import get_parser_config
+from .pdf_source import describe_source, is_path, read_source_bytes
+from .profiling import PROFILE_MODES, Profiler, ProfileData
+from .shared_input import SharedPdf, parse_shared_pages
+
+
+log = logging.getLogger(__name__)
+
+# Pages per shard unless the caller chooses; smaller shards mean lower latency
+# for small jobs at the cost of more per-task overhead
+DEFAULT_PAGES_PER_SHARD = 2
+
+
+def run_shard(parser_type, handle, page_numbers, quiet=False, profile=None, traced=False):
+    """Worker task: parse some pages of a SharedPdf, time it, optionally profile or trace it and drain its metrics"""
+    started = time.time()
+    profiler = Profiler(*profile).start() if profile else None
+    try:
+        with tracing.recording(traced) as recorder:
+            if quiet:
+                with redirect_stdout(io.StringIO()):
+                    page_records, employees = parse_shared_pages(parser_type, handle, page_numbers)
+            else:
+                page_records, employees = parse_shared_pages(parser_type, handle, page_numbers)
+    finally:
+        profile_data = profiler.stop() if profiler else None
+    trace_events = recorder.events if recorder else None
+    return page_records, employees, started, time.time() - started, profile_data, metrics.drain(), trace_events
+
+
+class Job:
+    """One document submitted to the scheduler; wait on it with result() or iter_shards()"""
+
+    def __init__(self, job_id, parser_type, priority, weight, source, shards, profile=None, trace=False):
+        self.job_id = job_id
+        self.parser_type = parser_type
+        self.priority = priority
+        self.weight = weight
+        # Split into a SharedPdf when the job is first picked
+        self.source = source
+        self.shared = None
+        self.pending_shards = shards
+        self.shard_count = len(shards)
+        self.page_numbers = [page for shard in shards for page in shard]
+        self.page_cost = get_parser_config(parser_type)['page_cost']
+        self.virtual_time = 0.0
+
+        self.submitted_at = time.time()
+        self.first_started_at = None
+        self.finished_at = None
+        self.service_seconds = 0.0
+        self.employees = {}
+        self.error = None
+        # Pages of the shard that failed, when a shard's worker raised
+        self.error_pages = None
+        # (mode, page numbers or None) to profile the shards with, and the merged result
+        self.profile_options = profile
+        self.profile = ProfileData() if profile else None
+        # Spans of the traced job's shards, under a document span added when it finishes
+        self.trace = tracing.Recorder() if trace else None
+        self.trace_source = None
+
+        # Shard index -> its (page_number, records) pairs
+        self._shard_results = {}
+        self._running = 0
+        self._done = threading.Event()
+        self._done_callbacks = []
+        self._progress = threading.Condition()
+
+    @property
+    def queue_seconds(self):
+        """Time from submission until the first shard started on a worker"""
+        if self.first_started_at is None:
+            return None
+        return self.first_started_at - self.submitted_at
+
+    @property
+    def split_seconds(self):
+        """Time spent splitting the document into its shared page file so far"""
+        return self.shared.split_seconds if self.shared is not None else 0.0
+
+    def shard_cost(self, shard):
+        """Estimated cost of a shard, scaled by the job's weight"""
+        return len(shard) * self.page_cost / self.weight
+
+    def virtual_finish(self):
+        """Virtual time at which the job's next shard would finish"""
+        return self.virtual_time + self.shard_cost(self.pending_shards[0])
+
+    def stats(self):
+        """Queue wait, service and total time of a finished job"""
+        return {
+            'job_id': self.job_id,
+            'priority': self.priority,
+            'shards': self.shard_count,
+            'queue_seconds': round(self.queue_seconds or 0.0, 4),
+            'service_seconds': round(self.service_seconds, 4),
+            'total_seconds': round((self.finished_at or time.time()) - self.submitted_at, 4),
+        }
+
+    def result(self, timeout=None):
+        """
+        Wait for the job and return its (page_number, records) pairs in page order.
+
+        Raises:
+            TimeoutError: If the job is not finished within the timeout
+            Exception: The first error raised by one of its shards
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Job {self.job_id} not finished")
+        if self.error is not None:
+            raise self.error
+        page_records = [pair for index in sorted(self._shard_results) for pair in self._shard_results[index]]
+        return sorted(page_records, key=lambda pair: pair[0])
+
+    def iter_shards(self):
+        """
+        Yield each shard's (page_number, records) pairs in shard order, as soon
+        as that shard and the ones before it are done. Consumes the results:
+        use either this or result().
+
+        Raises:
+            Exception: The job's error, after the shards done before it
+        """
+        for index in range(self.shard_count):
+            with self._progress:
+                self._progress.wait_for(lambda: index in self._shard_results or self.error is not None)
+                if index not in self._shard_results:
+                    raise self.error
+                page_records = self._shard_results.pop(index)
+            yield page_records
+
+    def wait(self, timeout=None):
+        """Block until the job has finished, including shards still running after a cancel"""
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, fn):
+        """
+        Call fn(job) once the job has finished, or now if it already has.
+
+        Runs on the scheduler's thread with its lock held, after the shards
+        still running after a cancel have finished; keep it short.
+        """
+        with self._progress:
+            if not self._done.is_set():
+                self._done_callbacks.append(fn)
+                return
+        fn(self)
+
+    def records(self, timeout=None):
+        """Wait for the job and return its records"""
+        return [record for _, table_records in self.result(timeout) for record in table_records]
+
+
+class FairScheduler:
+    """
+    Dispatch job shards onto an executor by priority and weighted fair share.
+
+    Args:
+        executor: ProcessPoolExecutor that runs the shards
+        workers: Shards kept in flight (normally the executor's worker count)
+        pages_per_shard: Default shard size
+        quiet: Suppress parser output in the workers
+    """
+
+    def __init__(self, executor, workers, pages_per_shard=DEFAULT_PAGES_PER_SHARD, quiet=False):
+        self.executor = executor
+        self.workers = workers
+        self.pages_per_shard = pages_per_shard
+        self.quiet = quiet
+        self._jobs = []
+        self._in_flight = 0
+        self._ids = itertools.count(1)
+        # Re-entrant: a done callback runs inline if its shard already finished
+        self._lock = threading.RLock()
+
+    def submit(self, parser_type, source, pages='all', priority=0, weight=1.0, pages_per_shard=None,
+               profile=None, profile_pages=None, trace=False):
+        """
+        Split a document into shards and queue it.
+
+        Args:
+            parser_type: 'attendance' or 'allowance'
+            source: Path, bytes, memoryview or binary file-like object
+            pages: Camelot page selection, defaults to every page
+            priority: Higher runs first; equal priorities share fairly
+            weight: Relative share among jobs of the same priority
+            pages_per_shard: Shard size for this job
+            profile: Profile the job's shards ('cprofile' or 'sample'); see Job.profile
+            profile_pages: Page selection to limit profiling to
+            trace: Record the job's spans; see Job.trace
+
+        Returns:
+            Job
+        """
+        if weight <= 0:
+            raise ValueError("Job weight must be positive")
+        if profile and profile not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {profile}")
+
+        if not is_path(source) and hasattr(source, 'read') and not (hasattr(source, 'seek') and source.seekable()):
+            # Read once to count the pages and again to split them
+            source = read_source_bytes(source)
+        page_count = count_pages(source)
+        page_numbers = parse_page_selection(pages, page_count)
+        profile_options = None
+        if profile:
+            profiled_pages = parse_page_selection(profile_pages, page_count) if profile_pages else None
+            profile_options = (profile, profiled_pages)
+        shards = chunk_pages(page_numbers, pages_per_shard or self.pages_per_shard)
+        job = Job(next(self._ids), parser_type, priority, weight, source, shards, profile_options, trace)
+        if trace:
+            job.trace_source = describe_source(source)
+
+        with self._lock:
+            if not shards:
+                self._finish(job)
+                return job
+            # Start at the current virtual time of the jobs already sharing the workers
+            peers = [other.virtual_time for other in self._jobs if other.priority == priority]
+            job.virtual_time = min(peers) if peers else 0.0
+            self._jobs.append(job)
+            self._dispatch()
+        return job
+
+    def cancel(self, job):
+        """Drop a job's shards that have not started; those on a worker finish"""
+        with self._lock:
+            if not job._done.is_set():
+                self._fail(job, CancelledError())
+
+    def _next_job(self):
+        """
+        Job whose next shard should run now, or None.
+
+        Jobs are tried in priority and virtual-time order, passing over those
+        whose next shard is still being split. A job's split is started the
+        first time it is tried, unless another job is already waiting for
+        its split; the split thread dispatches again once a page is split.
+        """
+        candidates = sorted(
+            (job for job in self._jobs if job.pending_shards and job.error is None),
+            key=lambda job: (-job.priority, job.virtual_finish(), job.job_id),
+        )
+        waiting_for_split = False
+        for job in candidates:
+            if job.shared is None:
+                if waiting_for_split:
+                    continue
+                self._start_split(job)
+                if job.error is None:
+                    return None
+                continue
+            try:
+                if job.shared.ready(job.pending_shards[0]):
+                    return job
+            except Exception as e:
+                # The split failed
+                self._fail(job, e)
+                continue
+            waiting_for_split = True
+        return None
+
+    def _start_split(self, job):
+        try:
+            job.shared = SharedPdf.create(job.source, pages=format_pages(job.page_numbers), background=True,
+                                          on_progress=self._split_progress)
+        except Exception as e:
+            self._fail(job, e)
+
+    def _split_progress(self):
+        with self._lock:
+            self._dispatch()
+
+    def _dispatch(self):
+        """Fill idle workers with shards; called with the lock held"""
+        while self._in_flight < self.workers:
+            job = self._next_job()
+            if job is None:
+                return
+            index = job.shard_count - len(job.pending_shards)
+            shard = job.pending_shards.pop(0)
+            job.virtual_time += job.shard_cost(shard)
+            try:
+                future = self.executor.submit(
+                    run_shard, job.parser_type, job.shared.handle_for(shard), shard, self.quiet,
+                    job.profile_options, job.trace is not None,
+                )
+            except Exception as e:
+                # e.g. BrokenProcessPool: fail the job rather than the caller's thread
+                self._fail(job, e)
+                continue
+            job._running += 1
+            self._in_flight += 1
+            future.add_done_callback(
+                lambda future, job=job, index=index, shard=shard: self._shard_done(job, index, shard, future)
+            )
+
+    def _shard_done(self, job, index, shard, future):
+        with self._lock:
+            self._in_flight -= 1
+            job._running -= 1
+            try:
+                (page_records, employees, started, seconds, profile_data, worker_metrics,
+                 trace_events) = future.result()
+            except Exception as e:
+                self._fail(job, e, shard)
+            else:
+                metrics.merge(worker_metrics)
+                if job.first_started_at is None or started < job.first_started_at:
+                    job.first_started_at = started
+                job.service_seconds += seconds
+                with job._progress:
+                    job._shard_results[index] = page_records
+                    job._progress.notify_all()
+                if profile_data is not None:
+                    job.profile.merge(profile_data)
+                if trace_events is not None:
+                    job.trace.merge(trace_events)
+                for employee_id, locations in employees.items():
+                    job.employees.setdefault(employee_id, []).extend(locations)
+
+            if not job.pending_shards and job._running == 0 and job in self._jobs:
+                self._jobs.remove(job)
+                self._finish(job)
+            self._dispatch()
+
+    def _fail(self, job, error, shard=None):
+        with job._progress:
+            if job.error is None:
+                job.error = error
+                job.error_pages = shard
+            job._progress.notify_all()
+        job.pending_shards = []
+        if job._running == 0 and job in self._jobs:
+            self._jobs.remove(job)
+            self._finish(job)
+
+    def _finish(self, job):
+        job.finished_at = time.time()
+        if job.trace is not None:
+            if job.error is None:
+                status = 'ok'
+            else:
+                status = 'cancelled' if isinstance(job.error, CancelledError) else 'error'
+            job.trace.finish(job_id=job.job_id, parser=job.parser_type, source=job.trace_source,
+                             shards=job.shard_count, status=status)
+        if job.shared is not None:
+            job.shared.close()
+        # The shared copy is gone; drop the document
+        job.source = None
+        with job._progress:
+            job._done.set()
+            callbacks, job._done_callbacks = job._done_callbacks, []
+        for callback in callbacks:
+            try:
+                callback(job)
+            except Exception:
+                # Never stop the scheduler's dispatching over one job's callback
+                log.exception("Done callback of job %s failed", job.job_id)
@@ -0,0 +1,330 @@
+"""
+HTTP extraction service backed by a pool of pre-warmed worker processes
+
+Workers import camelot, pandas, OpenCV and both parsers when the service
+starts, so a request only pays for parsing. Requests beyond the worker count
+wait in a bounded queue; once the queue is full the service answers 503.
+
+Documents are split into page shards and interleaved by the FairScheduler,
+so small requests are not stuck behind a large book; ?priority=N (higher
+first) and ?weight=W adjust the order.
+
+Endpoints:
+    POST /attendance    PDF as the request body or a multipart 'file' field
+    POST /allowance     (optional ?pages=1-20, ?priority=N, ?weight=W, ?stream=1 for NDJSON,
+                         ?profile=cprofile|sample, ?profile_pages=3-5)
+    GET  /health
+    GET  /metrics       Prometheus text format (see src.metrics), including the workers' counts
+
+With ?profile=cprofile or ?profile=sample the document's shards are
+profiled in the workers (optionally only ?profile_pages=3-5) and the merged
+pstats and collapsed-stack files are saved in the profile folder; their
+paths are returned under "profile".
+
+With a trace folder, each document is traced with probability trace_sample
+(see src.tracing): the spans of its pages, tables, employees and fields in
+the workers, under a document span. The trace is saved as
+<parser>-<time>-<n>.trace.json if the document took at least
+trace_slower_than seconds, and its path is returned under "trace" (not
+with ?stream=1, whose trace is saved after the last line).
+
+With ?stream=1 the response is newline-delimited JSON sent as each page
+finishes: one {"type": "record"} line per record and a final
+{"type": "summary"} line with counts and stage timings. Streams are
+scheduled like other requests, one page per shard. Closing the connection
+cancels the pages that have not started yet.
+"""
+
+import os
+import json
+import time
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import Flask, Response, jsonify, request
+
+from . import metrics
+from . import tracing
+from .parsers import PARSERS, warm_parser
+from .profiling import PROFILE_MODES, profile_paths
+from .scheduler import FairScheduler
+
+
+# Fraction of documents traced when a trace folder is set
+DEFAULT_TRACE_SAMPLE = 0.01
+
+
+def _warm_worker():
+    """Import both parsers (and camelot, pandas, OpenCV with them) up front"""
+    for parser_type in PARSERS:
+        warm_parser(parser_type)
+
+
+def _ping():
+    return os.getpid()
+
+
+_trace_ids = itertools.count(1)
+
+
+def save_trace(recorder, seconds, trace_dir, parser_type, min_seconds=0.0):
+    """Save a document's trace in trace_dir if it took at least min_seconds; returns the path or None"""
+    if seconds < min_seconds:
+        return None
+    os.makedirs(trace_dir, exist_ok=True)
+    path = os.path.join(trace_dir, f"{parser_type}-{int(time.time())}-{next(_trace_ids)}.trace.json")
+    recorder.save(path, {'parser': parser_type, 'seconds': round(seconds, 4)})
+    return path
+
+
+class WorkerPool:
+    """Process pool with a concurrency limit and a bounded request queue"""
+
+    def __init__(self, workers=None, max_queue=32):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        self._slots = threading.BoundedSemaphore(self.workers + max_queue)
+        self.scheduler = FairScheduler(self._executor, self.workers, quiet=True)
+
+    def warm_up(self):
+        """Start every worker process now instead of on the first requests"""
+        for future in [self._executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def try_acquire(self):
+        """Reserve a place in the queue; False when the queue is full"""
+        return self._slots.acquire(blocking=False)
+
+    def release(self):
+        self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(cancel_futures=True)
+
+
+def _request_pdf():
+    """PDF bytes from a multipart 'file' field or the raw request body"""
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        return upload.read() if upload is not None else b''
+    # Do not let Flask parse a raw upload as a form
+    return request.get_data(parse_form_data=False)
+
+
+def _ndjson(obj):
+    return json.dumps(obj, ensure_ascii=False) + '\n'
+
+
+def stream_document(pool, parser_type, data, pages='all', priority=0, weight=1.0, trace_dir=None,
+                    trace_slower_than=0.0, release=None):
+    """
+    Generate NDJSON lines for a document, page by page, in page order.
+
+    The document is a job of one-page shards on the pool's FairScheduler, so
+    its priority and weight count like any other request's and it holds no
+    more than its share of the workers. Each page is sent as soon as it and
+    the pages before it are done. When the client goes away (the generator
+    is closed) the job is cancelled: only its pages already on a worker still
+    run. The caller's queue slot is released (release, default
+    pool.release) when the generator finishes; a response closed before the
+    generator starts must release it too, so pass a once-only release (see
+    _release_once). With a trace_dir the document is traced (the caller
+    samples) and saved there by the scheduler once its last page is done.
+    """
+    release = release or pool.release
+    received = time.time()
+    # Until a summary or an error is sent, a stream that stops was closed by the client
+    status = 'cancelled'
+    record_count = table_count = 0
+    first_record_at = None
+    job = None
+
+    try:
+        job = pool.scheduler.submit(parser_type, data, pages, priority, weight, pages_per_shard=1,
+                                    trace=trace_dir is not None)
+        if job.trace is not None:
+            # Saved when pages still running after a cancel have added their spans
+            job.add_done_callback(lambda job: save_trace(
+                job.trace, job.stats()['total_seconds'], trace_dir, parser_type, trace_slower_than
+            ))
+        for page_records in job.iter_shards():
+            for table_page, records in page_records:
+                table_count += 1
+                for record in records:
+                    if first_record_at is None:
+                        first_record_at = time.time()
+                    record_count += 1
+                    yield _ndjson({'type': 'record', 'page': table_page, 'record': record})
+
+        status = 'ok'
+        stats = job.stats()
+        yield _ndjson({
+            'type': 'summary',
+            'parser': parser_type,
+            'pages': len(job.page_numbers),
+            'tables': table_count,
+            'records': record_count,
+            'timing': {
+                'split_seconds': round(job.split_seconds, 4),
+                'queue_seconds': stats['queue_seconds'],
+                'parse_seconds': stats['service_seconds'],
+                'first_record_seconds': round(first_record_at - received, 4) if first_record_at else None,
+                'total_seconds': round(time.time() - received, 4),
+            },
+        })
+    except Exception as e:
+        status = 'error'
+        if job is not None and job.error_pages:
+            yield _ndjson({'type': 'error', 'page': job.error_pages[0], 'error': str(e)})
+        else:
+            yield _ndjson({'type': 'error', 'error': f'Extraction failed: {e}'})
+    finally:
+        if job is not None:
+            pool.scheduler.cancel(job)
+        release()
+        metrics.DOCUMENTS.inc(parser=parser_type, status=status)
+        metrics.DOCUMENT_SECONDS.observe(time.time() - received, parser=parser_type)
+
+
+def _release_once(pool):
+    """pool.release that only releases on its first call"""
+    lock = threading.Lock()
+    released = False
+
+    def release():
+        nonlocal released
+        with lock:
+            if released:
+                return
+            released = True
+        pool.release()
+
+    return release
+
+
+def create_app(pool, profile_dir='output/profiles', trace_dir=None, trace_sample=DEFAULT_TRACE_SAMPLE,
+               trace_slower_than=0.0):
+    """
+    Build the Flask application.
+
+    Args:
+        pool: WorkerPool that runs the extractions
+        profile_dir: Folder for the profiles of ?profile= requests
+        trace_dir: Folder for document traces; None to trace nothing
+        trace_sample: Fraction of documents to trace
+        trace_slower_than: Only save traces of documents that took at least this many seconds
+    """
+    app = Flask(__name__)
+
+    def extract(parser_type):
+        received = time.time()
+        data = _request_pdf()
+        if not data:
+            return jsonify({'error': 'Empty request: send a PDF body or a multipart "file" field'}), 400
+
+        if not pool.try_acquire():
+            metrics.REQUESTS_REJECTED.inc(parser=parser_type)
+            return jsonify({'error': 'Extraction queue is full, retry later'}), 503
+
+        pages = request.args.get('pages', 'all')
+        profile = request.args.get('profile')
+        traced = trace_dir is not None and tracing.sampled(trace_sample)
+        try:
+            priority = int(request.args.get('priority', 0))
+            weight = float(request.args.get('weight', 1.0))
+        except ValueError:
+            pool.release()
+            return jsonify({'error': 'priority must be an integer and weight a number'}), 400
+
+        if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+            if profile:
+                pool.release()
+                return jsonify({'error': 'profile is not available with stream=1'}), 400
+            # The generator releases the queue slot when the stream ends; closing the
+            # response does, in case the generator never started
+            release = _release_once(pool)
+            response = Response(
+                stream_document(pool, parser_type, data, pages, priority, weight,
+                                trace_dir if traced else None, trace_slower_than, release),
+                mimetype='application/x-ndjson',
+            )
+            response.call_on_close(release)
+            return response
+
+        if profile and profile not in PROFILE_MODES:
+            pool.release()
+            return jsonify({'error': f"profile must be one of: {', '.join(PROFILE_MODES)}"}), 400
+
+        try:
+            with metrics.document(parser_type):
+                job = pool.scheduler.submit(parser_type, data, pages, priority, weight, profile=profile,
+                                            profile_pages=request.args.get('profile_pages'), trace=traced)
+                records = job.records()
+        except BrokenProcessPool:
+            return jsonify({'error': 'Worker pool failed'}), 500
+        except Exception as e:
+            # camelot/pypdf errors on unreadable or non-PDF uploads
+            return jsonify({'error': f'Extraction failed: {e}'}), 422
+        finally:
+            pool.release()
+
+        stats = job.stats()
+        response = {
+            'parser': parser_type,
+            'count': len(records),
+            'records': records,
+            'timing': {
+                'queue_seconds': stats['queue_seconds'],
+                'service_seconds': stats['service_seconds'],
+                'shards': stats['shards'],
+                'total_seconds': round(time.time() - received, 4),
+            },
+        }
+        if job.profile is not None:
+            os.makedirs(profile_dir, exist_ok=True)
+            pstats_path, collapsed_path = profile_paths(
+                profile_dir, f"{parser_type}-{int(received)}-{job.job_id}"
+            )
+            job.profile.save(pstats_path, collapsed_path)
+            response['profile'] = {'pstats': pstats_path, 'collapsed': collapsed_path}
+        if job.trace is not None:
+            trace_path = save_trace(job.trace, stats['total_seconds'], trace_dir, parser_type, trace_slower_than)
+            if trace_path:
+                response['trace'] = trace_path
+        return jsonify(response)
+
+    @app.post('/attendance')
+    def attendance():
+        return extract('attendance')
+
+    @app.post('/allowance')
+    def allowance():
+        return extract('allowance')
+
+    @app.get('/health')
+    def health():
+        return jsonify({'status': 'ok', 'workers': pool.workers, 'max_queue': pool.max_queue})
+
+    @app.get('/metrics')
+    def metrics_endpoint():
+        return Response(metrics.exposition(), mimetype='text/plain; version=0.0.4')
+
+    return app
+
+
+def serve(host='127.0.0.1', port=8000, workers=None, max_queue=32, profile_dir='output/profiles',
+          trace_dir=None, trace_sample=DEFAULT_TRACE_SAMPLE, trace_slower_than=0.0):
+    """Start the worker pool and run the HTTP service until interrupted"""
+    pool = WorkerPool(workers, max_queue)
+    print(f"Warming up {pool.workers} worker(s)...")
+    pool.warm_up()
+    print(f"Serving on http://{host}:{port} (queue limit {max_queue})")
+    try:
+        create_app(pool, profile_dir, trace_dir, trace_sample, trace_slower_than).run(
+            host=host, port=port, threaded=True
+        )
+    finally:
+        pool.shutdown()
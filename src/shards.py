@@ -0,0 +1,208 @@
+"""
+Partitioned JSON output with a manifest
+
+Records are grouped into shards either by page range or by a fixed record
+count. Each shard is written as its own JSON file and described in a
+manifest (page range, record count, employee ID range and checksum), so
+downstream jobs can process shards independently and a single failed shard
+can be re-extracted from its page range.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+from .common import save_json
+from .pdf_source import describe_source
+
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(filepath):
+    """Return the hex SHA-256 digest of a file"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def shard_filename(basename, shard_number, suffix=''):
+    """File name of a shard, e.g. attendance_records.part-0003.json[.gz]"""
+    return f"{basename}.part-{shard_number:04d}.json{suffix}"
+
+
+def manifest_filename(basename):
+    """File name of the manifest for a sharded output"""
+    return f"{basename}.manifest.json"
+
+
+def _new_shard(first_page, last_page, skip=0):
+    return {'first_page': first_page, 'last_page': last_page, 'skip': skip, 'records': []}
+
+
+def plan_page_shards(page_records, shard_pages, page_count=None):
+    """
+    Group per-table records into shards covering fixed page ranges.
+    
+    Args:
+        page_records: Iterable of (page_number, records) in page order
+        shard_pages: Number of pages per shard
+        page_count: Last page of the document, used to clip the final range
+    
+    Returns:
+        List of shard dictionaries in page order
+    """
+    shards = {}
+    last_seen_page = 0
+    
+    for page_number, records in page_records:
+        last_seen_page = max(last_seen_page, page_number)
+        bucket = (page_number - 1) // shard_pages
+        if bucket not in shards:
+            shards[bucket] = _new_shard(bucket * shard_pages + 1, (bucket + 1) * shard_pages)
+        shards[bucket]['records'].extend(records)
+    
+    last_page = page_count or last_seen_page
+    ordered = [shards[bucket] for bucket in sorted(shards)]
+    for shard in ordered:
+        shard['last_page'] = min(shard['last_page'], last_page)
+    return ordered
+
+
+def plan_record_shards(page_records, shard_records):
+    """
+    Group per-table records into shards of a fixed record count.
+    
+    A page may be split across two shards; 'skip' records how many records
+    of the shard's first page belong to the previous shard.
+    
+    Args:
+        page_records: Iterable of (page_number, records) in page order
+        shard_records: Number of records per shard
+    
+    Returns:
+        List of shard dictionaries in page order
+    """
+    shards = []
+    current = None
+    current_page = None
+    records_seen_on_page = 0
+    
+    for page_number, records in page_records:
+        if page_number != current_page:
+            current_page = page_number
+            records_seen_on_page = 0
+        
+        for record in records:
+            if current is None or len(current['records']) >= shard_records:
+                current = _new_shard(page_number, page_number, skip=records_seen_on_page)
+                shards.append(current)
+            current['records'].append(record)
+            current['last_page'] = page_number
+            records_seen_on_page += 1
+    
+    return shards
+
+
+def _shard_entry(shard, filepath, id_field):
+    """Describe a written shard for the manifest"""
+    ids = sorted(str(r[id_field]) for r in shard['records'] if r.get(id_field))
+    return {
+        'file': Path(filepath).name,
+        'first_page': shard['first_page'],
+        'last_page': shard['last_page'],
+        'skip': shard['skip'],
+        'record_count': len(shard['records']),
+        'employee_id_min': ids[0] if ids else None,
+        'employee_id_max': ids[-1] if ids else None,
+        'sha256': file_sha256(filepath),
+    }
+
+
+def save_manifest(manifest, filepath):
+    """Save a shard manifest"""
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def load_manifest(filepath):
+    """Load a shard manifest"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_shards(shards, output_folder, basename, id_field, mode, size, source=None, suffix=''):
+    """
+    Write each shard to its own JSON file and save the manifest.
+    
+    Args:
+        shards: Shards from plan_page_shards() or plan_record_shards()
+        output_folder: Folder for shard files and manifest
+        basename: Output base name, e.g. 'attendance_records'
+        id_field: Record key holding the employee ID
+        mode: 'pages' or 'records'
+        size: Pages or records per shard
+        source: Source PDF path recorded in the manifest
+        suffix: Compression suffix for shard files ('', '.gz' or '.xz')
+    
+    Returns:
+        The manifest dictionary
+    """
+    output_folder = Path(output_folder)
+    entries = []
+    
+    for shard_number, shard in enumerate(shards, 1):
+        filepath = output_folder / shard_filename(basename, shard_number, suffix)
+        save_json(shard['records'], filepath)
+        entries.append(_shard_entry(shard, filepath, id_field))
+    
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'source': describe_source(source) if source is not None else None,
+        'id_field': id_field,
+        'mode': mode,
+        'size': size,
+        'total_records': sum(entry['record_count'] for entry in entries),
+        'shards': entries,
+    }
+    save_manifest(manifest, output_folder / manifest_filename(basename))
+    return manifest
+
+
+def shard_pages(manifest, shard_number):
+    """Camelot page selection that re-extracts one shard"""
+    entry = manifest['shards'][shard_number - 1]
+    return f"{entry['first_page']}-{entry['last_page']}"
+
+
+def rewrite_shard(manifest_path, shard_number, page_records):
+    """
+    Re-extract a single shard and update its manifest entry.
+    
+    Args:
+        manifest_path: Path to the manifest of a previous sharded run
+        shard_number: 1-based shard number to rewrite
+        page_records: (page_number, records) pairs for the shard's page range
+    
+    Returns:
+        The updated manifest entry
+    """
+    manifest_path = Path(manifest_path)
+    manifest = load_manifest(manifest_path)
+    entry = manifest['shards'][shard_number - 1]
+    
+    records = [record for _, table_records in page_records for record in table_records]
+    if manifest['mode'] == 'records':
+        records = records[entry['skip']:entry['skip'] + entry['record_count']]
+    
+    shard = _new_shard(entry['first_page'], entry['last_page'], skip=entry['skip'])
+    shard['records'] = records
+    
+    filepath = manifest_path.parent / entry['file']
+    save_json(records, filepath)
+    manifest['shards'][shard_number - 1] = _shard_entry(shard, filepath, manifest['id_field'])
+    manifest['total_records'] = sum(e['record_count'] for e in manifest['shards'])
+    save_manifest(manifest, manifest_path)
+    return manifest['shards'][shard_number - 1]
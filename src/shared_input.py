@@ -0,0 +1,307 @@
+"""
+Shared memory-mapped PDF input for worker processes
+
+The parent process parses the PDF's cross-reference table and page tree once
+and splits the document into self-contained single-page PDFs, stored back to
+back in one memory-backed file (/dev/shm on Linux) with a table of page
+offsets. Worker processes memory-map that file and hand camelot just the bytes
+of their assigned page, so a worker's start-up cost depends on the size of
+its pages rather than the size of the whole document. The split can run on a
+background thread, page by page, so the first pages reach the workers before
+the last ones are split.
+"""
+
+import io
+import os
+import mmap
+import time
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from . import instrument
+from . import metrics
+from . import tracing
+from .index import EmployeeIndex
+from .pages import parse_page_selection, chunk_pages
+from .parsers import load_parser, warm_parser
+from .pdf_source import as_pdf_input
+
+
+# Picklable description of a SharedPdf: file path and page number -> (offset, length)
+SharedPdfHandle = namedtuple('SharedPdfHandle', ['path', 'offsets'])
+
+# Per-process cache of mapped page files, oldest first
+_mappings = {}
+_mappings_lock = threading.Lock()
+
+# Long-lived workers see many documents; keep only the most recent mappings
+MAX_CACHED_MAPPINGS = 8
+
+
+def _default_directory():
+    return '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+class SharedPdf:
+    """A PDF split into single-page documents inside one shareable mapped file"""
+
+    def __init__(self, path, page_numbers):
+        self.path = path
+        # Selected pages, in the order they are split
+        self.page_numbers = page_numbers
+        self.offsets = {}
+        self.split_seconds = 0.0
+        self._error = None
+        self._closed = False
+        self._split = threading.Condition()
+
+    @classmethod
+    def create(cls, source, directory=None, pages='all', background=False, on_progress=None):
+        """
+        Split a PDF into per-page documents, in the calling process.
+
+        With background=True only the document's page tree is read before
+        returning; the pages are split in order on a thread, so the first
+        ones can be handed to workers while the rest are still being split.
+        A seekable file-like source must then stay open until the split ends.
+
+        Args:
+            source: Path, bytes, memoryview or binary file-like object
+            directory: Where to place the page file (default /dev/shm)
+            pages: Camelot page selection to split, defaults to every page
+            background: Split on a thread instead of before returning
+            on_progress: Called on the splitting thread after each page and on failure
+
+        Returns:
+            SharedPdf whose handle_for(pages) can be passed to worker processes
+
+        Raises:
+            ValueError: If the page selection is outside the document
+        """
+        from pypdf import PdfReader
+
+        fd, path = tempfile.mkstemp(prefix='pdf-pages-', suffix='.bin', dir=directory or _default_directory())
+        try:
+            out = os.fdopen(fd, 'wb')
+        except BaseException:
+            os.close(fd)
+            os.unlink(path)
+            raise
+        try:
+            with as_pdf_input(source) as pdf_input:
+                reader = PdfReader(pdf_input, strict=False)
+                shared = cls(path, parse_page_selection(pages, len(reader.pages)))
+                if not background:
+                    with out:
+                        shared._write_pages(reader, out)
+                    return shared
+        except BaseException:
+            out.close()
+            os.unlink(path)
+            raise
+
+        def split():
+            try:
+                with out:
+                    shared._write_pages(reader, out, on_progress)
+            except Exception as e:
+                with shared._split:
+                    shared._error = e
+                    shared._split.notify_all()
+                if on_progress is not None:
+                    on_progress()
+
+        threading.Thread(target=split, name='pdf-split', daemon=True).start()
+        return shared
+
+    def _write_pages(self, reader, out, on_progress=None):
+        from pypdf import PdfWriter
+
+        started = time.perf_counter()
+        for page_number in self.page_numbers:
+            if self._closed:
+                return
+            writer = PdfWriter()
+            writer.add_page(reader.pages[page_number - 1])
+            buffer = io.BytesIO()
+            writer.write(buffer)
+            offset = out.tell()
+            out.write(buffer.getbuffer())
+            # Workers map the file; the page must be in it before they learn its offset
+            out.flush()
+            with self._split:
+                self.offsets[page_number] = (offset, buffer.tell())
+                self.split_seconds = time.perf_counter() - started
+                self._split.notify_all()
+            if on_progress is not None:
+                on_progress()
+
+    @property
+    def page_count(self):
+        """Number of selected pages"""
+        return len(self.page_numbers)
+
+    def ready(self, page_numbers):
+        """
+        Whether the given pages are split; never blocks.
+
+        Raises:
+            Exception: The error that stopped the split
+        """
+        with self._split:
+            if self._error is not None:
+                raise self._error
+            return all(page in self.offsets for page in page_numbers)
+
+    def wait(self, page_numbers, timeout=None):
+        """
+        Block until the given pages are split.
+
+        Raises:
+            TimeoutError: If they are not split within the timeout
+            Exception: The error that stopped the split
+        """
+        with self._split:
+            if not self._split.wait_for(
+                lambda: self._error is not None or all(page in self.offsets for page in page_numbers), timeout
+            ):
+                raise TimeoutError(f"Pages {page_numbers} not split")
+            if self._error is not None:
+                raise self._error
+
+    def handle_for(self, page_numbers):
+        """Handle giving workers the given (already split) pages"""
+        with self._split:
+            return SharedPdfHandle(self.path, {page: self.offsets[page] for page in page_numbers})
+
+    def close(self):
+        """Stop splitting and remove the page file; mappings already open in workers stay valid"""
+        self._closed = True
+        with _mappings_lock:
+            _release_mapping(self.path)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _release_mapping(path):
+    mapping = _mappings.pop(path, None)
+    if mapping is not None:
+        try:
+            mapping.close()
+        except BufferError:
+            # A page view is still in use; it is unmapped once released
+            pass
+
+
+def _mapping(path, size):
+    mapping = _mappings.get(path)
+    if mapping is not None and len(mapping) < size:
+        # Mapped before the page was split; map the file's current length
+        _release_mapping(path)
+        mapping = None
+    if mapping is None:
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _mappings[path] = mapping
+        while len(_mappings) > MAX_CACHED_MAPPINGS:
+            _release_mapping(next(iter(_mappings)))
+    return mapping
+
+
+def page_data(handle, page_number):
+    """Bytes of one page as a standalone PDF, read from the shared mapping"""
+    offset, length = handle.offsets[page_number]
+    with _mappings_lock:
+        return memoryview(_mapping(handle.path, offset + length))[offset:offset + length]
+
+
+def read_shared_page(parser, handle, page_number, read_options=None):
+    """Read one shared page's tables, numbered as in the original document"""
+    tables = parser.read_tables(page_data(handle, page_number), '1', **(read_options or {}))
+    for table in tables:
+        table.page = page_number
+    return tables
+
+
+def parse_shared_pages(parser_type, handle, page_numbers, read_options=None):
+    """
+    Worker entry point: parse some pages of a SharedPdf.
+
+    Args:
+        parser_type: 'attendance' or 'allowance'
+        handle: SharedPdfHandle from the parent
+        page_numbers: 1-based page numbers to parse
+        read_options: Optional camelot overrides passed to read_tables
+
+    Returns:
+        Tuple of ([(page_number, records), ...], index entries)
+    """
+    parser = load_parser(parser_type)
+    index = EmployeeIndex()
+    page_records = []
+    for page_number in page_numbers:
+        with instrument.page(page_number):
+            tables = read_shared_page(parser, handle, page_number, read_options)
+            page_records.extend(parser.process_tables(tables, index))
+    return page_records, index.employees
+
+
+def _parse_task(parser_type, handle, page_numbers, read_options=None, traced=False):
+    """Worker task: parse_shared_pages, plus the worker's metrics and trace events (if traced) to merge"""
+    with tracing.recording(traced) as recorder:
+        result = parse_shared_pages(parser_type, handle, page_numbers, read_options)
+    return result, metrics.drain(), recorder.events if recorder else None
+
+
+def _warm_worker(parser_type):
+    """Import the parser (camelot, pandas, OpenCV) before the first task arrives"""
+    warm_parser(parser_type)
+
+
+def parse_pdf_parallel(parser_type, source, pages='all', workers=None, pages_per_task=1, index=None):
+    """
+    Parse a PDF across worker processes sharing one mapped copy of its pages.
+
+    Pages without tables simply contribute no records.
+
+    Args:
+        parser_type: 'attendance' or 'allowance'
+        source: Path, bytes, memoryview or binary file-like object
+        pages: Camelot page selection, defaults to every page
+        workers: Number of worker processes (default: CPU count)
+        pages_per_task: Pages handed to a worker per task
+        index: Optional EmployeeIndex that receives each employee's row span
+
+    Returns:
+        List of (page_number, records) in page order
+    """
+    with SharedPdf.create(source, pages=pages) as shared:
+        page_numbers = shared.page_numbers
+
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_warm_worker, initargs=(parser_type,)
+        ) as pool:
+            traced = tracing.active() is not None
+            futures = [
+                pool.submit(_parse_task, parser_type, shared.handle_for(chunk), chunk, None, traced)
+                for chunk in chunk_pages(page_numbers, pages_per_task)
+            ]
+
+            page_records = []
+            for future in futures:
+                (chunk_records, employees), worker_metrics, worker_events = future.result()
+                metrics.merge(worker_metrics)
+                tracing.merge(worker_events)
+                page_records.extend(chunk_records)
+                if index is not None:
+                    index.update(employees)
+
+    return page_records
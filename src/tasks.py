@@ -0,0 +1,202 @@
+"""
+Celery tasks that spread one PDF across worker nodes
+
+A document is split into page-range shards; each shard is extracted by an
+independent task on any worker, and a chord callback merges the shard
+results in page order and writes them with the usual output writers.
+
+Workers read the PDF from its path, so the file must be on storage every
+worker can reach (the same path on each node).
+
+By default the broker and result backend are plain directories under
+.celery/ (kombu's filesystem transport and Celery's file backend), so no
+network service is needed. Point CELERY_BROKER_URL / CELERY_RESULT_BACKEND
+at Redis or RabbitMQ for real clusters, or set PDF_CELERY_EAGER=1 to run
+every task in-process with an in-memory broker. The directories are created
+when a worker starts or a document is submitted, not on import.
+
+    celery -A src.tasks worker --loglevel=info
+    python app.py attendance /path/to/book.pdf --celery
+"""
+
+import os
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+from celery import Celery, chord
+from celery.signals import worker_init
+
+from .common import write_outputs
+from .index import EmployeeIndex
+from .pages import count_pages, parse_page_selection, chunk_pages, format_pages
+from .parsers import get_parser_config, load_parser
+
+
+CELERY_DIR = Path(__file__).resolve().parent.parent / '.celery'
+
+# Pages per shard task when the caller does not choose
+DEFAULT_PAGES_PER_SHARD = 25
+
+
+# Filesystem transport options that name folders
+_BROKER_FOLDER_OPTIONS = ('data_folder_in', 'data_folder_out', 'processed_folder', 'control_folder')
+
+
+def _filesystem_broker_options():
+    folders = {name: CELERY_DIR / name for name in ('broker', 'processed', 'control')}
+    return {
+        'data_folder_in': str(folders['broker']),
+        'data_folder_out': str(folders['broker']),
+        'processed_folder': str(folders['processed']),
+        'control_folder': str(folders['control']),
+        'store_processed': False,
+    }
+
+
+def configure(app, eager=None):
+    """
+    Apply broker, backend and serialization settings.
+
+    Args:
+        app: Celery application
+        eager: Run tasks in-process with an in-memory broker
+               (default: the PDF_CELERY_EAGER environment variable)
+    """
+    if eager is None:
+        eager = os.environ.get('PDF_CELERY_EAGER', '') not in ('', '0')
+
+    app.conf.update(
+        task_serializer='json',
+        result_serializer='json',
+        accept_content=['json'],
+        # Re-deliver a shard if its worker dies part-way through
+        task_acks_late=True,
+        task_reject_on_worker_lost=True,
+        worker_prefetch_multiplier=1,
+    )
+
+    if eager:
+        app.conf.update(
+            broker_url='memory://',
+            result_backend='cache+memory://',
+            task_always_eager=True,
+            # Propagating would raise Retry instead of re-running the shard;
+            # failures still surface from the merge result's get()
+            task_eager_propagates=False,
+        )
+        return
+
+    broker_url = os.environ.get('CELERY_BROKER_URL', 'filesystem://')
+    result_backend = os.environ.get('CELERY_RESULT_BACKEND')
+    if result_backend is None:
+        result_backend = (CELERY_DIR / 'results').as_uri()
+
+    app.conf.update(broker_url=broker_url, result_backend=result_backend)
+    if broker_url.startswith('filesystem://'):
+        app.conf.broker_transport_options = _filesystem_broker_options()
+
+
+def create_folders(app):
+    """Create the folders of a filesystem broker and file result backend, if configured"""
+    folders = []
+    if app.conf.broker_url.startswith('filesystem://'):
+        options = app.conf.broker_transport_options or {}
+        folders.extend(options[name] for name in _BROKER_FOLDER_OPTIONS if name in options)
+    result_backend = app.conf.result_backend or ''
+    if result_backend.startswith('file://'):
+        folders.append(url2pathname(urlparse(result_backend).path))
+    for folder in folders:
+        Path(folder).mkdir(parents=True, exist_ok=True)
+
+
+app = Celery('pdf_extraction')
+configure(app)
+
+
+@worker_init.connect
+def _create_worker_folders(sender=None, **kwargs):
+    create_folders(app)
+
+
+@app.task(
+    autoretry_for=(Exception,),
+    dont_autoretry_for=(ValueError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def extract_shard(parser_type, pdf_path, pages):
+    """
+    Extract one page-range shard.
+
+    Failures are retried for this shard only; ValueError (an unreadable or
+    wrong kind of PDF) is not retried.
+
+    Args:
+        parser_type: 'attendance' or 'allowance'
+        pdf_path: Path to the PDF, readable from the worker
+        pages: Camelot page selection for the shard, e.g. '26-50'
+
+    Returns:
+        Dictionary with the shard's pages, [page, records] pairs and index entries
+    """
+    parser = load_parser(parser_type)
+    index = EmployeeIndex()
+    page_records = [
+        [page, records] for page, records in parser.iter_table_records(pdf_path, pages, index)
+    ]
+    return {'pages': pages, 'page_records': page_records, 'employees': index.employees}
+
+
+@app.task
+def merge_shards(shard_results, parser_type, output_folder=None, compression=None):
+    """
+    Chord callback: merge shard results in page order and write the outputs.
+
+    Returns:
+        Dictionary with the record and shard counts and the output folder
+    """
+    config = get_parser_config(parser_type)
+    output_folder = output_folder or config['output_folder']
+
+    page_records = [pair for result in shard_results for pair in result['page_records']]
+    # Stable sort keeps table order within a page
+    page_records.sort(key=lambda pair: pair[0])
+    records = [record for _, table_records in page_records for record in table_records]
+
+    if records:
+        write_outputs(records, config, output_folder, compression)
+    return {'records': len(records), 'shards': len(shard_results), 'output_folder': str(output_folder)}
+
+
+def plan_shards(pdf_path, pages='all', pages_per_shard=DEFAULT_PAGES_PER_SHARD):
+    """Split a page selection into camelot page selections of at most N pages"""
+    page_numbers = parse_page_selection(pages, count_pages(pdf_path))
+    return [format_pages(chunk) for chunk in chunk_pages(page_numbers, pages_per_shard)]
+
+
+def extract_document(parser_type, pdf_path, pages='all', pages_per_shard=DEFAULT_PAGES_PER_SHARD,
+                     output_folder=None, compression=None):
+    """
+    Submit a document as a chord of shard tasks followed by a merge.
+
+    Args:
+        parser_type: 'attendance' or 'allowance'
+        pdf_path: Path to the PDF, readable from every worker
+        pages: Camelot page selection, defaults to every page
+        pages_per_shard: Pages per shard task
+        output_folder: Output folder (default: the parser's output folder)
+        compression: None, 'gzip' or 'xz'
+
+    Returns:
+        AsyncResult of the merge task
+    """
+    config = get_parser_config(parser_type)
+    # Workers run elsewhere, with another working directory
+    pdf_path = str(Path(pdf_path).resolve())
+    output_folder = str(Path(output_folder or config['output_folder']).resolve())
+    shards = plan_shards(pdf_path, pages, pages_per_shard)
+    create_folders(app)
+    return chord(
+        extract_shard.s(parser_type, pdf_path, shard_pages) for shard_pages in shards
+    )(merge_shards.s(parser_type, output_folder, compression))
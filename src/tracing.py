@@ -0,0 +1,223 @@
+"""
+Sampled trace spans in the Chrome trace event format
+
+Code marks nested spans with span() around a block, or with now() and
+record() for work that does not fit one, and adds attributes (an employee
+ID, a fallback that fired) to the innermost open span with annotate(). A
+traced document nests these spans:
+
+    document > page > table > employee > field
+
+with the instrument.timed()/stage() stages between them and camelot's parse
+of each page under camelot.read. Nothing is recorded unless a recorder is
+active (start() ... stop()), and the inactive path is a single global
+check, so the marks stay in place in normal runs.
+
+Whether a document is traced is decided when it starts, with
+sampled(rate), so tracing can stay on in production at a low rate; callers
+can also keep a trace only when its document was slow.
+
+    from src import tracing
+    recorder = tracing.start()
+    ...                                     # parse
+    tracing.stop()
+    recorder.finish('document', parser='attendance')
+    recorder.save('run.trace.json')
+
+Worker tasks told to trace record their spans inside recording() and
+return the recorder's events with their results; the parent adds them with
+merge(), or Recorder.merge() for a recorder of its own. Timestamps come
+from the monotonic clock, which the processes of one machine share, so
+worker spans line up with the parent's.
+
+The file is the JSON object form of the Chrome trace event format
+(complete "X" events in "traceEvents"); Perfetto (ui.perfetto.dev),
+chrome://tracing and speedscope open it.
+"""
+
+import os
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager, nullcontext
+
+
+_recorder = None
+_NULL_SPAN = nullcontext()
+
+# Whether _page_span is registered as an instrument page observer
+_observing = False
+
+
+def sampled(rate):
+    """Decide whether to trace a document, with probability rate (0 to 1)"""
+    return rate >= 1 or random.random() < rate
+
+
+class _Span:
+    __slots__ = ('recorder', 'name', 'category', 'args', 'started')
+
+    def __init__(self, recorder, name, category, args):
+        self.recorder = recorder
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.recorder._stack().append(self)
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        ended = time.perf_counter_ns()
+        self.recorder._stack().pop()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.recorder.add(self.name, self.category, self.started, ended, self.args)
+        return False
+
+
+class Recorder:
+    """Completed spans of one trace, as Chrome trace events"""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.started = time.perf_counter_ns()
+        self.events = []
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def add(self, name, category, started_ns, ended_ns, args=None):
+        """Add a completed span; times are time.perf_counter_ns() values"""
+        self.events.append({
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': started_ns / 1000,
+            'dur': (ended_ns - started_ns) / 1000,
+            'pid': self.pid,
+            'tid': threading.get_native_id(),
+            'args': args or {},
+        })
+
+    def merge(self, events):
+        """Add the events a worker's recorder returned"""
+        self.events.extend(events)
+
+    def finish(self, name='document', category='document', **attributes):
+        """Add a span from the recorder's creation until now; returns its seconds"""
+        ended = time.perf_counter_ns()
+        self.add(name, category, self.started, ended, attributes)
+        return (ended - self.started) / 1e9
+
+    def save(self, path, metadata=None):
+        """Write the trace file, replacing it atomically"""
+        pids = sorted({event['pid'] for event in self.events} | {self.pid})
+        names = [
+            {'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+             'args': {'name': 'main' if pid == self.pid else f'worker {pid}'}}
+            for pid in pids
+        ]
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'traceEvents': names + self.events,
+                'displayTimeUnit': 'ms',
+                'otherData': metadata or {},
+            }, f, ensure_ascii=False, default=str)
+        os.replace(temp_path, path)
+
+
+def active():
+    """The active recorder, or None"""
+    return _recorder
+
+
+def start():
+    """Start recording this process's spans; returns the new recorder"""
+    global _recorder, _observing
+    _recorder = Recorder()
+    if not _observing:
+        from . import instrument
+        instrument.add_page_observer(_page_span)
+        _observing = True
+    return _recorder
+
+
+def stop():
+    """Stop recording and return the recorder"""
+    global _recorder, _observing
+    recorder, _recorder = _recorder, None
+    if _observing:
+        from . import instrument
+        instrument.remove_page_observer(_page_span)
+        _observing = False
+    return recorder
+
+
+@contextmanager
+def recording(enabled=True):
+    """Record the block's spans if enabled; yields the recorder, or None"""
+    if not enabled:
+        yield None
+        return
+    recorder = start()
+    try:
+        yield recorder
+    finally:
+        stop()
+
+
+def span(name, category='stage', **attributes):
+    """Context manager recording a block as a span"""
+    recorder = _recorder
+    if recorder is None:
+        return _NULL_SPAN
+    return _Span(recorder, name, category, attributes)
+
+
+def _page_span(page_number):
+    return span('page', 'page', page=page_number)
+
+
+def annotate(**attributes):
+    """Add attributes to the innermost open span of this thread"""
+    recorder = _recorder
+    if recorder is not None:
+        stack = recorder._stack()
+        if stack:
+            stack[-1].args.update(attributes)
+
+
+def now():
+    """Start time to pass to record() later, or None when nothing is recorded"""
+    return time.perf_counter_ns() if _recorder is not None else None
+
+
+def record(name, started, category='stage', **attributes):
+    """Record a span from started (a now() value) until now"""
+    recorder = _recorder
+    if recorder is not None and started is not None:
+        recorder.add(name, category, started, time.perf_counter_ns(), attributes)
+
+
+def merge(events):
+    """Add a worker's events (or None) to the active recorder"""
+    recorder = _recorder
+    if recorder is not None and events:
+        recorder.merge(events)
+
+
+def _after_fork():
+    # A forked worker records only when its task asks for it
+    global _recorder
+    _recorder = None
+
+
+os.register_at_fork(after_in_child=_after_fork)
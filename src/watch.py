@@ -0,0 +1,306 @@
+"""
+Watch-folder ingestion
+
+Polls a directory for PDFs, waits until each file's size and modification
+time have stopped changing, skips content already seen (by SHA-256, in a
+SQLite ledger), routes the file to a parser by name and extracts files
+concurrently in worker processes.
+
+Each file gets its own output folder, <output>/<file stem>-<hash prefix>/,
+holding the usual JSON, CSV and Markdown outputs next to a status.json
+record (source, hash, parser, state, record count, timings, error).
+
+If a worker process dies (e.g. killed for memory), the files it was running
+are marked failed and the pool is replaced, so watching continues.
+"""
+
+import json
+import time
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from .common import write_outputs
+from .parsers import get_parser_config, load_parser, parser_for_filename
+from .shards import file_sha256
+
+
+STATUS_FILENAME = 'status.json'
+LEDGER_FILENAME = '.ingest-ledger.sqlite'
+
+# Ledger states that mean "this content has been dealt with"
+FINAL_STATES = ('done', 'failed', 'unrouted')
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class Ledger:
+    """SQLite record of every file content hash the watcher has handled"""
+
+    def __init__(self, filepath):
+        self.connection = sqlite3.connect(str(filepath))
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS files (
+                sha256 TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                parser TEXT,
+                state TEXT NOT NULL,
+                records INTEGER,
+                output TEXT,
+                error TEXT,
+                updated TEXT NOT NULL
+            )"""
+        )
+        self.connection.commit()
+
+    def get(self, sha256):
+        """Ledger row for a hash as a dict, or None"""
+        cursor = self.connection.execute(
+            "SELECT sha256, path, parser, state, records, output, error, updated FROM files WHERE sha256 = ?",
+            (sha256,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip(('sha256', 'path', 'parser', 'state', 'records', 'output', 'error', 'updated'), row))
+
+    def record(self, sha256, path, parser_type, state, records=None, output=None, error=None):
+        """Insert or update the entry for a hash"""
+        self.connection.execute(
+            """INSERT INTO files (sha256, path, parser, state, records, output, error, updated)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(sha256) DO UPDATE SET
+                   path = excluded.path, parser = excluded.parser, state = excluded.state,
+                   records = excluded.records, output = excluded.output,
+                   error = excluded.error, updated = excluded.updated""",
+            (sha256, str(path), parser_type, state, records, str(output) if output else None, error, _now()),
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class StabilityTracker:
+    """Reports files whose size and mtime were unchanged for N consecutive polls"""
+
+    def __init__(self, stable_polls=2):
+        self.stable_polls = stable_polls
+        # path -> ((size, mtime_ns), polls unchanged)
+        self._seen = {}
+
+    def poll(self, paths):
+        """
+        Update with the files currently present.
+
+        Returns:
+            List of paths that have just become stable
+        """
+        ready = []
+        current = {}
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous, unchanged = self._seen.get(path, (None, 0))
+            unchanged = unchanged + 1 if signature == previous else 0
+            current[path] = (signature, unchanged)
+            if unchanged == self.stable_polls and stat.st_size > 0:
+                ready.append(path)
+        self._seen = current
+        return ready
+
+
+def _settled(entry, path):
+    """True if a ledger entry means this file needs no processing"""
+    if entry is None or entry['state'] not in FINAL_STATES:
+        return False
+    # A file skipped for its name is retried once renamed
+    return not (entry['state'] == 'unrouted' and parser_for_filename(path.name))
+
+
+def output_folder_for(output_root, pdf_path, sha256):
+    """Per-file output folder, e.g. output/ingest/book-3fa2c1d0"""
+    return Path(output_root) / f"{Path(pdf_path).stem}-{sha256[:8]}"
+
+
+def write_status(folder, status):
+    """Write the status.json record of a file"""
+    Path(folder).mkdir(parents=True, exist_ok=True)
+    with open(Path(folder) / STATUS_FILENAME, 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False, indent=2)
+
+
+def extract_file(parser_type, pdf_path, output_folder):
+    """Worker task: extract one PDF into its output folder"""
+    started = time.time()
+    records = load_parser(parser_type).parse_pdf(str(pdf_path))
+    if records:
+        write_outputs(records, get_parser_config(parser_type), output_folder)
+    return {'records': len(records), 'parse_seconds': round(time.time() - started, 3)}
+
+
+class FolderWatcher:
+    """
+    Watch a directory and extract each new PDF once.
+
+    Args:
+        watch_dir: Directory scanners drop PDFs into (not searched recursively)
+        output_root: Root of the per-file output folders
+        workers: Files extracted at once
+        interval: Seconds between directory polls
+        stable_polls: Unchanged polls required before a file is picked up
+        ledger_path: SQLite ledger (default: <watch_dir>/.ingest-ledger.sqlite)
+    """
+
+    def __init__(self, watch_dir, output_root='output/ingest', workers=None, interval=2.0,
+                 stable_polls=2, ledger_path=None):
+        self.watch_dir = Path(watch_dir)
+        self.output_root = Path(output_root)
+        self.workers = workers
+        self.interval = interval
+        self.tracker = StabilityTracker(stable_polls)
+        self.ledger = Ledger(ledger_path or self.watch_dir / LEDGER_FILENAME)
+        self.pool = None
+        # future -> (sha256, path, parser_type, output folder, status)
+        self.in_flight = {}
+
+    def scan(self):
+        """PDF files currently in the watch directory"""
+        return sorted(path for path in self.watch_dir.iterdir()
+                      if path.is_file() and path.suffix.lower() == '.pdf')
+
+    def _skip_duplicate(self, path, sha256, original, state):
+        if Path(original) == path:
+            return
+        write_status(output_folder_for(self.output_root, path, sha256), {
+            'source': str(path),
+            'sha256': sha256,
+            'state': 'duplicate',
+            'duplicate_of': str(original),
+            'received': _now(),
+        })
+        print(f"= {path.name}: duplicate of {Path(original).name} ({state}), skipped")
+
+    def _submit(self, path):
+        try:
+            sha256 = file_sha256(path)
+        except FileNotFoundError:
+            # Deleted or moved since it became stable
+            return
+        for _, (in_flight_sha256, original, *_) in self.in_flight.items():
+            if in_flight_sha256 == sha256:
+                self._skip_duplicate(path, sha256, original, 'processing')
+                return
+
+        entry = self.ledger.get(sha256)
+        if _settled(entry, path):
+            self._skip_duplicate(path, sha256, entry['path'], entry['state'])
+            return
+
+        parser_type = parser_for_filename(path.name)
+        folder = output_folder_for(self.output_root, path, sha256)
+        status = {
+            'source': str(path),
+            'sha256': sha256,
+            'parser': parser_type,
+            'state': 'processing',
+            'received': _now(),
+        }
+
+        if parser_type is None:
+            status.update(state='unrouted', error='File name does not identify attendance or allowance')
+            write_status(folder, status)
+            self.ledger.record(sha256, path, None, 'unrouted', output=folder, error=status['error'])
+            print(f"✗ {path.name}: cannot tell which parser to use, skipped")
+            return
+
+        write_status(folder, status)
+        self.ledger.record(sha256, path, parser_type, 'processing', output=folder)
+        try:
+            future = self.pool.submit(extract_file, parser_type, path, folder)
+        except BrokenProcessPool:
+            self._replace_pool()
+            future = self.pool.submit(extract_file, parser_type, path, folder)
+        self.in_flight[future] = (sha256, path, parser_type, folder, status)
+        print(f"→ {path.name}: {parser_type}")
+
+    def _replace_pool(self):
+        """Fail the files of a broken pool and start a new pool"""
+        for future in list(self.in_flight):
+            self._fail(future, 'worker process died')
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        print("! Worker pool restarted")
+
+    def _fail(self, future, error):
+        sha256, path, parser_type, folder, status = self.in_flight.pop(future)
+        status.update(state='failed', error=error, finished=_now())
+        write_status(folder, status)
+        self.ledger.record(sha256, path, parser_type, 'failed', output=folder, error=error)
+        print(f"✗ {path.name}: {error}")
+
+    def _finish(self, future):
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            self._fail(future, 'worker process died')
+            return
+        except Exception as e:
+            self._fail(future, str(e))
+            return
+
+        sha256, path, parser_type, folder, status = self.in_flight.pop(future)
+        status['finished'] = _now()
+
+        status.update(state='done', **result)
+        write_status(folder, status)
+        self.ledger.record(sha256, path, parser_type, 'done', records=result['records'], output=folder)
+        print(f"✓ {path.name}: {result['records']} records → {folder}/")
+
+    def run(self, once=False):
+        """
+        Poll until interrupted.
+
+        Args:
+            once: Stop when every file present has been handled
+        """
+        self.output_root.mkdir(parents=True, exist_ok=True)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            while True:
+                paths = self.scan()
+                for path in self.tracker.poll(paths):
+                    self._submit(path)
+
+                if self.in_flight:
+                    done, _ = wait(list(self.in_flight), timeout=self.interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._finish(future)
+                elif once and self._all_handled(paths):
+                    break
+                else:
+                    time.sleep(self.interval)
+        finally:
+            for future in list(self.in_flight):
+                future.cancel()
+            self.pool.shutdown()
+            self.ledger.close()
+
+    def _all_handled(self, paths):
+        for path in paths:
+            try:
+                if path.stat().st_size == 0:
+                    continue
+                entry = self.ledger.get(file_sha256(path))
+            except FileNotFoundError:
+                continue
+            if not _settled(entry, path):
+                return False
+        return True
@@ -0,0 +1,112 @@
+"""Tests for batch failure handling and per-file output writing"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pypdf import PdfWriter
+
+from src import batch
+from src import pages
+
+
+PAGES = {'book.pdf': 30, 'small.pdf': 2, 'torn.pdf': 30}
+
+
+class _StubParser:
+    """One record per page; any page range of torn.pdf that reaches past page 10 fails"""
+
+    def read_tables(self, path, pages):
+        first = int(pages.split('-')[0]) if pages != 'all' else 1
+        last = int(pages.split('-')[-1]) if pages != 'all' else PAGES[path]
+        if path == 'torn.pdf' and last > 10:
+            raise ValueError('damaged xref')
+        return [(path, page) for page in range(first, last + 1)]
+
+    def process_tables(self, tables):
+        for path, page in tables:
+            yield page, [{'employee_id': f"{path}:{page}"}]
+
+
+@pytest.fixture
+def stub_batch(monkeypatch):
+    written = {}
+    monkeypatch.setattr(batch, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(batch, 'load_parser', lambda parser_type: _StubParser())
+    monkeypatch.setattr(batch, 'count_pages', lambda path: PAGES[path])
+    monkeypatch.setattr(batch, 'collect_inputs', lambda patterns: sorted(patterns))
+    monkeypatch.setattr(batch, 'write_outputs',
+                        lambda records, config, folder, compression: written.setdefault(folder.name, records))
+    return written
+
+
+def test_failed_unit_marks_its_file_failed_and_the_rest_are_written(stub_batch, tmp_path):
+    counts = batch.run_batch(list(PAGES), 'attendance', tmp_path, workers=1)
+
+    assert counts == {'book.pdf': 30, 'small.pdf': 2, 'torn.pdf': None}
+    assert sorted(stub_batch) == ['book', 'small']
+    # Units finish out of order; records come back in page order
+    assert [r['employee_id'] for r in stub_batch['book']] == [f"book.pdf:{page}" for page in range(1, 31)]
+
+
+def test_fair_schedule_reports_failed_files_the_same_way(stub_batch, tmp_path, monkeypatch):
+    class _Job:
+        def __init__(self, path):
+            self.path, self.trace = path, None
+
+        def result(self):
+            parser = _StubParser()
+            return list(parser.process_tables(parser.read_tables(self.path, f"1-{PAGES[self.path]}")))
+
+        def stats(self):
+            return {'queue_seconds': 0.0, 'service_seconds': 0.0, 'total_seconds': 0.0}
+
+    class _Scheduler:
+        def __init__(self, pool, workers):
+            pass
+
+        def submit(self, parser_type, path, trace=False):
+            return _Job(path)
+
+    monkeypatch.setattr(batch, 'FairScheduler', _Scheduler)
+
+    counts = batch.run_batch(list(PAGES), 'attendance', tmp_path, workers=1, schedule='fair')
+
+    assert counts == {'book.pdf': 30, 'small.pdf': 2, 'torn.pdf': None}
+    assert sorted(stub_batch) == ['book', 'small']
+
+
+def test_file_is_written_when_its_last_unit_finishes(stub_batch, tmp_path, monkeypatch):
+    book_written = threading.Event()
+    seen = []
+    real_extract_unit = batch.extract_unit
+    monkeypatch.setattr(batch, 'write_outputs',
+                        lambda records, config, folder, compression: book_written.set())
+
+    def extract_unit(unit, traced=()):
+        if unit[0].path == 'small.pdf':
+            # Written before the batch ends, while this unit is still running
+            seen.append(book_written.wait(5))
+        return real_extract_unit(unit, traced)
+
+    monkeypatch.setattr(batch, 'extract_unit', extract_unit)
+
+    batch.run_batch(['book.pdf', 'small.pdf'], 'attendance', tmp_path, workers=1)
+
+    assert seen == [True]
+
+
+def test_corrupt_pdf_fails_alone_and_the_rest_is_written(stub_batch, tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, 'count_pages', pages.count_pages)
+    good = tmp_path / 'good.pdf'
+    writer = PdfWriter()
+    for _ in range(2):
+        writer.add_blank_page(width=100, height=100)
+    writer.write(good)
+    bad = tmp_path / 'bad.pdf'
+    bad.write_bytes(b'%PDF-1.4\n1 0 obj\n<< /Length 9999 >>\nstream\ntorn')
+
+    counts = batch.run_batch([str(bad), str(good)], 'attendance', tmp_path / 'out', workers=1)
+
+    assert counts == {str(bad): None, str(good): 2}
+    assert sorted(stub_batch) == ['good']
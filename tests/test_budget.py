@@ -0,0 +1,64 @@
+"""Tests for per-page budgets: a page that runs too long is killed, quarantined and maybe retried"""
+
+import multiprocessing
+import time
+from pathlib import Path
+
+import pytest
+
+from src import budget
+
+
+BOOK = Path(__file__).resolve().parent.parent / 'materials' / 'attendance_book_40.pdf'
+
+BUDGET = 1.0
+
+pytestmark = pytest.mark.skipif(
+    'fork' not in multiprocessing.get_all_start_methods(), reason='stub parsers reach workers by fork'
+)
+
+
+def _slow_page_two(parser_type, handle, page_numbers, read_options=None, traced=False):
+    """Stands in for _parse_task: page 2 outlasts the budget unless read with cheaper settings"""
+    page, = page_numbers
+    if page == 2 and read_options is None:
+        time.sleep(BUDGET * 10)
+    record = {'employee_id': f"E{page}", 'read_options': read_options}
+    return ([(page, [record])], {}), {}, None
+
+
+@pytest.fixture
+def stub_workers(monkeypatch):
+    monkeypatch.setattr(budget, '_parse_task', _slow_page_two)
+    monkeypatch.setattr(budget, '_warm_worker', lambda parser_type: None)
+    monkeypatch.setattr(multiprocessing, 'Process', multiprocessing.get_context('fork').Process)
+
+
+def test_slow_page_is_killed_and_recovered_with_cheap_settings(stub_workers):
+    started = time.time()
+    page_records, quarantine = budget.parse_pdf_with_budget('attendance', str(BOOK), '1-3', BUDGET, workers=2)
+
+    # Killed at the budget, not after the stub's sleep
+    assert time.time() - started < BUDGET * 5
+    assert [page for page, _ in page_records] == [1, 2, 3]
+    assert page_records[1][1][0]['read_options'] == {'resolution': 150}
+    entry, = quarantine
+    assert (entry['page'], entry['reason'], entry['settings'], entry['recovered']) == (2, 'timeout', 'default', True)
+    assert entry['seconds'] >= BUDGET
+
+
+def test_allowance_has_no_cheaper_retry(stub_workers):
+    page_records, quarantine = budget.parse_pdf_with_budget('allowance', str(BOOK), '1-3', BUDGET, workers=2)
+
+    assert [page for page, _ in page_records] == [1, 3]
+    entry, = quarantine
+    assert (entry['page'], entry['reason'], entry['recovered']) == (2, 'timeout', False)
+
+
+def test_no_cheap_retry_leaves_the_page_quarantined(stub_workers):
+    page_records, quarantine = budget.parse_pdf_with_budget(
+        'attendance', str(BOOK), '1-3', BUDGET, workers=2, retry_cheap=False
+    )
+
+    assert [page for page, _ in page_records] == [1, 3]
+    assert [entry['recovered'] for entry in quarantine] == [False]
@@ -0,0 +1,130 @@
+"""Tests for resuming from a page journal, including a torn or damaged line"""
+
+import json
+
+import pytest
+
+from src import checkpoint
+from src.index import EmployeeIndex
+
+
+PAGE_COUNT = 5
+
+
+class _StubParser:
+    """One table per page with one record; remembers the pages it parsed"""
+
+    PARSER_VERSION = 2
+
+    def __init__(self):
+        self.pages = []
+
+    def read_tables(self, source, pages):
+        self.pages.append(int(pages))
+        return [int(pages)]
+
+    def process_tables(self, tables, index=None):
+        for page in tables:
+            if index is not None:
+                index.add(f"E{page}", page, 0, 1, 2)
+            yield page, [{'employee_id': f"E{page}", 'page': page}]
+
+
+@pytest.fixture
+def parser(monkeypatch):
+    stub = _StubParser()
+    monkeypatch.setattr(checkpoint, 'load_parser', lambda parser_type: stub)
+    monkeypatch.setattr(checkpoint, 'count_pages', lambda source: PAGE_COUNT)
+    return stub
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / 'book.pdf'
+    path.write_bytes(b'%PDF-1.4 stand-in')
+    return path
+
+
+def _line(entry):
+    return json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def _page_entry(page):
+    return {
+        'page': page,
+        'tables': [[{'employee_id': f"E{page}", 'page': page}]],
+        'employees': {f"E{page}": [{'page': page, 'table': 0, 'start_row': 1, 'end_row': 2}]},
+    }
+
+
+def _write_journal(path, key, pages, tail=''):
+    text = _line({'type': 'header', **key}) + ''.join(_line(_page_entry(page)) for page in pages)
+    path.write_text(text + tail, encoding='utf-8')
+
+
+def test_resume_parses_only_missing_pages_and_drops_torn_line(parser, pdf, tmp_path):
+    journal_path = tmp_path / 'records.journal.jsonl'
+    key = checkpoint.journal_key('attendance', str(pdf))
+    # Killed while writing page 3: its line has no newline and is cut short
+    _write_journal(journal_path, key, [1, 2], tail='{"page":3,"tables":[[{"employee_id":"E3"')
+    index = EmployeeIndex()
+
+    page_records = checkpoint.parse_pdf_checkpointed('attendance', str(pdf), journal_path, index=index)
+
+    assert parser.pages == [3, 4, 5]
+    assert [page for page, _ in page_records] == [1, 2, 3, 4, 5]
+    assert [records[0]['employee_id'] for _, records in page_records] == ['E1', 'E2', 'E3', 'E4', 'E5']
+    assert sorted(index.employees) == ['E1', 'E2', 'E3', 'E4', 'E5']
+
+    # The torn tail was cut off, so every line is whole
+    lines = journal_path.read_text(encoding='utf-8').splitlines()
+    entries = [json.loads(line) for line in lines]
+    assert entries[0]['type'] == 'header'
+    assert [entry['page'] for entry in entries[1:]] == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize('damaged', ['{"page":3,"tables":[[{"employee_id"', '{"page":3}', '[3]'])
+def test_damaged_line_ends_the_journal_there(parser, pdf, tmp_path, damaged):
+    journal_path = tmp_path / 'records.journal.jsonl'
+    key = checkpoint.journal_key('attendance', str(pdf))
+    # A damaged line followed by a whole one: both are dropped and parsed again
+    _write_journal(journal_path, key, [1, 2], tail=damaged + '\n' + _line(_page_entry(4)))
+
+    page_records = checkpoint.parse_pdf_checkpointed('attendance', str(pdf), journal_path)
+
+    assert parser.pages == [3, 4, 5]
+    assert [page for page, _ in page_records] == [1, 2, 3, 4, 5]
+    entries = [json.loads(line) for line in journal_path.read_text(encoding='utf-8').splitlines()]
+    assert [entry['page'] for entry in entries[1:]] == [1, 2, 3, 4, 5]
+
+
+def test_finished_journal_parses_nothing(parser, pdf, tmp_path):
+    journal_path = tmp_path / 'records.journal.jsonl'
+    _write_journal(journal_path, checkpoint.journal_key('attendance', str(pdf)), range(1, PAGE_COUNT + 1))
+
+    page_records = checkpoint.parse_pdf_checkpointed('attendance', str(pdf), journal_path)
+
+    assert parser.pages == []
+    assert len(page_records) == PAGE_COUNT
+
+
+@pytest.mark.parametrize('field, value', [('sha256', '0' * 64), ('parser_version', 1), ('parser', 'allowance')])
+def test_journal_of_another_run_is_started_over(parser, pdf, tmp_path, field, value):
+    journal_path = tmp_path / 'records.journal.jsonl'
+    key = dict(checkpoint.journal_key('attendance', str(pdf)), **{field: value})
+    _write_journal(journal_path, key, [1, 2])
+
+    checkpoint.parse_pdf_checkpointed('attendance', str(pdf), journal_path)
+
+    assert parser.pages == [1, 2, 3, 4, 5]
+    header = json.loads(journal_path.read_text(encoding='utf-8').splitlines()[0])
+    assert header[field] != value
+
+
+def test_torn_header_is_started_over(parser, pdf, tmp_path):
+    journal_path = tmp_path / 'records.journal.jsonl'
+    journal_path.write_text('{"type":"header","sha', encoding='utf-8')
+
+    checkpoint.parse_pdf_checkpointed('attendance', str(pdf), journal_path)
+
+    assert parser.pages == [1, 2, 3, 4, 5]
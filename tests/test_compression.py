@@ -0,0 +1,77 @@
+"""Round-trip tests for block-parallel gzip/xz output"""
+
+import gzip
+import lzma
+import random
+
+import pytest
+
+from src.common import ParallelCompressedWriter, open_input, open_output, save_json, load_json
+
+
+BLOCK_SIZE = 4096
+
+DECOMPRESS = {'gzip': gzip.decompress, 'xz': lzma.decompress}
+
+
+def _payload(size):
+    # Compressible but not repetitive, so block boundaries fall mid-record
+    rng = random.Random(size)
+    line = lambda i: f'{{"employee_id": "{rng.randrange(10**6):06d}", "row": {i}}}\n'.encode()
+    data = bytearray()
+    i = 0
+    while len(data) < size:
+        data += line(i)
+        i += 1
+    return bytes(data[:size])
+
+
+@pytest.mark.parametrize('compression', ['gzip', 'xz'])
+@pytest.mark.parametrize('size', [0, 1, BLOCK_SIZE - 1, BLOCK_SIZE, BLOCK_SIZE + 1, 5 * BLOCK_SIZE + 123])
+def test_blocks_decompress_to_the_written_bytes(tmp_path, compression, size):
+    data = _payload(size)
+    path = tmp_path / 'out.bin'
+
+    with ParallelCompressedWriter(path, compression, block_size=BLOCK_SIZE) as writer:
+        # Uneven writes so blocks are cut inside a write
+        for start in range(0, len(data), 1000):
+            writer.write(data[start:start + 1000])
+
+    assert DECOMPRESS[compression](path.read_bytes()) == data
+
+
+@pytest.mark.parametrize('compression', ['gzip', 'xz'])
+def test_output_has_one_member_per_block(tmp_path, compression):
+    data = _payload(3 * BLOCK_SIZE + 10)
+    path = tmp_path / 'out.bin'
+
+    with ParallelCompressedWriter(path, compression, block_size=BLOCK_SIZE) as writer:
+        writer.write(data)
+
+    magic = b'\x1f\x8b\x08' if compression == 'gzip' else b'\xfd7zXZ\x00'
+    assert path.read_bytes().count(magic) == 4
+
+
+@pytest.mark.parametrize('suffix', ['.json.gz', '.json.xz'])
+def test_json_round_trip_across_block_boundary(tmp_path, suffix):
+    # save_json writes through open_output with the default 1 MiB blocks
+    records = [{'employee_id': f"{i:06d}", 'name': '工藤 貴幸', 'kei': i * 1000} for i in range(20000)]
+    path = tmp_path / f"records{suffix}"
+
+    save_json(records, path)
+
+    assert path.stat().st_size > 0
+    with open_input(path) as f:
+        assert len(f.read().encode('utf-8')) > 1 << 20
+    assert load_json(path) == records
+
+
+def test_text_output_round_trip(tmp_path):
+    path = tmp_path / 'records.md.gz'
+    text = ''.join(f"| {i} | 出勤 |\n" for i in range(100000))
+
+    with open_output(path) as f:
+        f.write(text)
+
+    with open_input(path) as f:
+        assert f.read() == text
@@ -0,0 +1,105 @@
+"""Tests for the daemon's client fallback, peer check, Ctrl+C forwarding and socket permissions"""
+
+import json
+import os
+import signal
+import socket
+import stat
+import threading
+import time
+
+import pytest
+
+from src import daemon
+
+
+@pytest.fixture
+def restore_sigint():
+    saved = signal.getsignal(signal.SIGINT)
+    yield
+    signal.signal(signal.SIGINT, saved)
+
+
+def test_unusable_socket_path_means_no_daemon(tmp_path):
+    assert daemon.run_via_daemon(['attendance', 'x.pdf'], str(tmp_path / 'missing.sock')) is None
+    # Too long for AF_UNIX: OSError, not one of the connect errors
+    assert daemon.run_via_daemon(['attendance', 'x.pdf'], str(tmp_path / ('x' * 200))) is None
+
+
+def test_socket_of_another_user_gets_nothing(tmp_path, monkeypatch, capsys):
+    listener = daemon._bind(str(tmp_path / 'd.sock'))
+    received = []
+
+    def accept():
+        conn, _ = listener.accept()
+        with conn:
+            received.append(conn.recv(4096))
+
+    thread = threading.Thread(target=accept)
+    thread.start()
+    monkeypatch.setattr(daemon.os, 'getuid', lambda: os.geteuid() + 1)
+    try:
+        assert daemon.run_via_daemon(['attendance', 'x.pdf'], str(tmp_path / 'd.sock')) is None
+        thread.join(5)
+    finally:
+        listener.close()
+
+    assert received == [b'']
+    assert 'Ignoring' in capsys.readouterr().err
+
+
+def test_cancel_interrupts_the_job(restore_sigint):
+    started = threading.Event()
+    seen = []
+
+    def handler(argv):
+        started.set()
+        try:
+            while True:
+                time.sleep(0.01)
+        except KeyboardInterrupt:
+            seen.append('interrupted')
+            raise
+
+    client, server = socket.socketpair()
+    reply = []
+
+    def run_client():
+        request = json.dumps({'argv': ['attendance', 'x.pdf'], 'cwd': os.getcwd()}).encode('utf-8')
+        socket.send_fds(client, [request], [0, 1, 2])
+        started.wait(5)
+        client.sendall(daemon.CANCEL)
+        reply.append(b''.join(iter(lambda: client.recv(4096), b'')))
+
+    thread = threading.Thread(target=run_client)
+    thread.start()
+    with server:
+        daemon._handle_connection(server, handler)
+    thread.join(5)
+    client.close()
+
+    assert seen == ['interrupted']
+    assert json.loads(reply[0]) == {'exit_code': daemon.INTERRUPTED_EXIT_CODE}
+    # Back to ignoring Ctrl+C between jobs
+    assert signal.getsignal(signal.SIGINT) == signal.SIG_IGN
+
+
+def test_finished_job_is_not_interrupted(restore_sigint):
+    client, server = socket.socketpair()
+    request = json.dumps({'argv': [], 'cwd': os.getcwd()}).encode('utf-8')
+    socket.send_fds(client, [request], [0, 1, 2])
+
+    with server:
+        daemon._handle_connection(server, lambda argv: None)
+    reply = b''.join(iter(lambda: client.recv(4096), b''))
+    client.close()
+
+    assert json.loads(reply) == {'exit_code': 0}
+
+
+def test_socket_is_owner_only_when_bound(tmp_path):
+    listener = daemon._bind(str(tmp_path / 'd.sock'))
+    try:
+        assert stat.S_IMODE(os.stat(tmp_path / 'd.sock').st_mode) == 0o600
+    finally:
+        listener.close()
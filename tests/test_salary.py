@@ -0,0 +1,50 @@
+"""Tests for locating the attendance salary column in both table shapes"""
+
+import pandas as pd
+
+from src.attendance.extract.salary import extract_column6_salary_data
+
+
+DAYS = 31
+
+
+def _wide_table():
+    """One column per day after the IDs; labels after the day columns, values in their own cells"""
+    id_columns = ['240631', '山田', '', '']
+    day_columns = ['8:00'] * DAYS
+    rows = [
+        id_columns + day_columns + ['基本給', '20', '200,000'],
+        id_columns + day_columns + ['稼働時間', '160:00', ''],
+    ]
+    return pd.DataFrame(rows)
+
+
+def _narrow_table(with_working_hours):
+    """Label, count and amount in one cell of column 6; column 7 holds unrelated notes"""
+    label = '稼働時間\n160:00' if with_working_hours else '残業時間\n12:00'
+    rows = [
+        ['240631', '山田', '', '', '', '', '基本給\n20\n200,000', '備考 999'],
+        ['', '', '', '', '', '', label, '3/14 有給'],
+    ]
+    return pd.DataFrame(rows)
+
+
+def test_wide_table_joins_the_value_cells_right_of_the_labels():
+    rows, working_hours = extract_column6_salary_data(_wide_table(), 0, 2)
+
+    assert rows == ['基本給\n20\n200,000', '稼働時間\n160:00']
+    assert working_hours == '160:00'
+
+
+def test_narrow_table_reads_column_6_alone():
+    rows, working_hours = extract_column6_salary_data(_narrow_table(with_working_hours=True), 0, 2)
+
+    assert rows == ['基本給\n20\n200,000', '稼働時間\n160:00']
+    assert working_hours == '160:00'
+
+
+def test_narrow_table_without_working_hours_reads_column_6_alone():
+    rows, working_hours = extract_column6_salary_data(_narrow_table(with_working_hours=False), 0, 2)
+
+    assert rows == ['基本給\n20\n200,000', '残業時間\n12:00']
+    assert working_hours == ''
@@ -0,0 +1,110 @@
+"""Tests for the fair scheduler's lazy page split, in-order shard results and cancel"""
+
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from src import scheduler
+
+
+BOOK = Path(__file__).resolve().parent.parent / 'materials' / 'attendance_book_40.pdf'
+
+
+class _StubShards:
+    """Stands in for run_shard: one record per page, with per-page gates and delays"""
+
+    def __init__(self):
+        self.pages = []
+        self.gates = {}
+        self.delays = {}
+        self.shared_paths = []
+
+    def __call__(self, parser_type, handle, page_numbers, quiet=False, profile=None, traced=False):
+        started = time.time()
+        self.pages.append(page_numbers)
+        self.shared_paths.append(handle.path)
+        # Only the shard's own pages are handed over, and they are split
+        assert sorted(handle.offsets) == page_numbers
+        for page in page_numbers:
+            if page in self.gates:
+                self.gates[page].wait(5)
+            time.sleep(self.delays.get(page, 0))
+        page_records = [(page, [{'employee_id': str(page)}]) for page in page_numbers]
+        return page_records, {}, started, time.time() - started, None, {}, None
+
+
+@pytest.fixture
+def shards(monkeypatch):
+    stub = _StubShards()
+    monkeypatch.setattr(scheduler, 'run_shard', stub)
+    return stub
+
+
+def test_queued_job_has_no_shared_copy_until_picked(shards):
+    shards.gates[1] = threading.Event()
+    with ThreadPoolExecutor(1) as executor:
+        fair = scheduler.FairScheduler(executor, 1, pages_per_shard=1)
+        first = fair.submit('attendance', str(BOOK), pages='1-2')
+        second = fair.submit('attendance', str(BOOK), pages='3-4')
+        # The worker is busy with page 1; the second job is still only a path
+        time.sleep(0.2)
+        assert first.shared is not None
+        assert second.shared is None
+
+        shards.gates[1].set()
+        assert [r['employee_id'] for r in first.records(10)] == ['1', '2']
+        assert [r['employee_id'] for r in second.records(10)] == ['3', '4']
+
+    # Each job's page file is removed when the job finishes
+    assert len(set(shards.shared_paths)) == 2
+    assert not any(os.path.exists(path) for path in shards.shared_paths)
+
+
+def test_iter_shards_yields_in_page_order(shards):
+    shards.delays[1] = 0.3
+    with ThreadPoolExecutor(3) as executor:
+        fair = scheduler.FairScheduler(executor, 3, pages_per_shard=1)
+        job = fair.submit('attendance', BOOK.read_bytes(), pages='1-5')
+
+        pages = [[page for page, _ in page_records] for page_records in job.iter_shards()]
+
+    assert pages == [[1], [2], [3], [4], [5]]
+    # Page 1 was slow, so later pages had finished before it
+    assert shards.pages.index([1]) == 0
+
+
+def test_priority_job_goes_before_a_queued_stream(shards):
+    shards.gates[1] = threading.Event()
+    with ThreadPoolExecutor(1) as executor:
+        fair = scheduler.FairScheduler(executor, 1, pages_per_shard=1)
+        stream = fair.submit('attendance', str(BOOK), pages='1-3')
+        urgent = fair.submit('attendance', str(BOOK), pages='10', priority=1)
+        time.sleep(0.2)
+        shards.gates[1].set()
+        list(stream.iter_shards())
+        urgent.result(10)
+
+    assert shards.pages == [[1], [10], [2], [3]]
+
+
+def test_cancel_drops_shards_that_have_not_started(shards):
+    shards.gates[1] = threading.Event()
+    with ThreadPoolExecutor(1) as executor:
+        fair = scheduler.FairScheduler(executor, 1, pages_per_shard=1)
+        job = fair.submit('attendance', str(BOOK), pages='1-4')
+        time.sleep(0.2)
+        fair.cancel(job)
+        shards.gates[1].set()
+        assert job.wait(10)
+
+        results = job.iter_shards()
+        assert [page for page, _ in next(results)] == [1]
+        with pytest.raises(CancelledError):
+            next(results)
+
+    assert shards.pages == [[1]]
+    assert not os.path.exists(job.shared.path)
@@ -0,0 +1,82 @@
+"""Tests for the service's stream queue slot and stream traces"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from werkzeug.test import EnvironBuilder
+
+from src import scheduler, service
+
+
+BOOK = Path(__file__).resolve().parent.parent / 'materials' / 'attendance_book_40.pdf'
+
+
+class _Pool:
+    """Stands in for WorkerPool: one queue slot and an optional scheduler"""
+
+    def __init__(self, fair=None):
+        self.slots = 1
+        self.scheduler = fair
+
+    def try_acquire(self):
+        if not self.slots:
+            return False
+        self.slots -= 1
+        return True
+
+    def release(self):
+        self.slots += 1
+
+
+@pytest.fixture
+def page_two_gate(monkeypatch):
+    gate = threading.Event()
+    gate.started = threading.Event()
+
+    def run_shard(parser_type, handle, page_numbers, quiet=False, profile=None, traced=False):
+        started = time.time()
+        if page_numbers == [2]:
+            gate.started.set()
+            gate.wait(5)
+        page_records = [(page, [{'employee_id': str(page)}]) for page in page_numbers]
+        return page_records, {}, started, time.time() - started, None, {}, None
+
+    monkeypatch.setattr(scheduler, 'run_shard', run_shard)
+    return gate
+
+
+def test_closing_an_unstarted_stream_releases_its_slot():
+    pool = _Pool()
+    app = service.create_app(pool)
+    environ = EnvironBuilder(method='POST', path='/attendance', query_string='stream=1',
+                             data=b'%PDF-1.4 stand-in').get_environ()
+
+    # The server gives up on the response (e.g. the client is gone) before reading any of it
+    body = app.wsgi_app(environ, lambda status, headers: None)
+    assert pool.slots == 0
+    body.close()
+    body.close()
+
+    assert pool.slots == 1
+
+
+def test_closed_stream_saves_its_trace_without_waiting_for_running_pages(page_two_gate, tmp_path):
+    with ThreadPoolExecutor(2) as executor:
+        pool = _Pool(scheduler.FairScheduler(executor, 2))
+        pool.slots = 0
+        lines = service.stream_document(pool, 'attendance', str(BOOK), '1-2', trace_dir=str(tmp_path))
+        assert '"page": 1' in next(lines)
+        assert page_two_gate.started.wait(5)
+
+        started = time.time()
+        lines.close()
+        assert time.time() - started < 1
+        assert pool.slots == 1
+        assert not list(tmp_path.glob('*.trace.json'))
+        page_two_gate.set()
+
+    # Saved once page 2, still running at the cancel, had finished
+    assert len(list(tmp_path.glob('*.trace.json'))) == 1
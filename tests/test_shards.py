@@ -0,0 +1,152 @@
+"""Tests for sharded output planning, manifests and single-shard rewrites"""
+
+import hashlib
+import json
+from argparse import Namespace
+
+import pytest
+
+import app
+from src import shards
+
+
+def _records(*ids):
+    return [{'employee_id': employee_id, 'name': f"name {employee_id}"} for employee_id in ids]
+
+
+# Pages 1, 2, 4 and 5 with tables; page 3 has none
+PAGE_RECORDS = [
+    (1, _records('100', '101')),
+    (1, _records('102')),
+    (2, _records('200', '201', '202')),
+    (4, _records('400')),
+    (5, _records('500', '501')),
+]
+
+
+def _ids(shard):
+    return [record['employee_id'] for record in shard['records']]
+
+
+def test_page_shards_cover_fixed_page_ranges():
+    planned = shards.plan_page_shards(PAGE_RECORDS, 2)
+
+    assert [(s['first_page'], s['last_page']) for s in planned] == [(1, 2), (3, 4), (5, 5)]
+    assert [_ids(s) for s in planned] == [['100', '101', '102', '200', '201', '202'], ['400'], ['500', '501']]
+    assert all(s['skip'] == 0 for s in planned)
+
+
+def test_page_shards_clip_last_range_to_page_count():
+    planned = shards.plan_page_shards(PAGE_RECORDS, 4, page_count=6)
+
+    assert [(s['first_page'], s['last_page']) for s in planned] == [(1, 4), (5, 6)]
+
+
+def test_page_shards_skip_ranges_without_records():
+    planned = shards.plan_page_shards([(1, _records('1')), (9, _records('9'))], 2)
+
+    assert [(s['first_page'], s['last_page']) for s in planned] == [(1, 2), (9, 9)]
+
+
+def test_record_shards_split_pages_and_record_skip():
+    planned = shards.plan_record_shards(PAGE_RECORDS, 4)
+
+    assert [_ids(s) for s in planned] == [
+        ['100', '101', '102', '200'],
+        ['201', '202', '400', '500'],
+        ['501'],
+    ]
+    assert [(s['first_page'], s['last_page'], s['skip']) for s in planned] == [
+        (1, 2, 0),
+        (2, 5, 1),   # first record of page 2 went to the previous shard
+        (5, 5, 1),
+    ]
+
+
+def test_record_shard_skip_counts_records_across_tables_of_a_page():
+    planned = shards.plan_record_shards(PAGE_RECORDS[:2], 2)
+
+    assert [(s['first_page'], s['skip'], _ids(s)) for s in planned] == [
+        (1, 0, ['100', '101']),
+        (1, 2, ['102']),
+    ]
+
+
+def test_manifest_lists_checksums_and_id_ranges(tmp_path):
+    planned = shards.plan_page_shards(PAGE_RECORDS, 2)
+    manifest = shards.write_shards(planned, tmp_path, 'records', 'employee_id', 'pages', 2, source='book.pdf')
+
+    assert manifest['total_records'] == 9
+    assert manifest['source'] == 'book.pdf'
+    assert json.loads((tmp_path / 'records.manifest.json').read_text(encoding='utf-8')) == manifest
+    first = manifest['shards'][0]
+    assert first['file'] == 'records.part-0001.json'
+    assert (first['employee_id_min'], first['employee_id_max']) == ('100', '202')
+    for entry in manifest['shards']:
+        content = (tmp_path / entry['file']).read_bytes()
+        assert entry['sha256'] == hashlib.sha256(content).hexdigest()
+
+
+def test_rewrite_record_shard_takes_its_slice_of_the_pages(tmp_path):
+    planned = shards.plan_record_shards(PAGE_RECORDS, 4)
+    shards.write_shards(planned, tmp_path, 'records', 'employee_id', 'records', 4)
+    manifest_path = tmp_path / 'records.manifest.json'
+    before = shards.load_manifest(manifest_path)
+    assert shards.shard_pages(before, 2) == '2-5'
+
+    # Re-extraction returns every record of pages 2-5, with a corrected name
+    page_records = [(page, [dict(r, name='fixed') for r in records]) for page, records in PAGE_RECORDS[2:]]
+    entry = shards.rewrite_shard(manifest_path, 2, page_records)
+
+    rewritten = json.loads((tmp_path / entry['file']).read_text(encoding='utf-8'))
+    assert [r['employee_id'] for r in rewritten] == ['201', '202', '400', '500']
+    assert all(r['name'] == 'fixed' for r in rewritten)
+    after = shards.load_manifest(manifest_path)
+    assert after['shards'][1] == entry
+    assert entry['sha256'] != before['shards'][1]['sha256']
+    assert after['shards'][0] == before['shards'][0]
+    assert after['total_records'] == 9
+
+
+class _StubParser:
+    def __init__(self):
+        self.pages = []
+
+    def iter_table_records(self, pdf_path, pages):
+        self.pages.append(pages)
+        return [(3, _records('300')), (4, _records('400', '401'))]
+
+
+def test_only_shard_rewrites_one_shard(tmp_path, capsys):
+    shards.write_shards(shards.plan_page_shards(PAGE_RECORDS, 2), tmp_path, 'records', 'employee_id', 'pages', 2)
+    parser = _StubParser()
+
+    app.rewrite_single_shard(parser, {'basename': 'records'}, tmp_path, Namespace(only_shard=2), 'book.pdf')
+
+    assert parser.pages == ['3-4']
+    rewritten = json.loads((tmp_path / 'records.part-0002.json').read_text(encoding='utf-8'))
+    assert [r['employee_id'] for r in rewritten] == ['300', '400', '401']
+    assert shards.load_manifest(tmp_path / 'records.manifest.json')['total_records'] == 11
+
+
+@pytest.mark.parametrize('only_shard', [0, 4])
+def test_only_shard_outside_manifest_is_an_error(tmp_path, capsys, only_shard):
+    shards.write_shards(shards.plan_page_shards(PAGE_RECORDS, 2), tmp_path, 'records', 'employee_id', 'pages', 2)
+    parser = _StubParser()
+
+    with pytest.raises(SystemExit):
+        app.rewrite_single_shard(parser, {'basename': 'records'}, tmp_path, Namespace(only_shard=only_shard), 'x.pdf')
+
+    assert parser.pages == []
+    assert f"shard {only_shard} not in manifest" in capsys.readouterr().out
+
+
+def test_only_shard_zero_is_not_a_full_extraction(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app, 'load_parser', lambda parser_type: _StubParser())
+    monkeypatch.setattr(app, 'rewrite_single_shard', lambda *a: calls.append(a[3].only_shard))
+    args = Namespace(employee=None, pdf_path='book.pdf', output=str(tmp_path), only_shard=0)
+
+    app.run_extraction('attendance', args)
+
+    assert calls == [0]
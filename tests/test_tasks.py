@@ -0,0 +1,108 @@
+"""Tests for the Celery shard chord, run eagerly with the in-memory broker"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src import tasks
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _records(page):
+    return [{'employee_id': f"{page:03d}{i}", 'name': f"page {page}"} for i in range(2)]
+
+
+class _StubParser:
+    """Returns two records per page and fails the first attempt of one shard"""
+
+    def __init__(self, calls, fail_pages):
+        self.calls = calls
+        self.fail_pages = fail_pages
+
+    def iter_table_records(self, pdf_path, pages, index=None):
+        self.calls.append(pages)
+        if pages == self.fail_pages and self.calls.count(pages) == 1:
+            raise OSError('worker lost the file')
+        first, _, last = pages.partition('-')
+        return [(page, _records(page)) for page in range(int(first), int(last or first) + 1)]
+
+
+@pytest.fixture
+def eager(monkeypatch):
+    monkeypatch.setenv('PDF_CELERY_EAGER', '1')
+    saved = dict(tasks.app.conf)
+    tasks.configure(tasks.app)
+    yield tasks.app
+    tasks.app.conf.update(saved)
+
+
+def test_chord_merges_shards_in_page_order_and_retries_one_shard(eager, tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(tasks, 'count_pages', lambda pdf_path: 7)
+    monkeypatch.setattr(tasks, 'load_parser', lambda parser_type: _StubParser(calls, '4-6'))
+
+    result = tasks.extract_document('attendance', 'book.pdf', pages_per_shard=3, output_folder=tmp_path)
+    summary = result.get()
+
+    assert summary == {'records': 14, 'shards': 3, 'output_folder': str(tmp_path.resolve())}
+    # Only the failing shard ran twice
+    assert sorted(calls) == ['1-3', '4-6', '4-6', '7']
+    written = json.loads((tmp_path / 'attendance_records.json').read_text(encoding='utf-8'))
+    assert [r['employee_id'] for r in written] == [f"{page:03d}{i}" for page in range(1, 8) for i in range(2)]
+
+
+def test_relative_output_folder_is_resolved(eager, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tasks, 'count_pages', lambda pdf_path: 1)
+    monkeypatch.setattr(tasks, 'load_parser', lambda parser_type: _StubParser([], None))
+
+    summary = tasks.extract_document('attendance', 'book.pdf', output_folder='out').get()
+
+    assert summary['output_folder'] == str(tmp_path / 'out')
+
+
+def test_merge_sorts_shard_results_by_page(tmp_path):
+    shard_results = [
+        {'pages': '3-4', 'page_records': [[4, _records(4)], [3, _records(3)]], 'employees': {}},
+        {'pages': '1-2', 'page_records': [[1, _records(1)[:1]], [2, _records(2)], [1, _records(1)[1:]]],
+         'employees': {}},
+    ]
+
+    summary = tasks.merge_shards(shard_results, 'attendance', str(tmp_path))
+
+    assert summary['records'] == 8
+    written = json.loads((tmp_path / 'attendance_records.json').read_text(encoding='utf-8'))
+    # Page order, and table order kept within page 1
+    assert [r['employee_id'] for r in written] == ['0010', '0011', '0020', '0021', '0030', '0031', '0040', '0041']
+
+
+def test_import_creates_no_folders():
+    if (ROOT / '.celery').exists():
+        pytest.skip('.celery already exists from a worker run')
+    # A fresh interpreter, so the import really runs configure()
+    code = "import src.tasks as t; print(t.CELERY_DIR.exists())"
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+    assert out.stdout.strip() == 'False'
+
+
+def test_shard_value_error_is_not_retried(eager, tmp_path, monkeypatch):
+    calls = []
+
+    class _Unreadable(_StubParser):
+        def iter_table_records(self, pdf_path, pages, index=None):
+            calls.append(pages)
+            raise ValueError('not an attendance book')
+
+    monkeypatch.setattr(tasks, 'count_pages', lambda pdf_path: 2)
+    monkeypatch.setattr(tasks, 'load_parser', lambda parser_type: _Unreadable(calls, None))
+
+    with pytest.raises(ValueError):
+        tasks.extract_document('attendance', 'book.pdf', output_folder=tmp_path).get()
+
+    assert calls == ['1-2']
@@ -0,0 +1,96 @@
+"""Tests for the watch folder's recovery from a broken worker pool and vanished files"""
+
+import json
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+from src import watch
+
+
+class _FakePool:
+    """Accepts `capacity` submissions, then behaves like a pool whose worker died"""
+
+    instances = []
+
+    def __init__(self, max_workers=None):
+        self.capacity = 1 if not _FakePool.instances else 10
+        self.submitted = []
+        self.shut_down = False
+        _FakePool.instances.append(self)
+
+    def submit(self, fn, *args):
+        if len(self.submitted) >= self.capacity:
+            raise BrokenProcessPool('A process in the process pool was terminated abruptly')
+        self.submitted.append(args)
+        return Future()
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def _status(folder):
+    return json.loads((folder / watch.STATUS_FILENAME).read_text(encoding='utf-8'))
+
+
+def test_broken_pool_fails_in_flight_files_and_is_replaced(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch, 'ProcessPoolExecutor', _FakePool)
+    monkeypatch.setattr(_FakePool, 'instances', [])
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    first = inbox / 'attendance-1.pdf'
+    second = inbox / 'attendance-2.pdf'
+    first.write_bytes(b'%PDF-1 first')
+    second.write_bytes(b'%PDF-1 second')
+    watcher = watch.FolderWatcher(inbox, tmp_path / 'out')
+    watcher.pool = watch.ProcessPoolExecutor(max_workers=1)
+
+    watcher._submit(first)
+    watcher._submit(second)
+
+    old, new = _FakePool.instances
+    assert old.shut_down
+    assert watcher.pool is new
+    assert [args[1] for args in new.submitted] == [second]
+    assert [entry[1] for entry in watcher.in_flight.values()] == [second]
+
+    first_sha = watch.file_sha256(first)
+    entry = watcher.ledger.get(first_sha)
+    assert (entry['state'], entry['error']) == ('failed', 'worker process died')
+    assert _status(watch.output_folder_for(tmp_path / 'out', first, first_sha))['state'] == 'failed'
+    watcher.ledger.close()
+
+
+def test_finished_future_from_broken_pool_is_a_failed_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch, 'ProcessPoolExecutor', _FakePool)
+    monkeypatch.setattr(_FakePool, 'instances', [])
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    path = inbox / 'allowance.pdf'
+    path.write_bytes(b'%PDF-1 allowance')
+    watcher = watch.FolderWatcher(inbox, tmp_path / 'out')
+    watcher.pool = watch.ProcessPoolExecutor(max_workers=1)
+    watcher._submit(path)
+
+    future, = watcher.in_flight
+    future.set_exception(BrokenProcessPool('A process in the process pool was terminated abruptly'))
+    watcher._finish(future)
+
+    assert watcher.in_flight == {}
+    assert watcher.ledger.get(watch.file_sha256(path))['error'] == 'worker process died'
+    watcher.ledger.close()
+
+
+def test_file_gone_before_hashing_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch, 'ProcessPoolExecutor', _FakePool)
+    monkeypatch.setattr(_FakePool, 'instances', [])
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    watcher = watch.FolderWatcher(inbox, tmp_path / 'out')
+    watcher.pool = watch.ProcessPoolExecutor(max_workers=1)
+
+    # Stable at the last poll, then moved away before it was hashed
+    watcher._submit(inbox / 'attendance-moved.pdf')
+
+    assert watcher.in_flight == {}
+    assert _FakePool.instances[0].submitted == []
+    watcher.ledger.close()